@@ -0,0 +1,139 @@
+"""
+Ленивый выбор рендерера: renderer3d.dll или CPU-рендерер на NumPy.
+
+Ничего не загружается при импорте. Бэкенд выбирается при первом
+обращении (get() или любой атрибут renderer): по порядку BACKENDS
+пробуется загрузчик, первый удачный запоминается вместе с набором
+доступных функций, и дальше все обращения идут к нему без повторной
+проверки. Переменная окружения R3D_BACKEND=cpu|native|process задаёт
+бэкенд явно; process (CPU-рендерер в отдельном процессе) только так и
+выбирается.
+"""
+import ctypes
+import os
+from collections import namedtuple
+
+DLL_PATH = "./renderer3d.dll"
+
+# Функции, которых может не быть в старых сборках DLL
+OPTIONAL_FUNCTIONS = (
+    "CloseRenderer3D", "IsRunning", "RotateCamera", "MoveCamera", "ZoomCamera",
+    "ClearScene", "ResetCamera", "GetObjectCount", "SetBackgroundColor", "AddCubes",
+    "SetCubeColors", "GetVisibleCount", "GetCulledCount", "ResizeRenderer",
+    "SetWorkerCount", "GetWorkerCount", "GetOccludedCount", "SetOcclusionCulling",
+    "SetLodThresholds", "GetImpostorCount", "SetVoxelMode", "GetVoxelQuadCount",
+    "SetRenderEngine", "GetRenderEngine", "SetCubes", "TruncateCubes",
+)
+
+# Типы аргументов и результата функций DLL: имя -> (argtypes, restype)
+_NO_RESULT = object()  # restype не задаётся
+SIGNATURES = {
+    "InitRenderer3D": ([ctypes.c_int, ctypes.c_int], _NO_RESULT),
+    "RenderFrame": (None, None),
+    "AddCube": ([ctypes.c_float] * 4, _NO_RESULT),
+    "RotateCamera": ([ctypes.c_float, ctypes.c_float], _NO_RESULT),
+    "MoveCamera": ([ctypes.c_float, ctypes.c_float], _NO_RESULT),
+    "ZoomCamera": ([ctypes.c_float], _NO_RESULT),
+    "ClearScene": ([], _NO_RESULT),
+    "IsRunning": (None, ctypes.c_bool),
+    "CloseRenderer3D": (None, None),
+    "GetObjectCount": (None, ctypes.c_int),
+    "SetBackgroundColor": ([ctypes.c_float] * 3, _NO_RESULT),
+    "AddCubes": ([ctypes.POINTER(ctypes.c_float), ctypes.c_int], _NO_RESULT),
+    "SetCubeColors": ([ctypes.POINTER(ctypes.c_uint32), ctypes.c_int, ctypes.c_int], _NO_RESULT),
+    "SetCubes": ([ctypes.POINTER(ctypes.c_float), ctypes.c_int, ctypes.c_int], _NO_RESULT),
+    "TruncateCubes": ([ctypes.c_int], _NO_RESULT),
+    "ResizeRenderer": ([ctypes.c_int, ctypes.c_int], None),
+    "SetWorkerCount": ([ctypes.c_int], _NO_RESULT),
+    "GetWorkerCount": (None, ctypes.c_int),
+    "GetOccludedCount": (None, ctypes.c_int),
+    "SetOcclusionCulling": ([ctypes.c_bool], _NO_RESULT),
+    "SetLodThresholds": ([ctypes.c_float, ctypes.c_int], _NO_RESULT),
+    "GetImpostorCount": (None, ctypes.c_int),
+    "SetVoxelMode": ([ctypes.c_bool, ctypes.c_float], _NO_RESULT),
+    "GetVoxelQuadCount": (None, ctypes.c_int),
+    "SetRenderEngine": ([ctypes.c_int], _NO_RESULT),
+    "GetRenderEngine": (None, ctypes.c_int),
+    "GetVisibleCount": (None, ctypes.c_int),
+    "GetCulledCount": (None, ctypes.c_int),
+}
+
+Backend = namedtuple("Backend", "name renderer is_native functions")
+
+
+def probe(renderer):
+    """Кортеж доступных у рендерера функций из OPTIONAL_FUNCTIONS"""
+    return tuple(name for name in OPTIONAL_FUNCTIONS if hasattr(renderer, name))
+
+
+def load_native(path=DLL_PATH):
+    """renderer3d.dll с объявленными типами; OSError, если DLL не загрузилась"""
+    dll = ctypes.CDLL(path)
+    functions = probe(dll)
+    for name, (argtypes, restype) in SIGNATURES.items():
+        if name not in functions and name in OPTIONAL_FUNCTIONS:
+            continue
+        func = getattr(dll, name)
+        if argtypes is not None:
+            func.argtypes = argtypes
+        if restype is not _NO_RESULT:
+            func.restype = restype
+    return Backend("native", dll, True, functions)
+
+
+def load_cpu():
+    import renderer_cpu
+    renderer = renderer_cpu.CpuRenderer()
+    return Backend("cpu", renderer, False, probe(renderer))
+
+
+def load_process():
+    import render_process
+    renderer = render_process.RemoteRenderer()
+    return Backend("process", renderer, False, probe(renderer))
+
+
+# Загрузчики в порядке предпочтения
+BACKENDS = {
+    "native": load_native,
+    "cpu": load_cpu,
+    "process": load_process,
+}
+
+# Бэкенды, которые не пробуются сами по себе - только через R3D_BACKEND
+EXPLICIT_BACKENDS = ("process",)
+
+_backend = None
+
+
+def get():
+    """Выбранный бэкенд; загружается при первом вызове"""
+    global _backend
+    if _backend is None:
+        _backend = _load()
+    return _backend
+
+
+def _load():
+    forced = os.environ.get("R3D_BACKEND")
+    names = [forced] if forced in BACKENDS else [name for name in BACKENDS if name not in EXPLICIT_BACKENDS]
+    errors = []
+    for name in names:
+        try:
+            return BACKENDS[name]()
+        except OSError as e:
+            errors.append(f"{name}: {e}")
+    raise OSError("Не удалось загрузить рендерер: " + "; ".join(errors))
+
+
+class _LazyRenderer:
+    """Рендерер, который загружается при первом обращении к любому атрибуту"""
+
+    def __getattr__(self, name):
+        return getattr(get().renderer, name)
+
+    def __setattr__(self, name, value):
+        setattr(get().renderer, name, value)
+
+
+renderer = _LazyRenderer()
@@ -0,0 +1,224 @@
+"""
+Пакетный рендер кадров без интерфейса: облёт сцены камерой в PNG или RGB.
+
+Сцена кладётся один раз в разделяемую память; каждый процесс пула
+подключается к ней, строит свой CPU-рендерер и рисует свою часть кадров,
+сразу записывая их на диск, так что через пул передаются только номера
+кадров и параметры камеры.
+
+    python batch_render.py scene.r3ds --frames 120 --output-dir frames
+    python batch_render.py --demo 100000 --format rgb --workers 8
+    python batch_render.py scene.r3ds --path path.json
+
+Путь камеры (path.json) - список кадров {"yaw": градусы, "pitch": градусы,
+"distance": расстояние}; без него камера делает полный оборот вокруг сцены.
+"""
+import argparse
+import json
+import math
+import os
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import renderer_cpu
+import scene_file
+from benchmark import demo_cubes
+from scene import Scene
+
+FORMATS = ("png", "rgb")
+PNG_COMPRESSION = 6
+
+# Состояние процесса пула: рендерер и настройки вывода
+_worker = {}
+
+
+# === Вывод кадров ===
+
+def frame_rgb(frame):
+    """Кадр (h, w) uint32 0xFFRRGGBB -> массив (h, w, 3) uint8 RGB"""
+    # В little-endian байты пикселя лежат как B, G, R, A
+    return frame.view(np.uint8).reshape(frame.shape + (4,))[..., 2::-1]
+
+
+def write_png(path, frame, compression=PNG_COMPRESSION):
+    """Записывает кадр в 8-битный RGB PNG (без сторонних библиотек)"""
+    height, width = frame.shape
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # байт фильтра 0 в начале строки
+    rows[:, 1:] = frame_rgb(frame).reshape(height, width * 3)
+
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", header))
+        f.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), compression)))
+        f.write(chunk(b"IEND", b""))
+
+
+def write_rgb(path, frame):
+    """Записывает кадр сырыми байтами RGB, строка за строкой"""
+    with open(path, "wb") as f:
+        f.write(np.ascontiguousarray(frame_rgb(frame)).data)
+
+
+# === Путь камеры ===
+
+def turntable(frames, pitch, distance, distance_end=None):
+    """Полный оборот камеры за frames кадров; расстояние плавно меняется до distance_end"""
+    if distance_end is None:
+        distance_end = distance
+    return [{
+        "yaw": 360.0 * i / frames,
+        "pitch": pitch,
+        "distance": distance + (distance_end - distance) * i / max(frames - 1, 1),
+    } for i in range(frames)]
+
+
+def load_path(path):
+    with open(path, encoding="utf-8") as f:
+        return [{
+            "yaw": float(key.get("yaw", 0.0)),
+            "pitch": float(key.get("pitch", 0.0)),
+            "distance": float(key.get("distance", renderer_cpu.DEFAULT_DISTANCE)),
+        } for key in json.load(f)]
+
+
+# === Процессы пула ===
+
+def _init_worker(shm_name, count, has_colors, width, height, output_dir, fmt):
+    """Подключается к сцене в разделяемой памяти и строит свой рендерер"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    cubes = np.ndarray((count, 4), dtype=np.float32, buffer=shm.buf)
+    renderer = renderer_cpu.CpuRenderer()
+    renderer.SetWorkerCount(1)  # параллелизм - на уровне процессов
+    renderer.InitRenderer3D(width, height)
+    renderer.AddCubes(cubes, count)
+    if has_colors:
+        colors = np.ndarray((count,), dtype=np.uint32, buffer=shm.buf, offset=cubes.nbytes)
+        renderer.SetCubeColors(colors, 0, count)
+    # Рендерер скопировал сцену - разделяемую память можно отпустить
+    del cubes
+    if has_colors:
+        del colors
+    shm.close()
+    renderer.RenderFrame()  # прогрев: ленивое построение BVH
+    _worker.update(renderer=renderer, output_dir=output_dir, format=fmt)
+
+
+def _render_frame(task):
+    index, key = task
+    renderer = _worker["renderer"]
+    camera = renderer.camera
+    camera.yaw = math.radians(key["yaw"])
+    camera.pitch = min(max(math.radians(key["pitch"]), -renderer_cpu.MAX_PITCH), renderer_cpu.MAX_PITCH)
+    camera.distance = min(max(key["distance"], renderer_cpu.MIN_DISTANCE), renderer_cpu.MAX_DISTANCE)
+
+    started = time.perf_counter()
+    renderer.RenderFrame()
+    elapsed = time.perf_counter() - started
+
+    fmt = _worker["format"]
+    path = os.path.join(_worker["output_dir"], f"frame_{index:05d}.{fmt}")
+    if fmt == "png":
+        write_png(path, renderer.framebuffer)
+    else:
+        write_rgb(path, renderer.framebuffer)
+    return elapsed
+
+
+# === Запуск ===
+
+def load_cubes(args):
+    """(cubes (N, 4) float32, colors (N,) uint32 или None) из файла или демо-сцены"""
+    if args.scene:
+        scene = Scene()
+        scene_file.load_scene(scene, args.scene)
+        return np.ascontiguousarray(scene.cubes), np.ascontiguousarray(scene.colors)
+    return demo_cubes(np.random.default_rng(args.seed), args.demo), None
+
+
+def run(args):
+    cubes, colors = load_cubes(args)
+    count = len(cubes)
+    if args.path:
+        path = load_path(args.path)
+    else:
+        path = turntable(args.frames, args.pitch, args.distance, args.distance_end)
+    os.makedirs(args.output_dir, exist_ok=True)
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(path)))
+
+    size = cubes.nbytes + (colors.nbytes if colors is not None else 0)
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        np.ndarray(cubes.shape, dtype=np.float32, buffer=shm.buf)[:] = cubes
+        if colors is not None:
+            np.ndarray(colors.shape, dtype=np.uint32, buffer=shm.buf, offset=cubes.nbytes)[:] = colors
+
+        started = time.perf_counter()
+        initargs = (shm.name, count, colors is not None, args.width, args.height,
+                    args.output_dir, args.format)
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as pool:
+            # Кадры раздаются пачками, чтобы процессы не простаивали в очереди
+            chunksize = max(1, len(path) // (workers * 4))
+            frame_times = np.array(list(pool.map(_render_frame, enumerate(path), chunksize=chunksize)))
+        elapsed = time.perf_counter() - started
+    finally:
+        shm.close()
+        shm.unlink()
+
+    report = {
+        "cubes": count,
+        "frames": len(path),
+        "workers": workers,
+        "resolution": [args.width, args.height],
+        "format": args.format,
+        "seconds": elapsed,
+        "frames_per_sec": len(path) / elapsed if elapsed > 0 else float("inf"),
+        "frame_ms_mean": float(frame_times.mean() * 1000) if len(frame_times) else 0.0,
+    }
+    print(f"✅ {report['frames']} кадров ({count} кубов) за {elapsed:.2f} с: "
+          f"{report['frames_per_sec']:.1f} кадр/с на {workers} процессах, "
+          f"рендер кадра {report['frame_ms_mean']:.1f} мс -> {args.output_dir}", file=sys.stderr)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный рендер облёта сцены без интерфейса")
+    parser.add_argument("scene", nargs="?", help="файл сцены .r3ds")
+    parser.add_argument("--demo", type=int, default=1000, help="кубов в демо-сцене, если файл не указан")
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--path", help="JSON с ключами камеры (yaw, pitch, distance) на каждый кадр")
+    parser.add_argument("--frames", type=int, default=120, help="кадров на полный оборот")
+    parser.add_argument("--pitch", type=float, default=20.0, help="наклон камеры, градусы")
+    parser.add_argument("--distance", type=float, default=renderer_cpu.DEFAULT_DISTANCE)
+    parser.add_argument("--distance-end", type=float, help="расстояние к последнему кадру (наезд)")
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--format", choices=FORMATS, default="png")
+    parser.add_argument("--output-dir", default="frames")
+    parser.add_argument("--workers", type=int, help="процессов (по умолчанию число ядер)")
+    parser.add_argument("--report", help="файл для JSON с итогами прогона")
+    args = parser.parse_args(argv)
+
+    try:
+        report = run(args)
+    except (OSError, scene_file.SceneFileError) as e:
+        print(f"❌ Ошибка пакетного рендера: {e}", file=sys.stderr)
+        return 1
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
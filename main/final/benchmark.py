@@ -0,0 +1,289 @@
+"""
+Безоконный бенчмарк рендерера: построение сцены, кадры и очистка.
+
+Гоняет тот же API, что и интерфейс (InitRenderer3D, AddCubes, RenderFrame,
+ClearScene...), без Qt. Сцены детерминированы (seed) и используют те же
+распределения, что кнопки "Случайный куб" и "Демо сцена". Каждый случай
+идёт в отдельном процессе: пиковый RSS процесса - память именно этого
+случая, а не максимум всех предыдущих.
+
+    python benchmark.py --sizes 10 1000 100000 --output results.json
+    python benchmark.py --baseline results.json   # сравнение с эталоном
+    python benchmark.py --engines raster raycast  # растеризация против лучей
+"""
+import argparse
+import ctypes
+import json
+import math
+import multiprocessing
+import platform
+import sys
+import time
+
+import numpy as np
+
+import backend
+import renderer_cpu
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000, 1000000)
+DISTRIBUTIONS = ("random", "demo")
+
+# Метрики, где больше - лучше; остальные - меньше лучше
+HIGHER_IS_BETTER = ("insert_cubes_per_sec",)
+COMPARED_METRICS = ("insert_cubes_per_sec", "frame_ms_mean", "frame_ms_p95", "clear_ms", "peak_rss_mb")
+
+# Разница во времени меньше этой - шум таймера, а не регрессия
+NOISE_FLOOR_MS = 0.5
+
+
+# === Сцены ===
+
+def random_cubes(rng, n):
+    """Как add_random_cube: x [-5, 5], y [-3, 3], z [-15, -8], размер [0.3, 1.5]"""
+    return np.column_stack([
+        rng.uniform(-5, 5, n),
+        rng.uniform(-3, 3, n),
+        rng.uniform(-15, -8, n),
+        rng.uniform(0.3, 1.5, n),
+    ]).astype(np.float32)
+
+
+def demo_cubes(rng, n):
+    """
+    Как create_demo_scene: центральный куб, кольцо из 4, башня из 5, а
+    остальное - случайные кубы x [-8, 8], y [-3, 3], z [-20, -8], размер [0.2, 0.8].
+    """
+    center = np.array([[0, 0, -12, 1.5]])
+    angle = np.arange(4) / 4 * 2 * math.pi
+    ring = np.column_stack([np.cos(angle) * 3.5, np.zeros(4), np.sin(angle) * 3.5 - 12, np.full(4, 0.5)])
+    tower = np.column_stack([np.full(5, 4.0), np.arange(5) * 1.2 - 2, np.full(5, -15.0), np.full(5, 0.6)])
+    fixed = np.concatenate([center, ring, tower])[:n]
+    rest = n - len(fixed)
+    scattered = np.column_stack([
+        rng.uniform(-8, 8, rest),
+        rng.uniform(-3, 3, rest),
+        rng.uniform(-20, -8, rest),
+        rng.uniform(0.2, 0.8, rest),
+    ])
+    return np.concatenate([fixed, scattered]).astype(np.float32)
+
+
+def make_scene(distribution, n, seed):
+    rng = np.random.default_rng([seed, n])
+    if distribution == "demo":
+        return demo_cubes(rng, n)
+    return random_cubes(rng, n)
+
+
+# === Рендерер ===
+
+def load_renderer(args):
+    """Бэкенд (CPU-рендерер или DLL, если указан путь) с настройками из аргументов"""
+    loaded = backend.load_cpu() if args.dll is None else backend.load_native(args.dll)
+    renderer, functions = loaded.renderer, loaded.functions
+    if args.workers and "SetWorkerCount" in functions:
+        renderer.SetWorkerCount(args.workers)
+    if args.lod_pixels is not None and "SetLodThresholds" in functions:
+        renderer.SetLodThresholds(args.lod_pixels, renderer_cpu.LOD_CLUSTER_PIXELS)
+    return loaded
+
+
+def add_cubes(loaded, cubes):
+    """Все кубы одним AddCubes; у старых DLL без него - по одному через AddCube"""
+    if "AddCubes" in loaded.functions:
+        loaded.renderer.AddCubes(cubes.ctypes.data_as(ctypes.POINTER(ctypes.c_float)), len(cubes))
+        return
+    for x, y, z, size in cubes.tolist():
+        loaded.renderer.AddCube(x, y, z, size)
+
+
+def peak_rss_mb():
+    """Пиковый RSS процесса в МБ (None, если платформа не даёт его узнать)"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 2 ** 20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS - байты
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+# === Замеры ===
+
+def run_case(loaded, distribution, n, engine, args):
+    renderer = loaded.renderer
+    cubes = np.ascontiguousarray(make_scene(distribution, n, args.seed))
+
+    insert_times, clear_times = [], []
+    for _ in range(args.repeat):
+        renderer.InitRenderer3D(args.width, args.height)
+        started = time.perf_counter()
+        add_cubes(loaded, cubes)
+        insert_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        renderer.ClearScene()
+        clear_times.append(time.perf_counter() - started)
+
+    # Орбита: камера делает полный оборот за args.frames кадров
+    renderer.InitRenderer3D(args.width, args.height)
+    add_cubes(loaded, cubes)
+    renderer.ResetCamera()
+    renderer.RenderFrame()  # прогрев (ленивое построение BVH и т.п.)
+    step = 2 * math.pi / args.frames
+    frame_times = np.empty(args.frames)
+    impostors = 0
+    for i in range(args.frames):
+        started = time.perf_counter()
+        renderer.RotateCamera(step, 0.0)
+        renderer.RenderFrame()
+        frame_times[i] = time.perf_counter() - started
+        if "GetImpostorCount" in loaded.functions:
+            impostors += renderer.GetImpostorCount()
+    renderer.ClearScene()
+
+    insert = min(insert_times)
+    return {
+        "distribution": distribution,
+        "cubes": n,
+        "engine": engine,
+        "insert_ms": insert * 1000,
+        "insert_cubes_per_sec": n / insert if insert > 0 else float("inf"),
+        "frame_ms_mean": float(frame_times.mean() * 1000),
+        "frame_ms_p50": float(np.percentile(frame_times, 50) * 1000),
+        "frame_ms_p95": float(np.percentile(frame_times, 95) * 1000),
+        "impostors_mean": impostors / args.frames,
+        "clear_ms": min(clear_times) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def measure_case(distribution, n, engine, args):
+    """Один случай в свежем процессе: свой рендерер и свой пиковый RSS"""
+    loaded = load_renderer(args)
+    if "SetRenderEngine" in loaded.functions:
+        loaded.renderer.SetRenderEngine(renderer_cpu.ENGINE_NAMES.index(engine))
+    result = run_case(loaded, distribution, n, engine, args)
+    loaded.renderer.CloseRenderer3D()
+    return result
+
+
+def run(args):
+    loaded = load_renderer(args)
+    renderer = loaded.renderer
+    workers = renderer.GetWorkerCount() if "GetWorkerCount" in loaded.functions else None
+    engines = args.engines
+    if "SetRenderEngine" not in loaded.functions:
+        if engines != ["raster"]:
+            print("⚠️ Рендерер умеет только растеризацию - движок лучей пропущен", file=sys.stderr)
+        engines = ["raster"]
+    renderer.CloseRenderer3D()
+
+    results = []
+    # spawn: процесс случая не наследует память родителя и прошлых случаев
+    context = multiprocessing.get_context("spawn")
+    for distribution in args.distributions:
+        for n in sorted(args.sizes):
+            for engine in engines:
+                with context.Pool(1) as pool:
+                    result = pool.apply(measure_case, (distribution, n, engine, args))
+                results.append(result)
+                print(f"✅ {distribution:>6} {n:>8} {engine:>7}: {result['insert_cubes_per_sec']:>12.0f} куб/с, "
+                      f"кадр {result['frame_ms_mean']:8.2f} мс (p95 {result['frame_ms_p95']:.2f}), "
+                      f"очистка {result['clear_ms']:.3f} мс", file=sys.stderr)
+    return {
+        "meta": {
+            "backend": loaded.name,
+            "seed": args.seed,
+            "frames": args.frames,
+            "repeat": args.repeat,
+            "resolution": [args.width, args.height],
+            "workers": workers,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Список регрессий: метрики, ухудшившиеся больше чем на tolerance"""
+    # Отчёты без движка - растеризация
+    base = {(r["distribution"], r["cubes"], r.get("engine", "raster")): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = base.get((result["distribution"], result["cubes"], result["engine"]))
+        if old is None:
+            continue
+        for metric in COMPARED_METRICS:
+            new_value, old_value = result.get(metric), old.get(metric)
+            if new_value is None or old_value is None or old_value == 0:
+                continue
+            if metric in HIGHER_IS_BETTER:
+                change = (old_value - new_value) / old_value
+            else:
+                change = (new_value - old_value) / old_value
+            # Для скорости вставки шум оцениваем по её времени
+            time_metric = "insert_ms" if metric == "insert_cubes_per_sec" else metric
+            if "_ms" in time_metric and abs(result[time_metric] - old[time_metric]) < NOISE_FLOOR_MS:
+                continue
+            if change > tolerance:
+                regressions.append({
+                    "distribution": result["distribution"],
+                    "cubes": result["cubes"],
+                    "engine": result["engine"],
+                    "metric": metric,
+                    "baseline": old_value,
+                    "current": new_value,
+                    "change": change,
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Безоконный бенчмарк 3D рендерера")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--distributions", nargs="+", choices=DISTRIBUTIONS, default=DISTRIBUTIONS)
+    parser.add_argument("--frames", type=int, default=30, help="кадров на полный оборот камеры")
+    parser.add_argument("--repeat", type=int, default=3, help="повторов вставки/очистки (берётся лучший)")
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--workers", type=int, help="процессов растеризации CPU-рендерера")
+    parser.add_argument("--engines", nargs="+", choices=renderer_cpu.ENGINE_NAMES, default=["raster"],
+                        help="движки рисования кубов CPU-рендерера")
+    parser.add_argument("--lod-pixels", type=float, help="порог LOD в пикселях (0 - выключить)")
+    parser.add_argument("--dll", help="путь к renderer3d.dll (по умолчанию CPU-рендерер)")
+    parser.add_argument("--output", help="файл для JSON (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="допустимое ухудшение (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.tolerance)
+        for r in report["regressions"]:
+            print(f"❌ Регрессия {r['distribution']} {r['cubes']} {r['engine']} {r['metric']}: "
+                  f"{r['baseline']:.3f} -> {r['current']:.3f} ({r['change'] * 100:+.1f}%)", file=sys.stderr)
+        if not report["regressions"]:
+            print("✅ Регрессий нет", file=sys.stderr)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
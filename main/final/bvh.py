@@ -0,0 +1,270 @@
+"""
+Иерархия ограничивающих объёмов (BVH) над AABB кубов для отсечения по
+пирамиде видимости.
+
+Кубы сортируются по коду Мортона центров и режутся на листья по LEAF_SIZE
+подряд идущих кубов; над листьями строится неявное бинарное дерево
+(узел i уровня k покрывает листья [i * 2^k, (i + 1) * 2^k)). Каждый узел -
+это непрерывный диапазон отсортированных кубов, поэтому целиком видимый
+узел отдаётся одним срезом. Построение, дополнение и обход выполняются
+пакетно по уровням средствами NumPy.
+"""
+import numpy as np
+
+LEAF_SIZE = 32
+
+# Перестройка, когда дописанных после построения кубов больше, чем построенных
+REBUILD_MIN = 4096
+
+
+def frustum_planes(view_proj):
+    """Плоскости пирамиды видимости (6, 4) из матрицы view-projection: n.p + d >= 0"""
+    m = np.asarray(view_proj, dtype=np.float64)
+    planes = np.array([
+        m[3] + m[0], m[3] - m[0],
+        m[3] + m[1], m[3] - m[1],
+        m[3] + m[2], m[3] - m[2],
+    ])
+    planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    return planes.astype(np.float32)
+
+
+def morton_codes(points):
+    """30-битные коды Мортона точек (N, 3) в пределах их ограничивающего ящика"""
+    lo = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lo, 1e-6)
+    q = ((points - lo) / extent * 1023).astype(np.uint32)
+
+    def spread(v):
+        v = (v | (v << 16)) & 0x030000ff
+        v = (v | (v << 8)) & 0x0300f00f
+        v = (v | (v << 4)) & 0x030c30c3
+        v = (v | (v << 2)) & 0x09249249
+        return v
+
+    return spread(q[:, 0]) | (spread(q[:, 1]) << 1) | (spread(q[:, 2]) << 2)
+
+
+def classify_boxes(mins, maxs, planes):
+    """
+    Классифицирует AABB относительно пирамиды.
+    Возвращает (outside, inside): целиком снаружи / целиком внутри.
+    """
+    center = (mins + maxs) * 0.5
+    extent = (maxs - mins) * 0.5
+    dist = center @ planes[:, :3].T + planes[:, 3]
+    radius = extent @ np.abs(planes[:, :3]).T
+    outside = (dist < -radius).any(axis=1)
+    inside = (dist >= radius).all(axis=1)
+    return outside, inside
+
+
+class CubeBVH:
+    """BVH над кубами рендерера: дописывается на AddCube, перестраивается лениво"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.order = np.zeros(0, dtype=np.int32)  # индексы кубов в порядке листьев
+        self.levels = []  # [(mins, maxs)] от листьев к корню
+        self.sizes = []  # число узлов на каждом уровне
+        self.count = 0
+        self.built_count = 0
+        self.needs_rebuild = False
+        self.nodes_visited = 0
+        self._position = None  # обратная к order: позиция куба в листьях
+
+    def append(self, cubes, start):
+        """
+        Дописывает кубы cubes[start:] (после AddCube/AddCubes) в хвост дерева и
+        обновляет рамки только затронутых узлов - по одному диапазону на уровень.
+        """
+        new = np.arange(start, len(cubes), dtype=np.int32)
+        if len(new) == 0:
+            return
+        if self.count == 0 or len(new) + self.count - self.built_count > max(self.built_count, REBUILD_MIN):
+            # Дерево пустое или разрослось вдвое - дешевле перестроить перед кадром
+            self.needs_rebuild = True
+            self.count = len(cubes)
+            return
+        if self.needs_rebuild:
+            self.count = len(cubes)
+            return
+
+        # Новая пачка сортируется сама по себе, чтобы её листья были компактными
+        new = new[np.argsort(morton_codes(cubes[new, :3]))]
+        first_leaf = self.count // LEAF_SIZE
+        end = self.count + len(new)
+        if end > len(self.order):
+            grown = np.empty(max(end, 2 * len(self.order)), dtype=np.int32)
+            grown[:self.count] = self.order[:self.count]
+            self.order = grown
+        self.order[self.count:end] = new
+        self.count = end
+        self._position = None
+        self._refit(cubes, first_leaf)
+
+    def update(self, cubes, changed):
+        """Кубы changed сдвинулись или сменили размер: пересчёт их листьев и предков"""
+        if self.needs_rebuild or self.count != len(cubes) or not self.levels:
+            return  # дерево и так перестроится перед кадром
+        leaves = np.unique(self._positions()[changed] // LEAF_SIZE)
+        self._refit_nodes(cubes, leaves)
+
+    def truncate(self, cubes, count):
+        """
+        Удаляет из дерева кубы с индексами >= count (cubes - уже укороченный
+        массив): каждый уходит из своего листа, на его место встаёт последний
+        куб дерева, и пересчитываются только задетые листья и их предки.
+        """
+        removed = self.count - count
+        if removed <= 0:
+            return
+        if self.needs_rebuild or not self.levels or count == 0 or removed > LEAF_SIZE:
+            self.needs_rebuild = True
+            self.count = count
+            return
+        position = self._positions()
+        touched = []
+        for cube in range(count, self.count):
+            p, tail = position[cube], self.count - 1
+            moved = self.order[tail]
+            self.order[p] = moved
+            position[moved] = p
+            self.count = tail
+            touched.append(p)
+        touched = np.array(touched + [self.count - 1]) // LEAF_SIZE
+        self.built_count = min(self.built_count, self.count)
+
+        # Опустевшие листья уходят с конца каждого уровня
+        size = -(-self.count // LEAF_SIZE)
+        for level in range(len(self.sizes)):
+            self.sizes[level] = size
+            if size == 1:
+                del self.levels[level + 1:], self.sizes[level + 1:]
+                break
+            size = -(-size // 2)
+        self._refit_nodes(cubes, np.unique(touched[touched < self.sizes[0]]))
+
+    def build(self, cubes):
+        self.count = len(cubes)
+        self.built_count = self.count
+        self.needs_rebuild = False
+        if self.count == 0:
+            self.order = np.zeros(0, dtype=np.int32)
+            self.levels, self.sizes = [], []
+            return
+        self.order = np.argsort(morton_codes(cubes[:, :3])).astype(np.int32)
+        self._position = None
+        self.levels, self.sizes = [], []
+        self._refit(cubes, 0)
+
+    def query(self, cubes, planes):
+        """Индексы кубов, чьи узлы BVH пересекают пирамиду видимости"""
+        if self.needs_rebuild or self.count != len(cubes):
+            self.build(cubes)
+        self.nodes_visited = 0
+        if self.count == 0:
+            return np.zeros(0, dtype=np.int32)
+
+        ranges = []
+        top = len(self.levels) - 1
+        frontier = np.zeros(1, dtype=np.int64)
+        for level in range(top, -1, -1):
+            mins, maxs = self.levels[level]
+            self.nodes_visited += len(frontier)
+            outside, inside = classify_boxes(mins[frontier], maxs[frontier], planes)
+            # Листья, задетые частично, тоже берём целиком - точный тест дальше по кубам
+            accept = inside if level > 0 else ~outside
+            if accept.any():
+                nodes = frontier[accept]
+                ranges.append((nodes << level) * LEAF_SIZE)
+                ranges.append(((nodes + 1) << level) * LEAF_SIZE)
+            if level == 0:
+                break
+            split = frontier[~outside & ~inside]
+            children = np.stack([split * 2, split * 2 + 1], axis=1).ravel()
+            frontier = children[children < self.sizes[level - 1]]
+            if len(frontier) == 0:
+                break
+
+        if not ranges:
+            return np.zeros(0, dtype=np.int32)
+        starts = np.concatenate(ranges[0::2])
+        ends = np.minimum(np.concatenate(ranges[1::2]), self.count)
+        lengths = ends - starts
+        total = int(lengths.sum())
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return self.order[np.repeat(starts, lengths) + offsets]
+
+    def _positions(self):
+        if self._position is None:
+            self._position = np.empty(len(self.order), dtype=np.int32)
+            self._position[self.order[:self.count]] = np.arange(self.count, dtype=np.int32)
+        return self._position
+
+    def _refit_nodes(self, cubes, leaves):
+        """Пересчитывает рамки листьев leaves (отсортированы, без повторов) и их предков"""
+        slots = leaves[:, None] * LEAF_SIZE + np.arange(LEAF_SIZE)
+        items = cubes[self.order[np.minimum(slots, self.count - 1)]]
+        half = items[..., 3:4] * 0.5
+        inside = (slots < self.count)[..., None]
+        node_mins = np.where(inside, items[..., :3] - half, np.inf).min(axis=1)
+        node_maxs = np.where(inside, items[..., :3] + half, -np.inf).max(axis=1)
+        mins, maxs = self.levels[0]
+        mins[leaves], maxs[leaves] = node_mins, node_maxs
+        nodes = leaves
+        for level in range(1, len(self.levels)):
+            nodes = np.unique(nodes // 2)
+            below_mins, below_maxs = self.levels[level - 1]
+            right = np.minimum(nodes * 2 + 1, self.sizes[level - 1] - 1)
+            mins, maxs = self.levels[level]
+            mins[nodes] = np.minimum(below_mins[nodes * 2], below_mins[right])
+            maxs[nodes] = np.maximum(below_maxs[nodes * 2], below_maxs[right])
+
+    def _refit(self, cubes, first_leaf):
+        """Пересчитывает рамки листьев начиная с first_leaf и их предков"""
+        n_leaves = -(-self.count // LEAF_SIZE)
+        items = cubes[self.order[first_leaf * LEAF_SIZE:self.count]]
+        half = items[:, 3:4] * 0.5
+        padded = (n_leaves - first_leaf) * LEAF_SIZE
+        mins = np.full((padded, 3), np.inf, dtype=np.float32)
+        maxs = np.full((padded, 3), -np.inf, dtype=np.float32)
+        mins[:len(items)] = items[:, :3] - half
+        maxs[:len(items)] = items[:, :3] + half
+        tail_mins = mins.reshape(-1, LEAF_SIZE, 3).min(axis=1)
+        tail_maxs = maxs.reshape(-1, LEAF_SIZE, 3).max(axis=1)
+
+        # На каждом уровне меняется только хвост узлов начиная с first;
+        # массивы уровней растут с запасом и дописываются на месте
+        level, first = 0, first_leaf
+        while True:
+            size = first + len(tail_mins)
+            if level == len(self.levels):
+                self.levels.append((tail_mins, tail_maxs))
+                self.sizes.append(size)
+            else:
+                mins, maxs = self.levels[level]
+                if size > len(mins):
+                    capacity = max(size, 2 * len(mins))
+                    mins = np.concatenate([mins[:first], np.empty((capacity - first, 3), np.float32)])
+                    maxs = np.concatenate([maxs[:first], np.empty((capacity - first, 3), np.float32)])
+                    self.levels[level] = (mins, maxs)
+                mins[first:size] = tail_mins
+                maxs[first:size] = tail_maxs
+                self.sizes[level] = size
+                tail_mins, tail_maxs = mins[:size], maxs[:size]
+            if size == 1:
+                del self.levels[level + 1:], self.sizes[level + 1:]
+                return
+
+            # Родители хвоста: пары соседних узлов сводятся в один
+            first = (first // 2) * 2
+            child_mins, child_maxs = tail_mins[first:], tail_maxs[first:]
+            if len(child_mins) % 2:
+                child_mins = np.concatenate([child_mins, np.full((1, 3), np.inf, np.float32)])
+                child_maxs = np.concatenate([child_maxs, np.full((1, 3), -np.inf, np.float32)])
+            tail_mins = np.minimum(child_mins[0::2], child_mins[1::2])
+            tail_maxs = np.maximum(child_maxs[0::2], child_maxs[1::2])
+            level, first = level + 1, first // 2
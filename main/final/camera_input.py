@@ -0,0 +1,73 @@
+"""
+Накопитель ввода камеры между кадрами.
+
+Обработчики мыши и колеса только прибавляют сдвиг к накопленному; раз в
+кадр take() отдаёт одну CameraDelta - сколько бы событий ни пришло
+(тачпады с высоким разрешением шлют десятки событий на кадр). Со
+сглаживанием накопленное отдаётся не сразу, а долей 1 - exp(-dt / smoothing)
+за кадр, и камера плавно догоняет ввод.
+"""
+import math
+import time
+
+import numpy as np
+
+from render_queue import CameraDelta
+
+# Шаг колеса в единицах angleDelta (одна ступень обычной мыши - 15 градусов)
+WHEEL_STEP = 120
+
+# Меньше этого остаток сглаживания отдаётся целиком
+SETTLE_EPSILON = 1e-4
+
+# Дольше этого промежуток между кадрами не считается (после простоя
+# первый кадр иначе отдал бы весь сдвиг сразу)
+MAX_FRAME_TIME = 1 / 30
+
+
+class CameraInput:
+    """Сдвиги камеры от событий ввода -> одна CameraDelta на кадр"""
+
+    def __init__(self, smoothing=0.0):
+        self.smoothing = smoothing  # постоянная времени сглаживания, с; 0 - без сглаживания
+        self.pending = np.zeros(len(CameraDelta._fields))
+        self.events = 0  # событий слито в последнюю CameraDelta
+        self._events = 0
+        self._last_take = None
+
+    @property
+    def active(self):
+        """Есть ли ещё не отданный камере сдвиг"""
+        return bool(np.any(self.pending))
+
+    def add(self, rotate_x=0.0, rotate_y=0.0, move_x=0.0, move_y=0.0, zoom=0.0):
+        self.pending += (rotate_x, rotate_y, move_x, move_y, zoom)
+        self._events += 1
+
+    def add_wheel(self, angle_delta, step=0.3):
+        """Колесо: step на ступень WHEEL_STEP, дробные события тачпада - пропорционально"""
+        # Вверх (delta > 0) - приближение, у DLL это отрицательный zoom
+        self.add(zoom=-step * angle_delta / WHEEL_STEP)
+
+    def take(self, now=None):
+        """CameraDelta для этого кадра или None, если камера не сдвинулась"""
+        if now is None:
+            now = time.perf_counter()
+        last, self._last_take = self._last_take, now
+        if not self.active:
+            return None
+        if self.smoothing > 0:
+            dt = MAX_FRAME_TIME if last is None else min(now - last, MAX_FRAME_TIME)
+            part = self.pending * (1.0 - math.exp(-dt / self.smoothing))
+            if np.all(np.abs(self.pending - part) < SETTLE_EPSILON):
+                part = self.pending.copy()
+        else:
+            part = self.pending.copy()
+        self.pending -= part
+        self.pending[np.abs(self.pending) < SETTLE_EPSILON / 2] = 0.0
+        self.events, self._events = self._events, 0
+        return CameraDelta(*part.tolist())
+
+    def clear(self):
+        self.pending[:] = 0
+        self._events = 0
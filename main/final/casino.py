@@ -0,0 +1,860 @@
+"""
+Секретное казино: слот-машина и блэкджек на монеты.
+
+Модуль импортируется только при первом открытии казино, чтобы не
+замедлять запуск рендерера.
+"""
+import random
+
+from PyQt6 import QtWidgets, QtCore
+
+class SlotMachineWindow(QtWidgets.QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("🎰 Казино 3D Рендерера")
+        self.setFixedSize(400, 380)  # Увеличил высоту для кнопки блэкджека
+        self.coins = 100  # Устанавливаем монеты ПЕРЕД инициализацией UI
+        
+        # Для анимации
+        self.animation_timer = QtCore.QTimer()
+        self.animation_timer.timeout.connect(self.animate_reels)
+        self.animation_counter = 0
+        self.final_result = []
+        self.symbols = ["🍒", "🍋", "🍊", "🍇", "💎", "⭐", "🎯", "🔥"]
+        
+        self.init_ui()
+        
+    def init_ui(self):
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setSpacing(10)
+        layout.setContentsMargins(15, 15, 15, 15)
+        
+        # Заголовок
+        title = QtWidgets.QLabel("🎰 Слот Машина")
+        title.setStyleSheet("""
+            QLabel {
+                font-size: 18px;
+                font-weight: bold;
+                color: white;
+                background-color: #3498db;
+                padding: 10px;
+                border-radius: 6px;
+                text-align: center;
+            }
+        """)
+        title.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(title)
+        
+        # Счетчик монет
+        self.coins_label = QtWidgets.QLabel(f"💰 Монеты: {self.coins}")
+        self.coins_label.setStyleSheet("""
+            QLabel {
+                font-size: 14px;
+                font-weight: bold;
+                color: white;
+                background-color: #27ae60;
+                padding: 8px;
+                border-radius: 4px;
+                text-align: center;
+            }
+        """)
+        self.coins_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.coins_label)
+        
+        # Барабаны - компактно
+        reels_layout = QtWidgets.QHBoxLayout()
+        reels_layout.setSpacing(8)
+        
+        self.reels = []
+        
+        for i in range(3):
+            reel = QtWidgets.QLabel("🎲")
+            reel.setStyleSheet("""
+                QLabel {
+                    font-size: 32px;
+                    background-color: white;
+                    border: 2px solid #34495e;
+                    border-radius: 6px;
+                    padding: 8px;
+                    text-align: center;
+                    min-width: 60px;
+                    max-width: 60px;
+                    min-height: 60px;
+                    max-height: 60px;
+                }
+            """)
+            reel.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+            self.reels.append(reel)
+            reels_layout.addWidget(reel)
+        
+        layout.addLayout(reels_layout)
+        
+        # Кнопка КРУТИТЬ
+        self.spin_button = QtWidgets.QPushButton("🎰 Крутить! (10 монет)")
+        self.spin_button.clicked.connect(self.spin_reels)
+        self.spin_button.setStyleSheet("""
+            QPushButton {
+                background-color: #e74c3c;
+                color: white;
+                font-weight: bold;
+                font-size: 14px;
+                border: none;
+                border-radius: 6px;
+                padding: 12px;
+            }
+            QPushButton:hover {
+                background-color: #c0392b;
+            }
+            QPushButton:pressed {
+                background-color: #a93226;
+            }
+        """)
+        layout.addWidget(self.spin_button)
+        
+        # Результат
+        self.result_label = QtWidgets.QLabel("Добро пожаловать в казино!")
+        self.result_label.setStyleSheet("""
+            QLabel {
+                font-size: 12px;
+                font-weight: bold;
+                color: #2c3e50;
+                background-color: #ecf0f1;
+                padding: 8px;
+                border-radius: 4px;
+                border: 1px solid #bdc3c7;
+                text-align: center;
+            }
+        """)
+        self.result_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.result_label)
+        
+        # Кнопка перехода к блэкджеку
+        blackjack_button = QtWidgets.QPushButton("🃏 Играть в Блэкджек")
+        blackjack_button.clicked.connect(self.open_blackjack)
+        blackjack_button.setStyleSheet("""
+            QPushButton {
+                background-color: #8e44ad;
+                color: white;
+                font-weight: bold;
+                font-size: 12px;
+                border: none;
+                border-radius: 4px;
+                padding: 8px;
+            }
+            QPushButton:hover {
+                background-color: #7d3c98;
+            }
+        """)
+        layout.addWidget(blackjack_button)
+        
+        # Кнопка закрыть
+        close_button = QtWidgets.QPushButton("❌ Закрыть")
+        close_button.clicked.connect(self.close)
+        close_button.setStyleSheet("""
+            QPushButton {
+                background-color: #95a5a6;
+                color: white;
+                font-weight: bold;
+                font-size: 12px;
+                border: none;
+                border-radius: 4px;
+                padding: 8px;
+            }
+            QPushButton:hover {
+                background-color: #7f8c8d;
+            }
+        """)
+        layout.addWidget(close_button)
+        
+        # Общий стиль окна
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #ffffff;
+                font-family: 'Segoe UI', Arial, sans-serif;
+            }
+        """)
+    
+    def spin_reels(self):
+        if self.coins < 10:
+            self.result_label.setText("❌ Недостаточно монет!")
+            self.result_label.setStyleSheet("""
+                QLabel {
+                    font-size: 12px;
+                    font-weight: bold;
+                    color: white;
+                    background-color: #e74c3c;
+                    padding: 8px;
+                    border-radius: 4px;
+                    text-align: center;
+                }
+            """)
+            return
+            
+        self.coins -= 10
+        self.update_coins_display()
+        
+        # Отключаем кнопку во время анимации
+        self.spin_button.setEnabled(False)
+        self.result_label.setText("🎰 Крутим...")
+        self.result_label.setStyleSheet("""
+            QLabel {
+                font-size: 12px;
+                font-weight: bold;
+                color: #2c3e50;
+                background-color: #f39c12;
+                padding: 8px;
+                border-radius: 4px;
+                text-align: center;
+            }
+        """)
+        
+        # Генерируем финальный результат
+        self.final_result = [random.choice(self.symbols) for _ in range(3)]
+        
+        # Запускаем анимацию
+        self.animation_counter = 0
+        self.animation_timer.start(100)  # Обновляем каждые 100мс
+        
+    def animate_reels(self):
+        """Анимация кручения барабанов"""
+        # Показываем случайные символы во время анимации
+        for i, reel in enumerate(self.reels):
+            # Первые 20 итераций - быстрая смена символов
+            if self.animation_counter < 20:
+                reel.setText(random.choice(self.symbols))
+                # Добавляем эффект "кручения" - меняем стиль
+                reel.setStyleSheet("""
+                    QLabel {
+                        font-size: 32px;
+                        background-color: #f39c12;
+                        border: 3px solid #e67e22;
+                        border-radius: 6px;
+                        padding: 8px;
+                        text-align: center;
+                        min-width: 60px;
+                        max-width: 60px;
+                        min-height: 60px;
+                        max-height: 60px;
+                    }
+                """)
+            # Барабаны останавливаются по очереди
+            elif self.animation_counter == 20 + i * 5:
+                reel.setText(self.final_result[i])
+                # Возвращаем обычный стиль
+                reel.setStyleSheet("""
+                    QLabel {
+                        font-size: 32px;
+                        background-color: white;
+                        border: 2px solid #27ae60;
+                        border-radius: 6px;
+                        padding: 8px;
+                        text-align: center;
+                        min-width: 60px;
+                        max-width: 60px;
+                        min-height: 60px;
+                        max-height: 60px;
+                    }
+                """)
+        
+        self.animation_counter += 1
+        
+        # Останавливаем анимацию после того как все барабаны остановились
+        if self.animation_counter >= 35:  # 20 + 3*5 = 35
+            self.animation_timer.stop()
+            self.finish_spin()
+    
+    def finish_spin(self):
+        """Завершаем спин и показываем результат"""
+        # Проверяем выигрыш
+        winnings = self.check_winnings(self.final_result)
+        self.coins += winnings
+        self.update_coins_display()
+        
+        # Возвращаем обычный стиль барабанам
+        for reel in self.reels:
+            reel.setStyleSheet("""
+                QLabel {
+                    font-size: 32px;
+                    background-color: white;
+                    border: 2px solid #34495e;
+                    border-radius: 6px;
+                    padding: 8px;
+                    text-align: center;
+                    min-width: 60px;
+                    max-width: 60px;
+                    min-height: 60px;
+                    max-height: 60px;
+                }
+            """)
+        
+        if winnings > 0:
+            self.result_label.setText(f"🎉 Выиграли {winnings} монет! 🎉")
+            self.result_label.setStyleSheet("""
+                QLabel {
+                    font-size: 12px;
+                    font-weight: bold;
+                    color: white;
+                    background-color: #27ae60;
+                    padding: 8px;
+                    border-radius: 4px;
+                    text-align: center;
+                }
+            """)
+            
+            # Анимация выигрыша - мигание барабанов
+            QtCore.QTimer.singleShot(500, self.flash_winning_reels)
+        else:
+            self.result_label.setText("😢 В этот раз не повезло...")
+            self.result_label.setStyleSheet("""
+                QLabel {
+                    font-size: 12px;
+                    font-weight: bold;
+                    color: #2c3e50;
+                    background-color: #ecf0f1;
+                    padding: 8px;
+                    border-radius: 4px;
+                    border: 1px solid #bdc3c7;
+                    text-align: center;
+                }
+            """)
+            
+        # Включаем кнопку обратно
+        self.spin_button.setEnabled(True)
+    
+    def flash_winning_reels(self):
+        """Мигание барабанов при выигрыше"""
+        for reel in self.reels:
+            reel.setStyleSheet("""
+                QLabel {
+                    font-size: 32px;
+                    background-color: #f1c40f;
+                    border: 3px solid #f39c12;
+                    border-radius: 6px;
+                    padding: 8px;
+                    text-align: center;
+                    min-width: 60px;
+                    max-width: 60px;
+                    min-height: 60px;
+                    max-height: 60px;
+                }
+            """)
+        
+        # Возвращаем обычный стиль через полсекунды
+        QtCore.QTimer.singleShot(500, lambda: self.restore_normal_reels())
+    
+    def restore_normal_reels(self):
+        """Возвращаем обычный стиль барабанам"""
+        for reel in self.reels:
+            reel.setStyleSheet("""
+                QLabel {
+                    font-size: 32px;
+                    background-color: white;
+                    border: 2px solid #34495e;
+                    border-radius: 6px;
+                    padding: 8px;
+                    text-align: center;
+                    min-width: 60px;
+                    max-width: 60px;
+                    min-height: 60px;
+                    max-height: 60px;
+                }
+            """)
+        
+    def check_winnings(self, result):
+        """Проверяет выигрышные комбинации"""
+        # Джекпот - все символы одинаковые
+        if result[0] == result[1] == result[2]:
+            if result[0] == "💎":
+                return 1000  # Джекпот бриллианты
+            elif result[0] == "⭐":
+                return 500   # Звезды
+            elif result[0] == "🔥":
+                return 300   # Огонь
+            else:
+                return 100   # Другие тройки
+                
+        # Пара символов
+        elif result[0] == result[1] or result[1] == result[2] or result[0] == result[2]:
+            if "💎" in result:
+                return 50
+            elif "⭐" in result:
+                return 30
+            else:
+                return 20
+                
+        return 0
+        
+    def update_coins_display(self):
+        self.coins_label.setText(f"💰 Монеты: {self.coins}")
+        if self.coins < 10:
+            self.coins_label.setStyleSheet("""
+                QLabel {
+                    font-size: 14px;
+                    font-weight: bold;
+                    color: white;
+                    background-color: #e74c3c;
+                    padding: 8px;
+                    border-radius: 4px;
+                    text-align: center;
+                }
+            """)
+        else:
+            self.coins_label.setStyleSheet("""
+                QLabel {
+                    font-size: 14px;
+                    font-weight: bold;
+                    color: white;
+                    background-color: #27ae60;
+                    padding: 8px;
+                    border-radius: 4px;
+                    text-align: center;
+                }
+            """)
+
+    def open_blackjack(self):
+        """Открывает игру в блэкджек с текущими монетами"""
+        blackjack_window = BlackjackWindow(self, self.coins)
+        result = blackjack_window.exec()
+        if result:
+            # Обновляем монеты после игры в блэкджек
+            self.coins = blackjack_window.coins
+            self.update_coins_display()
+
+class BlackjackWindow(QtWidgets.QDialog):
+    def __init__(self, parent=None, coins=100):
+        super().__init__(parent)
+        self.setWindowTitle("🃏 Блэкджек")
+        self.setFixedSize(500, 600)
+        self.coins = coins
+        self.bet = 0
+        self.player_cards = []
+        self.dealer_cards = []
+        self.game_in_progress = False
+        self.dealer_hidden = True
+        
+        # Колода карт
+        self.deck = self.create_deck()
+        random.shuffle(self.deck)
+        
+        self.init_ui()
+        
+    def create_deck(self):
+        """Создает колоду карт"""
+        suits = ['♠', '♥', '♦', '♣']
+        ranks = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
+        deck = []
+        for suit in suits:
+            for rank in ranks:
+                deck.append(f"{rank}{suit}")
+        return deck
+        
+    def init_ui(self):
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setSpacing(10)
+        layout.setContentsMargins(15, 15, 15, 15)
+        
+        # Заголовок
+        title = QtWidgets.QLabel("🃏 Блэкджек")
+        title.setStyleSheet("""
+            QLabel {
+                font-size: 18px;
+                font-weight: bold;
+                color: white;
+                background-color: #2c3e50;
+                padding: 10px;
+                border-radius: 6px;
+                text-align: center;
+            }
+        """)
+        title.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(title)
+        
+        # Счетчик монет
+        self.coins_label = QtWidgets.QLabel(f"💰 Монеты: {self.coins}")
+        self.coins_label.setStyleSheet("""
+            QLabel {
+                font-size: 14px;
+                font-weight: bold;
+                color: white;
+                background-color: #27ae60;
+                padding: 8px;
+                border-radius: 4px;
+                text-align: center;
+            }
+        """)
+        self.coins_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.coins_label)
+        
+        # Ставка
+        bet_layout = QtWidgets.QHBoxLayout()
+        bet_label = QtWidgets.QLabel("Ставка:")
+        bet_label.setStyleSheet("font-weight: bold; font-size: 14px;")
+        bet_layout.addWidget(bet_label)
+        
+        self.bet_slider = QtWidgets.QSlider(QtCore.Qt.Orientation.Horizontal)
+        self.bet_slider.setRange(10, min(100, self.coins))
+        self.bet_slider.setValue(10)
+        self.bet_value_label = QtWidgets.QLabel("10")
+        self.bet_slider.valueChanged.connect(lambda v: self.bet_value_label.setText(str(v)))
+        
+        bet_layout.addWidget(self.bet_slider)
+        bet_layout.addWidget(self.bet_value_label)
+        layout.addLayout(bet_layout)
+        
+        # Карты дилера
+        dealer_label = QtWidgets.QLabel("🎩 Дилер:")
+        dealer_label.setStyleSheet("font-weight: bold; font-size: 14px; color: #e74c3c;")
+        layout.addWidget(dealer_label)
+        
+        self.dealer_cards_label = QtWidgets.QLabel("🂠 🂠")
+        self.dealer_cards_label.setStyleSheet("""
+            QLabel {
+                font-size: 24px;
+                background-color: #2c3e50;
+                color: white;
+                padding: 10px;
+                border-radius: 6px;
+                text-align: center;
+                min-height: 40px;
+            }
+        """)
+        self.dealer_cards_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.dealer_cards_label)
+        
+        self.dealer_score_label = QtWidgets.QLabel("Очки: ?")
+        self.dealer_score_label.setStyleSheet("font-weight: bold; text-align: center;")
+        self.dealer_score_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.dealer_score_label)
+        
+        # Карты игрока
+        player_label = QtWidgets.QLabel("👤 Ваши карты:")
+        player_label.setStyleSheet("font-weight: bold; font-size: 14px; color: #3498db;")
+        layout.addWidget(player_label)
+        
+        self.player_cards_label = QtWidgets.QLabel("🂠 🂠")
+        self.player_cards_label.setStyleSheet("""
+            QLabel {
+                font-size: 24px;
+                background-color: #3498db;
+                color: white;
+                padding: 10px;
+                border-radius: 6px;
+                text-align: center;
+                min-height: 40px;
+            }
+        """)
+        self.player_cards_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.player_cards_label)
+        
+        self.player_score_label = QtWidgets.QLabel("Очки: 0")
+        self.player_score_label.setStyleSheet("font-weight: bold; text-align: center;")
+        self.player_score_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.player_score_label)
+        
+        # Кнопки управления игрой
+        game_buttons_layout = QtWidgets.QHBoxLayout()
+        
+        self.start_button = QtWidgets.QPushButton("🎮 Начать игру")
+        self.start_button.clicked.connect(self.start_game)
+        self.start_button.setStyleSheet("""
+            QPushButton {
+                background-color: #27ae60;
+                color: white;
+                font-weight: bold;
+                font-size: 12px;
+                border: none;
+                border-radius: 4px;
+                padding: 10px;
+            }
+            QPushButton:hover {
+                background-color: #229954;
+            }
+        """)
+        game_buttons_layout.addWidget(self.start_button)
+        
+        self.hit_button = QtWidgets.QPushButton("🃏 Еще карту")
+        self.hit_button.clicked.connect(self.hit)
+        self.hit_button.setEnabled(False)
+        self.hit_button.setStyleSheet("""
+            QPushButton {
+                background-color: #f39c12;
+                color: white;
+                font-weight: bold;
+                font-size: 12px;
+                border: none;
+                border-radius: 4px;
+                padding: 10px;
+            }
+            QPushButton:hover {
+                background-color: #e67e22;
+            }
+            QPushButton:disabled {
+                background-color: #bdc3c7;
+            }
+        """)
+        game_buttons_layout.addWidget(self.hit_button)
+        
+        self.stand_button = QtWidgets.QPushButton("🛑 Остановиться")
+        self.stand_button.clicked.connect(self.stand)
+        self.stand_button.setEnabled(False)
+        self.stand_button.setStyleSheet("""
+            QPushButton {
+                background-color: #e74c3c;
+                color: white;
+                font-weight: bold;
+                font-size: 12px;
+                border: none;
+                border-radius: 4px;
+                padding: 10px;
+            }
+            QPushButton:hover {
+                background-color: #c0392b;
+            }
+            QPushButton:disabled {
+                background-color: #bdc3c7;
+            }
+        """)
+        game_buttons_layout.addWidget(self.stand_button)
+        
+        layout.addLayout(game_buttons_layout)
+        
+        # Результат игры
+        self.result_label = QtWidgets.QLabel("Сделайте ставку и начните игру!")
+        self.result_label.setStyleSheet("""
+            QLabel {
+                font-size: 14px;
+                font-weight: bold;
+                color: #2c3e50;
+                background-color: #ecf0f1;
+                padding: 10px;
+                border-radius: 6px;
+                border: 1px solid #bdc3c7;
+                text-align: center;
+            }
+        """)
+        self.result_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.result_label)
+        
+        # Кнопка закрыть
+        close_button = QtWidgets.QPushButton("❌ Назад к слотам")
+        close_button.clicked.connect(self.accept)
+        close_button.setStyleSheet("""
+            QPushButton {
+                background-color: #95a5a6;
+                color: white;
+                font-weight: bold;
+                font-size: 12px;
+                border: none;
+                border-radius: 4px;
+                padding: 8px;
+            }
+            QPushButton:hover {
+                background-color: #7f8c8d;
+            }
+        """)
+        layout.addWidget(close_button)
+        
+        # Общий стиль окна
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #ffffff;
+                font-family: 'Segoe UI', Arial, sans-serif;
+            }
+        """)
+        
+    def start_game(self):
+        """Начинает новую игру"""
+        if self.coins < 10:
+            self.result_label.setText("❌ Недостаточно монет для игры!")
+            return
+            
+        self.bet = self.bet_slider.value()
+        if self.bet > self.coins:
+            self.result_label.setText("❌ Ставка больше доступных монет!")
+            return
+            
+        self.coins -= self.bet
+        self.update_coins_display()
+        
+        # Сброс игры
+        self.player_cards = []
+        self.dealer_cards = []
+        self.game_in_progress = True
+        self.dealer_hidden = True
+        
+        # Раздача карт
+        self.player_cards.append(self.deal_card())
+        self.dealer_cards.append(self.deal_card())
+        self.player_cards.append(self.deal_card())
+        self.dealer_cards.append(self.deal_card())
+        
+        self.update_display()
+        
+        # Проверка на блэкджек
+        if self.calculate_score(self.player_cards) == 21:
+            self.dealer_hidden = False
+            self.update_display()
+            if self.calculate_score(self.dealer_cards) == 21:
+                self.end_game("🟡 Ничья! Блэкджек у обоих!", self.bet)
+            else:
+                self.end_game("🎉 БЛЭКДЖЕК! Вы выиграли!", int(self.bet * 2.5))
+            return
+            
+        # Активируем кнопки
+        self.start_button.setEnabled(False)
+        self.hit_button.setEnabled(True)
+        self.stand_button.setEnabled(True)
+        
+        self.result_label.setText(f"💰 Ставка: {self.bet} монет. Ваш ход!")
+        
+    def deal_card(self):
+        """Раздает карту из колоды"""
+        if len(self.deck) < 10:
+            self.deck = self.create_deck()
+            random.shuffle(self.deck)
+        return self.deck.pop()
+        
+    def calculate_score(self, cards):
+        """Подсчитывает очки руки"""
+        score = 0
+        aces = 0
+        
+        for card in cards:
+            rank = card[:-1]  # Убираем масть
+            if rank in ['J', 'Q', 'K']:
+                score += 10
+            elif rank == 'A':
+                aces += 1
+                score += 11
+            else:
+                score += int(rank)
+        
+        # Обработка тузов
+        while score > 21 and aces > 0:
+            score -= 10
+            aces -= 1
+            
+        return score
+        
+    def update_display(self):
+        """Обновляет отображение карт и очков"""
+        # Карты игрока
+        player_display = " ".join(self.player_cards)
+        self.player_cards_label.setText(player_display)
+        player_score = self.calculate_score(self.player_cards)
+        self.player_score_label.setText(f"Очки: {player_score}")
+        
+        # Карты дилера
+        if self.dealer_hidden and len(self.dealer_cards) > 0:
+            dealer_display = f"🂠 {self.dealer_cards[1] if len(self.dealer_cards) > 1 else ''}"
+            self.dealer_score_label.setText("Очки: ?")
+        else:
+            dealer_display = " ".join(self.dealer_cards)
+            dealer_score = self.calculate_score(self.dealer_cards)
+            self.dealer_score_label.setText(f"Очки: {dealer_score}")
+            
+        self.dealer_cards_label.setText(dealer_display)
+        
+    def hit(self):
+        """Игрок берет еще карту"""
+        self.player_cards.append(self.deal_card())
+        self.update_display()
+        
+        player_score = self.calculate_score(self.player_cards)
+        if player_score > 21:
+            self.end_game("💥 Перебор! Вы проиграли!", 0)
+        elif player_score == 21:
+            self.stand()  # Автоматически останавливаемся при 21
+            
+    def stand(self):
+        """Игрок останавливается, ход дилера"""
+        self.dealer_hidden = False
+        self.hit_button.setEnabled(False)
+        self.stand_button.setEnabled(False)
+        
+        # Дилер добирает карты
+        while self.calculate_score(self.dealer_cards) < 17:
+            self.dealer_cards.append(self.deal_card())
+            
+        self.update_display()
+        
+        # Определяем победителя
+        player_score = self.calculate_score(self.player_cards)
+        dealer_score = self.calculate_score(self.dealer_cards)
+        
+        if dealer_score > 21:
+            self.end_game("🎉 Дилер перебрал! Вы выиграли!", self.bet * 2)
+        elif dealer_score > player_score:
+            self.end_game("😞 Дилер выиграл!", 0)
+        elif player_score > dealer_score:
+            self.end_game("🎉 Вы выиграли!", self.bet * 2)
+        else:
+            self.end_game("🟡 Ничья!", self.bet)
+            
+    def end_game(self, message, winnings):
+        """Завершает игру"""
+        self.game_in_progress = False
+        self.coins += winnings
+        self.update_coins_display()
+        
+        self.result_label.setText(message)
+        if winnings > 0:
+            self.result_label.setStyleSheet("""
+                QLabel {
+                    font-size: 14px;
+                    font-weight: bold;
+                    color: white;
+                    background-color: #27ae60;
+                    padding: 10px;
+                    border-radius: 6px;
+                    text-align: center;
+                }
+            """)
+        else:
+            self.result_label.setStyleSheet("""
+                QLabel {
+                    font-size: 14px;
+                    font-weight: bold;
+                    color: white;
+                    background-color: #e74c3c;
+                    padding: 10px;
+                    border-radius: 6px;
+                    text-align: center;
+                }
+            """)
+            
+        # Активируем кнопку новой игры
+        self.start_button.setEnabled(True)
+        self.hit_button.setEnabled(False)
+        self.stand_button.setEnabled(False)
+        
+        # Обновляем слайдер ставок
+        self.bet_slider.setMaximum(min(100, self.coins))
+        
+    def update_coins_display(self):
+        """Обновляет отображение монет"""
+        self.coins_label.setText(f"💰 Монеты: {self.coins}")
+        if self.coins < 10:
+            self.coins_label.setStyleSheet("""
+                QLabel {
+                    font-size: 14px;
+                    font-weight: bold;
+                    color: white;
+                    background-color: #e74c3c;
+                    padding: 8px;
+                    border-radius: 4px;
+                    text-align: center;
+                }
+            """)
+        else:
+            self.coins_label.setStyleSheet("""
+                QLabel {
+                    font-size: 14px;
+                    font-weight: bold;
+                    color: white;
+                    background-color: #27ae60;
+                    padding: 8px;
+                    border-radius: 4px;
+                    text-align: center;
+                }
+            """)
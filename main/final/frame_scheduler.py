@@ -0,0 +1,108 @@
+"""
+Планировщик кадров "рендер по требованию".
+
+Вместо таймера, вызывающего RenderFrame каждые 16 мс, кадр рисуется только
+когда вид помечен грязным (ввод камеры, изменение сцены, ресайз) или идёт
+взаимодействие/анимация. В остальное время таймер переходит на редкую
+частоту простоя (idle_fps), а при idle_fps = 0 останавливается совсем.
+"""
+import time
+
+from PyQt6 import QtCore
+
+# Окно усреднения статистики, секунды
+STATS_WINDOW = 1.0
+
+
+class FrameScheduler(QtCore.QObject):
+    """Вызывает render_callback только тогда, когда кадр действительно нужен"""
+
+    def __init__(self, render_callback, fps=60, idle_fps=1.0, external_timing=False, parent=None):
+        super().__init__(parent)
+        self.render_callback = render_callback
+        # render_callback только заказывает кадр в другом потоке - о готовых
+        # кадрах и их времени сообщают через frame_finished
+        self.external_timing = external_timing
+        self.frame_interval = 1.0 / fps
+        self.idle_fps = idle_fps
+        self.dirty = True
+        self.interactions = set()  # активные взаимодействия/анимации
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self._tick)
+        self.active = False
+
+        # Статистика: кадры и время рендера за текущее окно
+        self.fps = 0.0
+        self.idle_ratio = 1.0
+        self._window_start = time.perf_counter()
+        self._window_frames = 0
+        self._window_busy = 0.0
+
+    def start(self):
+        self._set_active(True)
+
+    def stop(self):
+        self.timer.stop()
+        self.active = False
+
+    def mark_dirty(self, *args):
+        """Вид изменился - нарисовать кадр как можно скорее (несколько пометок сливаются)"""
+        self.dirty = True
+        if not self.active:
+            self._set_active(True)
+
+    def begin_interaction(self, name):
+        """Пока взаимодействие активно, кадры идут на полной частоте"""
+        self.interactions.add(name)
+        self.mark_dirty()
+
+    def end_interaction(self, name):
+        self.interactions.discard(name)
+
+    def set_idle_fps(self, idle_fps):
+        self.idle_fps = max(float(idle_fps), 0.0)
+        if not self.active:
+            self._set_active(False)
+
+    def _set_active(self, active):
+        self.active = active
+        if active:
+            self.timer.start(max(1, int(self.frame_interval * 1000)))
+        elif self.idle_fps > 0:
+            self.timer.start(max(1, int(1000 / self.idle_fps)))
+        else:
+            self.timer.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        if self.dirty or self.interactions or not self.active:
+            # Грязный вид, взаимодействие или плановый кадр простоя
+            self.dirty = False
+            self.render_callback()
+            if not self.external_timing:
+                self.frame_finished(time.perf_counter() - now)
+        elif self.active:
+            # Нечего рисовать - уходим на частоту простоя
+            self._set_active(False)
+        self.update_stats(now)
+
+    def frame_finished(self, seconds):
+        """Учитывает нарисованный кадр в статистике fps и простоя"""
+        self._window_frames += 1
+        self._window_busy += seconds
+
+    def update_stats(self, now=None):
+        """Пересчитывает fps и долю простоя, если окно статистики закончилось"""
+        if now is None:
+            now = time.perf_counter()
+        elapsed = now - self._window_start
+        if elapsed < STATS_WINDOW:
+            return
+        self.fps = self._window_frames / elapsed
+        # Доля времени, когда рендер не работал
+        self.idle_ratio = max(0.0, 1.0 - self._window_busy / elapsed)
+        self._window_start = now
+        self._window_frames = 0
+        self._window_busy = 0.0
@@ -0,0 +1,152 @@
+"""
+Процедурные генераторы сцен.
+
+Каждый генератор по числу кубов и параметрам сразу строит массив (N, 4)
+float32 (x, y, z, size) векторными операциями NumPy, без циклов по кубам.
+Случайные генераторы берут seed, так что одна и та же сцена повторяется.
+Сцена вписывается в куб с полустороной extent вокруг center, а размер
+кубов подбирается по их плотности - от 10 до миллионов кубов сцена
+остаётся в кадре и не слипается в сплошную массу.
+"""
+import math
+
+import numpy as np
+
+from renderer_cpu import DEFAULT_TARGET
+
+DEFAULT_CENTER = DEFAULT_TARGET
+DEFAULT_EXTENT = 6.0
+
+# Доля шага между кубами, которую занимает сам куб
+FILL = 0.8
+
+
+def _pack(x, y, z, size, center):
+    cubes = np.empty((len(x), 4), dtype=np.float32)
+    cubes[:, 0] = x + center[0]
+    cubes[:, 1] = y + center[1]
+    cubes[:, 2] = z + center[2]
+    cubes[:, 3] = size
+    return cubes
+
+
+def grid(count, seed=0, center=DEFAULT_CENTER, extent=DEFAULT_EXTENT):
+    """Кубическая решётка: count кубов, заполняющих слои снизу вверх"""
+    side = max(math.ceil(round(count ** (1 / 3), 9)), 1)
+    step = 2 * extent / side
+    index = np.arange(count)
+    i, j, k = index % side, (index // side) % side, index // (side * side)
+    offset = (side - 1) / 2
+    return _pack((i - offset) * step, (k - offset) * step, (j - offset) * step, step * FILL, center)
+
+
+def sphere_shell(count, seed=0, center=DEFAULT_CENTER, extent=DEFAULT_EXTENT):
+    """Сфера радиуса extent: точки спирали Фибоначчи, равномерно по поверхности"""
+    index = np.arange(count) + 0.5
+    y = 1 - 2 * index / max(count, 1)
+    ring = np.sqrt(1 - y * y)
+    angle = index * (math.pi * (3 - math.sqrt(5)))  # золотой угол
+    spacing = math.sqrt(4 * math.pi / max(count, 1)) * extent
+    return _pack(np.cos(angle) * ring * extent, y * extent, np.sin(angle) * ring * extent,
+                 min(spacing * FILL, extent / 4), center)
+
+
+def helix(count, seed=0, center=DEFAULT_CENTER, extent=DEFAULT_EXTENT, turns=6, strands=2):
+    """Спираль из strands нитей по turns витков, ось - вертикаль"""
+    index = np.arange(count)
+    strand = index % strands
+    t = (index // strands) / max(math.ceil(count / strands) - 1, 1)
+    angle = t * turns * 2 * math.pi + strand * (2 * math.pi / strands)
+    radius = extent * 0.6
+    # Шаг между соседними кубами одной нити вдоль спирали
+    length = math.hypot(2 * math.pi * radius * turns, 2 * extent)
+    spacing = length / max(count / strands, 1)
+    return _pack(np.cos(angle) * radius, (t - 0.5) * 2 * extent, np.sin(angle) * radius,
+                 min(spacing * FILL, extent / 8), center)
+
+
+def value_noise(side, rng, octaves=5):
+    """
+    Сумма октав сглаженного шума значений на сетке side x side; результат
+    в [0, 1]. Билинейная интерполяция раздельная: сначала вдоль x для
+    строк решётки, затем вдоль y - по два прохода по сетке на октаву.
+    """
+    t = (np.arange(side) + 0.5) / side
+    height = np.zeros((side, side))
+    amplitude, total = 1.0, 0.0
+    for octave in range(octaves):
+        res = 4 << octave
+        lattice = rng.random((res + 1, res + 1))
+        g = t * res
+        i = np.minimum(g.astype(np.int64), res - 1)
+        f = g - i
+        f = f * f * (3 - 2 * f)  # smoothstep
+        rows = lattice[:, i] * (1 - f) + lattice[:, i + 1] * f  # (res + 1, side)
+        height += amplitude * (rows[i] * (1 - f)[:, None] + rows[i + 1] * f[:, None])
+        total += amplitude
+        amplitude *= 0.5
+    return height / total
+
+
+def terrain(count, seed=0, center=DEFAULT_CENTER, extent=DEFAULT_EXTENT, amplitude=0.5):
+    """Рельеф: квадратная сетка столбиков с высотой из шума, amplitude - доля extent"""
+    rng = np.random.default_rng(seed)
+    side = max(math.ceil(math.sqrt(count)), 1)
+    step = 2 * extent / side
+    index = np.arange(count)
+    u, v = (index % side + 0.5) / side, (index // side + 0.5) / side
+    height = (value_noise(side, rng).ravel()[:count] - 0.5) * 2 * extent * amplitude
+    # Высоту округляем до шага - получаются ступени, как у воксельного ландшафта
+    height = np.round(height / step) * step
+    return _pack((u - 0.5) * 2 * extent, height, (v - 0.5) * 2 * extent, step * FILL, center)
+
+
+def clusters(count, seed=0, center=DEFAULT_CENTER, extent=DEFAULT_EXTENT, groups=12, spread=0.12):
+    """Случайные скопления: groups центров, кубы вокруг них по нормальному закону"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-extent, extent, (groups, 3)) * (1 - 2 * spread)
+    label = rng.integers(0, groups, count)
+    points = centers[label] + rng.normal(0.0, spread * extent, (count, 3))
+    # Кубы скопления занимают примерно шар радиусом 2 sigma
+    volume = groups * 4 / 3 * math.pi * (2 * spread * extent) ** 3
+    base = (volume / max(count, 1)) ** (1 / 3) * FILL
+    size = base * rng.uniform(0.5, 1.0, count)
+    return _pack(points[:, 0], points[:, 1], points[:, 2], size, center)
+
+
+def menger_level(count):
+    """Наибольший уровень губки Менгера, у которого не больше count кубов (20^level)"""
+    level = 0
+    while 20 ** (level + 1) <= count:
+        level += 1
+    return level
+
+
+def menger(count, seed=0, center=DEFAULT_CENTER, extent=DEFAULT_EXTENT):
+    """Губка Менгера уровня menger_level(count): 1, 20, 400, 8000, 160000, 3.2 млн кубов"""
+    level = menger_level(count)
+    # 20 из 27 подкубов 3x3x3: выброшены центр и центры граней (две и больше нулевых координаты)
+    cell = np.array([(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)])
+    keep = cell[(cell == 0).sum(axis=1) < 2]
+    points = np.zeros((1, 3))
+    for _ in range(level):
+        points = (points[:, None, :] * 3 + keep[None, :, :]).reshape(-1, 3)
+    step = 2 * extent / 3 ** level
+    points *= step
+    return _pack(points[:, 0], points[:, 1], points[:, 2], step, center)
+
+
+# Генераторы для интерфейса: ключ -> (название, функция)
+GENERATORS = {
+    "grid": ("🧊 Решётка", grid),
+    "sphere": ("🌐 Сфера", sphere_shell),
+    "helix": ("🧬 Спираль", helix),
+    "terrain": ("⛰️ Рельеф", terrain),
+    "clusters": ("✨ Скопления", clusters),
+    "menger": ("🧽 Губка Менгера", menger),
+}
+
+
+def generate(name, count, seed=0, center=DEFAULT_CENTER):
+    """Кубы генератора name; неизвестное имя - KeyError"""
+    return GENERATORS[name][1](int(count), seed=seed, center=center)
@@ -0,0 +1,113 @@
+"""
+Иерархический z-буфер (Hi-Z) для отсечения перекрытых кубов.
+
+Пирамида строится из буфера глубины после прохода окклюдеров (ближайших
+кубов кадра): уровень k хранит максимум глубины по блокам 2^k x 2^k
+пикселей. Пирамида строится один раз за кадр, а после каждой пачки
+кубов пересчитываются только блоки под прямоугольником, куда пачка
+рисовала (refresh). Экранный прямоугольник куба проверяется на уровне, где он
+занимает не больше 2 x 2 текселей: если ближайшая точка куба дальше
+максимума глубины под прямоугольником, куб целиком перекрыт.
+
+Для растеризатора есть и одномерный вариант (build_rows / row_max): по нему
+строки многоугольников, целиком лежащие за уже нарисованным, отбрасываются
+до разворота во фрагменты.
+"""
+import numpy as np
+
+
+def _reduce(level, out=None):
+    """Максимумы блоков 2 x 2; у нечётного края блок неполный (как дополнение -inf)"""
+    h, w = level.shape
+    if out is None:
+        out = level[0::2, 0::2].copy()
+    else:
+        out[...] = level[0::2, 0::2]
+    # Четыре прореженных среза вместо reshape(...).max(): без временного
+    # массива на весь уровень и в разы быстрее
+    np.maximum(out[:, :w // 2], level[0::2, 1::2], out=out[:, :w // 2])
+    np.maximum(out[:h // 2], level[1::2, 0::2], out=out[:h // 2])
+    np.maximum(out[:h // 2, :w // 2], level[1::2, 1::2], out=out[:h // 2, :w // 2])
+    return out
+
+
+def build_pyramid(depth_buffer, width, height):
+    """Уровни пирамиды максимумов глубины: [(h, w), (h/2, w/2), ...] до 1 x 1"""
+    level = depth_buffer.reshape(height, width)
+    levels = [level]
+    while level.shape[0] > 1 or level.shape[1] > 1:
+        level = _reduce(level)
+        levels.append(level)
+    return levels
+
+
+def refresh(levels, x0, y0, x1, y1):
+    """
+    Пересчитывает уровни над изменённым прямоугольником x0..x1, y0..y1
+    (включительно, в пикселях). Уровень 0 - вид на буфер глубины и
+    обновляется сам.
+    """
+    for k in range(1, len(levels)):
+        x0, y0, x1, y1 = x0 >> 1, y0 >> 1, x1 >> 1, y1 >> 1
+        below = levels[k - 1][2 * y0:2 * y1 + 2, 2 * x0:2 * x1 + 2]
+        _reduce(below, levels[k][y0:y1 + 1, x0:x1 + 1])
+
+
+def build_rows(depth_buffer, width, y0, y1):
+    """
+    Одномерная пирамида вдоль строк y0 <= y < y1: уровень k хранит максимум
+    глубины по блокам 2^k пикселей строки. Уровни лежат подряд в одном
+    массиве; возвращаются он, смещения уровней и их ширины.
+    """
+    level = depth_buffer[y0 * width:y1 * width].reshape(y1 - y0, width)
+    widths = [width]
+    while widths[-1] > 1:
+        widths.append((widths[-1] + 1) // 2)
+    offsets = np.cumsum([0] + widths) * (y1 - y0)
+    flat = np.empty(offsets[-1], dtype=np.float32)
+    flat[:offsets[1]] = level.reshape(-1)
+    for k in range(1, len(widths)):
+        w = widths[k - 1]
+        out = flat[offsets[k]:offsets[k + 1]].reshape(y1 - y0, widths[k])
+        out[...] = level[:, 0::2]
+        np.maximum(out[:, :w // 2], level[:, 1::2], out=out[:, :w // 2])
+        level = out
+    return flat, offsets[:-1], np.array(widths)
+
+
+def row_max(rows, y0, row_y, x0, x1):
+    """
+    Максимум глубины (сверху) на отрезках x0..x1 (включительно) строк row_y
+    по пирамиде build_rows для строк начиная с y0.
+    """
+    flat, offsets, widths = rows
+    # Уровень, на котором отрезок накрывают не больше двух блоков
+    level_of = np.ceil(np.log2(np.arange(1, widths[0] + 1))).astype(np.int32)
+    k = level_of[x1 - x0]
+    base = offsets[k] + (row_y - y0) * widths[k]
+    return np.maximum(flat[base + (x0 >> k)], flat[base + (x1 >> k)])
+
+
+def occluded(levels, x0, y0, x1, y1, z_min):
+    """
+    Маска целиком перекрытых прямоугольников.
+    x0..x1, y0..y1 - включительные границы в пикселях (уже в пределах экрана),
+    z_min - ближайшая глубина объекта в тех же единицах, что буфер глубины.
+    """
+    result = np.zeros(len(z_min), dtype=bool)
+    if len(z_min) == 0:
+        return result
+    size = np.maximum(x1 - x0, y1 - y0) + 1
+    # Уровень, на котором прямоугольник накрывают не больше 2 x 2 текселей
+    level_of = np.ceil(np.log2(size)).astype(np.int32)
+    level_of = np.minimum(level_of, len(levels) - 1)
+    for k in np.unique(level_of):
+        idx = np.flatnonzero(level_of == k)
+        level = levels[k]
+        h, w = level.shape
+        tx0, tx1 = x0[idx] >> k, np.minimum(x1[idx] >> k, w - 1)
+        ty0, ty1 = y0[idx] >> k, np.minimum(y1[idx] >> k, h - 1)
+        far = np.maximum(np.maximum(level[ty0, tx0], level[ty0, tx1]),
+                         np.maximum(level[ty1, tx0], level[ty1, tx1]))
+        result[idx] = z_min[idx] > far
+    return result
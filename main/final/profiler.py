@@ -0,0 +1,150 @@
+"""
+Профилировщик кадра по стадиям.
+
+Каждый кадр - строка в кольцевом буфере фиксированного размера: время
+стадий (input, upload, cull, transform, raster, present) в миллисекундах.
+Внутри кадра время отмечается "кругами": lap(stage) приписывает стадии
+время с прошлой отметки, поэтому на кадр приходится лишь несколько вызовов
+perf_counter. Перцентили считаются только по запросу (для статус бара).
+
+Кадр пишет поток рендера, а ввод (add), сброс и статистику зовёт поток
+интерфейса, поэтому состояние меняется и читается под одной блокировкой.
+"""
+import csv
+import json
+import threading
+import time
+
+import numpy as np
+
+STAGES = ("input", "upload", "cull", "transform", "raster", "present")
+
+# Сколько последних кадров хранить
+HISTORY_SIZE = 1024
+
+# Бюджет кадра (60 FPS): кадр дольше бюджета считается пропущенным
+FRAME_BUDGET_MS = 1000.0 / 60
+
+
+class FrameProfiler:
+    """Кольцевой буфер времён стадий последних HISTORY_SIZE кадров"""
+
+    def __init__(self, size=HISTORY_SIZE, budget_ms=FRAME_BUDGET_MS):
+        self.enabled = True
+        self.budget_ms = budget_ms
+        self.index = {name: i for i, name in enumerate(STAGES)}
+        self.history = np.zeros((size, len(STAGES)), dtype=np.float64)
+        self.frame_ids = np.zeros(size, dtype=np.int64)
+        self.frames = 0  # всего записано кадров
+        self.dropped = 0  # кадров, не уложившихся в бюджет
+        # Текущий кадр; ввод между кадрами копится сюда же
+        self._current = np.zeros(len(STAGES), dtype=np.float64)
+        self._last = None
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.history.fill(0)
+            self.frames = 0
+            self.dropped = 0
+            self._current.fill(0)
+            self._last = None
+
+    # === Замеры ===
+
+    def begin_frame(self):
+        if self.enabled:
+            self._last = time.perf_counter()
+
+    def lap(self, stage):
+        """Приписывает стадии время с прошлой отметки"""
+        with self._lock:
+            if self._last is None:
+                return
+            now = time.perf_counter()
+            self._current[self.index[stage]] += (now - self._last) * 1000.0
+            self._last = now
+
+    def add(self, stage, seconds):
+        """Добавляет время стадии, измеренное снаружи (например, обработка ввода)"""
+        if self.enabled:
+            with self._lock:
+                self._current[self.index[stage]] += seconds * 1000.0
+
+    def end_frame(self):
+        with self._lock:
+            if self._last is None:
+                return
+            row = self.frames % len(self.history)
+            self.history[row] = self._current
+            self.frame_ids[row] = self.frames
+            self.frames += 1
+            if self._current.sum() > self.budget_ms:
+                self.dropped += 1
+            self._current.fill(0)
+            self._last = None
+
+    # === Статистика ===
+
+    def recent(self):
+        """(N, стадии) времён записанных кадров в порядке от старых к новым (копия)"""
+        return self._snapshot()[1]
+
+    def _snapshot(self):
+        """Номера и времена записанных кадров от старых к новым - копии под блокировкой"""
+        with self._lock:
+            size = len(self.history)
+            if self.frames <= size:
+                return self.frame_ids[:self.frames].copy(), self.history[:self.frames].copy()
+            shift = -(self.frames % size)
+            return np.roll(self.frame_ids, shift), np.roll(self.history, shift, axis=0)
+
+    def percentiles(self, q=(50, 95, 99), recent=None):
+        """Перцентили полного времени кадра, мс"""
+        if recent is None:
+            recent = self.recent()
+        if len(recent) == 0:
+            return [0.0] * len(q)
+        return [float(v) for v in np.percentile(recent.sum(axis=1), q)]
+
+    def summary(self, recent=None):
+        if recent is None:
+            recent = self.recent()
+        p50, p95, p99 = self.percentiles(recent=recent)
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "budget_ms": self.budget_ms,
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "p99_ms": p99,
+            "stage_mean_ms": {name: float(recent[:, i].mean()) if len(recent) else 0.0
+                              for i, name in enumerate(STAGES)},
+        }
+
+    # === Экспорт ===
+
+    def export_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame",) + STAGES + ("total",))
+            for frame, row in zip(*self._snapshot()):
+                writer.writerow([int(frame)] + [f"{v:.4f}" for v in row] + [f"{row.sum():.4f}"])
+
+    def export_json(self, path):
+        ids, recent = self._snapshot()
+        data = {
+            "stages": list(STAGES),
+            "summary": self.summary(recent),
+            "frames": [{"frame": int(frame), **{name: float(v) for name, v in zip(STAGES, row)}}
+                       for frame, row in zip(ids, recent)],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def export(self, path):
+        """Экспорт по расширению файла: .json или .csv"""
+        if str(path).lower().endswith(".json"):
+            self.export_json(path)
+        else:
+            self.export_csv(path)
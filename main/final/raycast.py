@@ -0,0 +1,161 @@
+"""
+Движок лучей для кубов: замена растеризации граней.
+
+Каждый куб сцены - AABB, поэтому пересечение луча с ним считается
+аналитически (метод плит) и даёт точную глубину в каждом пикселе без
+разбиения граней на треугольники, отсечения по ближней плоскости и
+интерполяции. Лучи не перебирают всю сцену: экранная рамка куба режется
+на тайлы RAY_TILE x RAY_TILE, тайл, где куб дальше уже нарисованного
+(по пирамиде Hi-Z), пропускается целиком, а остальные разворачиваются в
+пакеты пар "луч - куб", которые NumPy проверяет разом. Кубы идут от
+ближних к дальним, поэтому и внутри тайла пара, у которой куб дальше
+записанной в пиксель глубины, отбрасывается до теста плит.
+"""
+import math
+
+import numpy as np
+
+from tile_pool import Shared
+
+# Пар "луч - куб" в одной пачке вычислений
+RAY_PACKET = 1 << 15
+
+# Тайл пакета лучей: RAY_TILE x RAY_TILE пикселей - блок уровня
+# RAY_TILE_SHIFT пирамиды Hi-Z
+RAY_TILE_SHIFT = 3
+RAY_TILE = 1 << RAY_TILE_SHIFT
+
+
+def inverse_directions(right, up, forward, width, height, fov_y):
+    """
+    Обратные направления лучей через центры пикселей (3, H * W) - по
+    оси на строку, чтобы выборки по пикселям были одномерными.
+    Направление не нормируется: forward + right * nx + up * ny, поэтому
+    параметр t точки луча - это её глубина вдоль взгляда камеры.
+    """
+    tan_half = math.tan(fov_y / 2)
+    nx = ((2 * (np.arange(width) + 0.5) / width - 1) * tan_half * width / max(height, 1)).astype(np.float32)
+    ny = ((1 - 2 * (np.arange(height) + 0.5) / height) * tan_half).astype(np.float32)
+    inv = np.empty((3, height, width), dtype=np.float32)
+    for k in range(3):
+        d = inv[k]
+        np.add(np.float32(forward[k]) + np.float32(up[k]) * ny[:, None], np.float32(right[k]) * nx, out=d)
+        # Луч вдоль плиты: конечная большая обратная величина вместо inf (inf * 0 = nan)
+        d[np.abs(d) < 1e-12] = 1e-12
+        np.divide(1.0, d, out=d)
+    return inv.reshape(3, -1)
+
+
+def cast(lo, hi, bounds, depth_min, face_colors, inv_dirs, depth_params, near,
+         color_buffer, depth_buffer, width, height, rows=None, tile_depth=None):
+    """
+    Пересекает лучи пикселей с кубами и пишет ближайшие попадания в буферы.
+    lo, hi: (3, C) углы кубов относительно камеры, от ближних к дальним;
+    bounds: (C, 4) x0, y0, x1, y1 - центры пикселей экранной рамки куба
+    (включительно); depth_min: (C,) нижняя граница глубины куба в NDC;
+    face_colors: (C, 6) цвета граней в порядке CUBE_FACES;
+    depth_params: (a, b) - глубина NDC точки луча = a + b / t.
+    rows: (y0, y1) - только строки экрана y0 <= y < y1 (тайл).
+    tile_depth: максимум глубины по тайлам RAY_TILE x RAY_TILE (уровень
+    Hi-Z) - тайлы, где куб целиком дальше, пропускаются до разворота в лучи.
+    """
+    if lo.shape[1] == 0:
+        return
+    y0, y1 = rows if rows is not None else (0, height)
+    top = np.maximum(bounds[:, 1], y0)
+    bottom = np.minimum(bounds[:, 3], y1 - 1)
+    live = np.flatnonzero((bottom >= top) & (bounds[:, 2] >= bounds[:, 0]))
+    if len(live) == 0:
+        return
+
+    # Пакеты лучей по тайлам: рамка куба режется сеткой RAY_TILE x RAY_TILE
+    tx0, tx1 = bounds[live, 0] >> RAY_TILE_SHIFT, bounds[live, 2] >> RAY_TILE_SHIFT
+    ty0, ty1 = top[live] >> RAY_TILE_SHIFT, bottom[live] >> RAY_TILE_SHIFT
+    columns = tx1 - tx0 + 1
+    counts = columns * (ty1 - ty0 + 1)
+    element = np.repeat(np.arange(len(live)), counts)
+    local = np.arange(len(element)) - np.repeat(np.cumsum(counts) - counts, counts)
+    tile_y = ty0[element] + local // columns[element]
+    tile_x = tx0[element] + local % columns[element]
+    owner = live[element]
+    if tile_depth is not None:
+        # Куб целиком дальше всего, что уже нарисовано в тайле
+        visible = depth_min[owner] <= tile_depth[tile_y, tile_x]
+        owner, tile_x, tile_y = owner[visible], tile_x[visible], tile_y[visible]
+        if len(owner) == 0:
+            return
+
+    # Строки пакетов: пересечение тайла с рамкой куба
+    row_top = np.maximum(tile_y << RAY_TILE_SHIFT, top[owner])
+    row_count = np.minimum((tile_y << RAY_TILE_SHIFT) + RAY_TILE - 1, bottom[owner]) - row_top + 1
+    span_x = np.maximum(tile_x << RAY_TILE_SHIFT, bounds[owner, 0])
+    span_len = np.minimum((tile_x << RAY_TILE_SHIFT) + RAY_TILE - 1, bounds[owner, 2]) - span_x + 1
+    element = np.repeat(np.arange(len(owner)), row_count)
+    row_y = (np.arange(len(element)) - np.repeat(np.cumsum(row_count) - row_count, row_count)
+             + row_top[element])
+    row_pix = row_y * width + span_x[element]
+    lengths = span_len[element]
+    owner = owner[element]
+
+    a, b = depth_params
+    ends = np.cumsum(lengths, dtype=np.int64)
+    cuts = np.searchsorted(ends, np.arange(RAY_PACKET, ends[-1], RAY_PACKET))
+    for r0, r1 in zip(np.concatenate([[0], cuts]), np.concatenate([cuts, [len(lengths)]])):
+        span = lengths[r0:r1]
+        total = int(span.sum())
+        if total == 0:
+            continue
+        offset = np.arange(total, dtype=np.int32) - np.repeat(np.cumsum(span) - span, span)
+        pix = np.repeat(row_pix[r0:r1], span) + offset
+        cube = np.repeat(owner[r0:r1], span)
+
+        # Ранний тест: куб целиком дальше уже записанного в пиксель
+        front = depth_min[cube] < depth_buffer[pix]
+        pix, cube = pix[front], cube[front]
+
+        # Метод плит по осям: луч входит в ящик на самой дальней из ближних
+        # плит и выходит на самой ближней из дальних. Грань входа - в порядке
+        # CUBE_FACES: плита lo - грань -X (-Y, -Z), плита hi - +X (+Y, +Z)
+        for k in range(3):
+            inv = inv_dirs[k].take(pix)
+            t1 = lo[k].take(cube) * inv
+            t2 = hi[k].take(cube) * inv
+            enter = np.minimum(t1, t2)
+            if k == 0:
+                t, t_far = enter, np.maximum(t1, t2)
+                face = (t2 < t1).astype(np.int8)
+            else:
+                later = enter > t
+                face = np.where(later, 2 * k + (t2 < t1), face)
+                t = np.maximum(t, enter)
+                t_far = np.minimum(t_far, np.maximum(t1, t2))
+        # Камера внутри куба или куб ближе near - как у растеризации, не виден
+        hit = (t <= t_far) & (t > near)
+        pix, cube, face, t = pix[hit], cube[hit], face[hit], t[hit]
+
+        depth = (a + b / t).astype(np.float32)
+        np.minimum.at(depth_buffer, pix, depth)
+        win = depth <= depth_buffer[pix]
+        color_buffer[pix[win]] = face_colors[cube[win], face[win]]
+
+
+def cast_tiled(lo, hi, bounds, depth_min, face_colors, inv_dirs, depth_params, near,
+               color_buffer, depth_buffer, width, height, tile_depth, pool, tile_rows):
+    """
+    Тайлы по tile_rows строк параллельно в процессах пула (TilePool), как
+    rasterize_tiled: тайлы пишут в непересекающиеся строки буферов.
+    Направления лучей лежат в общем буфере пула, в тайлы уходят только их кубы.
+    """
+    if lo.shape[1] == 0:
+        return
+    tile_rows = max(8, min(tile_rows, -(-height // (2 * pool.workers))))
+    jobs, first, last = [], height, 0
+    for y0 in range(0, height, tile_rows):
+        y1 = min(y0 + tile_rows, height)
+        idx = np.flatnonzero((bounds[:, 3] >= y0) & (bounds[:, 1] < y1))
+        if len(idx):
+            jobs.append(((lo[:, idx], hi[:, idx], bounds[idx], depth_min[idx], face_colors[idx], Shared(0),
+                          depth_params, near), (width, height, (y0, y1), tile_depth)))
+            first, last = min(first, y0), y1
+    if jobs:
+        pool.run(cast, jobs, color_buffer, depth_buffer, (first * width, last * width), shared=(inv_dirs,))
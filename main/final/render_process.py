@@ -0,0 +1,385 @@
+"""
+Рендерер в отдельном процессе.
+
+RemoteRenderer повторяет API CPU-рендерера, но сам ничего не рисует:
+вызовы без результата копятся в пачку и уходят в дочерний процесс одним
+сообщением вместе с RenderFrame. Дочерний процесс рисует кадр прямо в
+кольцо из FRAME_SLOTS буферов в разделяемой памяти и отвечает статистикой
+кадра; вывод читает готовый буфер без копирования, как у CpuRenderer.
+
+Падение или зависание рендера больше не роняет окно: процесс
+перезапускается, получает заново размер и настройки, а сцену заливает
+заново по on_restart (сцена на стороне Python - снимок, из которого она
+восстанавливается). Тяжёлая работа NumPy идёт в другом процессе и не
+держит GIL интерфейса.
+
+    R3D_BACKEND=process python test_improved.py
+"""
+import atexit
+import ctypes
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from renderer_cpu import ENGINE_RASTER, LOD_CLUSTER_PIXELS, LOD_POINT_PIXELS, OrbitCamera
+
+# Буферов кадра в кольце: выводимый, готовый к выводу и тот, в который рисуем
+FRAME_SLOTS = 3
+
+# Дольше этого кадр не рисуется - процесс считается зависшим и перезапускается
+FRAME_TIMEOUT = 30.0
+
+# Сколько ждать процесс при закрытии, прежде чем убить
+CLOSE_TIMEOUT = 2.0
+
+# Настройки, которые повторяются в новом процессе после перезапуска
+_SETTINGS = ("SetBackgroundColor", "SetWorkerCount", "SetOcclusionCulling",
+             "SetLodThresholds", "SetVoxelMode", "SetRenderEngine")
+
+
+def _as_array(data, dtype, shape):
+    """Копия данных вызова (указатель ctypes или буфер): до отправки буфер может измениться"""
+    if isinstance(data, ctypes._Pointer):
+        return np.ctypeslib.as_array(data, shape=shape).astype(dtype, copy=True)
+    return np.frombuffer(data, dtype=dtype, count=int(np.prod(shape))).reshape(shape).copy()
+
+
+class RemoteRenderer:
+    """Замена CpuRenderer: команды - в дочерний процесс, кадры - из разделяемой памяти"""
+
+    def __init__(self):
+        self.camera = OrbitCamera()  # камера ведётся здесь и уходит с каждым кадром
+        self.width = 0
+        self.height = 0
+        self.running = False
+        self.profiler = None  # время кадра целиком попадает в raster, как у DLL
+        self.on_restart = None  # вызывается после перезапуска: залить сцену заново
+        self.restarts = 0
+        self.workers = 1
+        self.lod_point_pixels = LOD_POINT_PIXELS
+        self.lod_cluster_pixels = LOD_CLUSTER_PIXELS
+        self.voxel_size = 1.0
+        self.engine = ENGINE_RASTER
+        self.stats = {}
+        self._settings = {}
+        self._batch = []
+        self._process = None
+        self._conn = None
+        # Кольцо кадров: capacity пикселей на буфер
+        self._ring = None
+        self._capacity = 0
+        self._retired = []  # старые кольца, которые ещё может читать вывод
+        self._back = 0
+        self._front = None
+        self._front_frame = None
+        self._rendered = None  # (буфер, кадр), ждущий swap_buffers
+        self._presenting = None
+        self._swap_lock = threading.Lock()
+        self._start_process()  # процесс грузит NumPy, пока строится окно
+        atexit.register(self.CloseRenderer3D)
+
+    # === Процесс ===
+
+    def _start_process(self):
+        # spawn: дочерний процесс не наследует потоки и состояние Qt. Не
+        # демон: ему нужен свой пул процессов для тайлов (SetWorkerCount), а
+        # без интерфейса он завершается сам - канал закрывается
+        context = multiprocessing.get_context("spawn")
+        self._conn, child = context.Pipe()
+        self._process = context.Process(target=serve, args=(child,), name="renderer")
+        self._process.start()
+        child.close()
+
+    def _stop_process(self):
+        if self._process is None:
+            return
+        try:
+            self._conn.send(("close",))
+        except (OSError, ValueError):
+            pass
+        self._process.join(CLOSE_TIMEOUT)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._conn.close()
+        self._process = None
+
+    def _restart(self, reason):
+        """Новый процесс с прежними размером и настройками; сцену заливает on_restart"""
+        self.restarts += 1
+        print(f"⚠️ Процесс рендера: {reason} - перезапуск #{self.restarts}")
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._conn.close()
+            self._process = None
+        self._start_process()
+        self._batch = [("InitRenderer3D", (self.width, self.height))]
+        self._batch += [(name, args) for name, args in self._settings.items()]
+        if self.on_restart is not None:
+            self.on_restart()
+
+    def _command(self, name, *args):
+        self._batch.append((name, args))
+        if name in _SETTINGS:
+            self._settings[name] = args
+
+    # === Кольцо кадров ===
+
+    def _ensure_ring(self, pixels):
+        if self._ring is not None and pixels <= self._capacity:
+            return
+        # Кольцо растёт с запасом, чтобы ресайз окна не пересоздавал его каждый раз
+        capacity = max(pixels, self._capacity * 2)
+        ring = shared_memory.SharedMemory(create=True, size=FRAME_SLOTS * capacity * 4)
+        with self._swap_lock:
+            if self._ring is not None:
+                self._retired.append(self._ring)
+            self._ring, self._capacity = ring, capacity
+            # Передний кадр остаётся в старом кольце до следующего swap_buffers
+            self._front, self._back = None, 0
+        self._close_retired()
+
+    def _close_retired(self):
+        for ring in list(self._retired):
+            try:
+                ring.close()
+                ring.unlink()
+            except BufferError:
+                continue  # вывод ещё держит кадр из этого кольца
+            self._retired.remove(ring)
+
+    def _slot_view(self, slot, width, height):
+        return np.ndarray((height, width), dtype=np.uint32, buffer=self._ring.buf,
+                          offset=slot * self._capacity * 4)
+
+    # === Вывод кадра без копирования ===
+
+    def swap_buffers(self):
+        """Нарисованный буфер становится передним, следующий кадр - в свободный"""
+        with self._swap_lock:
+            if self._rendered is None:
+                return
+            self._front, self._front_frame = self._rendered
+            self._rendered = None
+            for i in range(FRAME_SLOTS):
+                if i != self._front and i != self._presenting:
+                    self._back = i
+                    break
+
+    def acquire_front(self):
+        with self._swap_lock:
+            self._presenting = self._front
+            return self._front_frame
+
+    def release_front(self):
+        with self._swap_lock:
+            self._presenting = None
+        if self._retired:
+            self._close_retired()
+
+    # === API, совместимый с CpuRenderer ===
+
+    def InitRenderer3D(self, width, height):
+        self.width, self.height = max(int(width), 1), max(int(height), 1)
+        self.camera.reset()
+        self.running = True
+        self._rendered = None
+        self._command("InitRenderer3D", self.width, self.height)
+
+    def ResizeRenderer(self, width, height):
+        self.width, self.height = max(int(width), 1), max(int(height), 1)
+        self._command("ResizeRenderer", self.width, self.height)
+
+    def CloseRenderer3D(self):
+        self.running = False
+        self._stop_process()
+        with self._swap_lock:
+            self._front_frame = None
+            if self._ring is not None:
+                self._retired.append(self._ring)
+                self._ring = None
+        self._close_retired()
+
+    def IsRunning(self):
+        return self.running
+
+    def AddCube(self, x, y, z, size):
+        self._command("AddCubes", np.array([[x, y, z, size]], dtype=np.float32), 1)
+
+    def AddCubes(self, data, count):
+        count = int(count)
+        if count > 0:
+            self._command("AddCubes", _as_array(data, np.float32, (count, 4)), count)
+
+    def SetCubeColors(self, data, first, count):
+        count = int(count)
+        if count > 0:
+            self._command("SetCubeColors", _as_array(data, np.uint32, (count,)), first, count)
+
+    def SetCubes(self, data, first, count):
+        count = int(count)
+        if count > 0:
+            self._command("SetCubes", _as_array(data, np.float32, (count, 4)), first, count)
+
+    def TruncateCubes(self, count):
+        self._command("TruncateCubes", int(count))
+
+    def ClearScene(self):
+        self._command("ClearScene")
+
+    def SetBackgroundColor(self, r, g, b):
+        self._command("SetBackgroundColor", r, g, b)
+
+    def SetWorkerCount(self, count):
+        self.workers = max(int(count), 1)
+        self._command("SetWorkerCount", self.workers)
+
+    def GetWorkerCount(self):
+        return self.workers
+
+    def SetOcclusionCulling(self, enabled):
+        self._command("SetOcclusionCulling", bool(enabled))
+
+    def SetLodThresholds(self, point_pixels, cluster_pixels):
+        self.lod_point_pixels = max(float(point_pixels), 0.0)
+        self.lod_cluster_pixels = max(int(cluster_pixels), 1)
+        self._command("SetLodThresholds", self.lod_point_pixels, self.lod_cluster_pixels)
+
+    def SetVoxelMode(self, enabled, voxel_size=1.0):
+        self.voxel_size = float(voxel_size)
+        self._command("SetVoxelMode", bool(enabled), self.voxel_size)
+
+    def SetRenderEngine(self, engine):
+        self.engine = int(engine)
+        self._command("SetRenderEngine", self.engine)
+
+    def GetRenderEngine(self):
+        return self.engine
+
+    def RotateCamera(self, dx, dy):
+        self.camera.rotate(dx, dy)
+
+    def MoveCamera(self, dx, dy):
+        self.camera.move(dx, dy)
+
+    def ZoomCamera(self, factor):
+        self.camera.zoom(factor)
+
+    def ResetCamera(self):
+        self.camera.reset()
+
+    # Статистика последнего кадра приходит вместе с ним - без лишних обращений к процессу
+    def GetObjectCount(self):
+        return self.stats.get("objects", 0)
+
+    def GetVisibleCount(self):
+        return self.stats.get("visible", 0)
+
+    def GetCulledCount(self):
+        return self.stats.get("culled", 0)
+
+    def GetOccludedCount(self):
+        return self.stats.get("occluded", 0)
+
+    def GetImpostorCount(self):
+        return self.stats.get("impostors", 0)
+
+    def GetVoxelQuadCount(self):
+        return self.stats.get("voxel_quads", 0)
+
+    def RenderFrame(self):
+        """Отправляет пачку команд с кадром и ждёт ответа; упавший процесс перезапускается"""
+        if not self.running:
+            return
+        self._ensure_ring(self.width * self.height)
+        with self._swap_lock:
+            slot = self._back
+        batch, self._batch = self._batch, []
+        camera = self.camera.state()
+        ring = (self._ring.name, self._capacity)
+        try:
+            self._conn.send(("frame", batch, camera, ring, slot))
+            if not self._conn.poll(FRAME_TIMEOUT):
+                raise TimeoutError(f"кадр дольше {FRAME_TIMEOUT:g} с")
+            reply = self._conn.recv()
+        except (OSError, EOFError, TimeoutError) as e:
+            self._process.join(0.1)
+            code = self._process.exitcode
+            self._restart(f"код выхода {code}" if code is not None else str(e) or type(e).__name__)
+            return
+        status, errors = reply[0], reply[-1]
+        if status == "done":
+            width, height, self.stats = reply[1:4]
+            with self._swap_lock:
+                self._rendered = (slot, self._slot_view(slot, width, height))
+        if errors:
+            # Процесс жив, но часть пачки не применилась: сцена в нём уже не
+            # совпадает с Scene - заливаем её заново, а неверную настройку не
+            # повторяем при следующих перезапусках
+            for name, _ in errors:
+                self._settings.pop(name, None)
+            if self.on_restart is not None:
+                self.on_restart()
+            raise RuntimeError("; ".join(f"{name}: {message}" for name, message in errors))
+
+
+# === Дочерний процесс ===
+
+def serve(conn):
+    """Цикл дочернего процесса: пачка команд -> кадр в разделяемую память -> статистика"""
+    import renderer_cpu
+    renderer = renderer_cpu.CpuRenderer()
+    ring, ring_name, slots = None, None, []
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break  # интерфейс закрылся
+        if message[0] == "close":
+            break
+        _, batch, camera, (name, capacity), slot = message
+        # Ошибка одной команды не отменяет остальные: родитель узнает обо
+        # всех и перезальёт сцену
+        errors = []
+        for function, args in batch:
+            try:
+                getattr(renderer, function)(*args)
+            except Exception as e:
+                errors.append((function, f"{type(e).__name__}: {e}"))
+        try:
+            if name != ring_name:
+                renderer.color_buffer = np.zeros(0, dtype=np.uint32)
+                slots = []
+                if ring is not None:
+                    ring.close()
+                ring = shared_memory.SharedMemory(name=name)
+                ring_name = name
+                slots = [np.ndarray((capacity,), dtype=np.uint32, buffer=ring.buf, offset=i * capacity * 4)
+                         for i in range(FRAME_SLOTS)]
+            yaw, pitch, distance, *target = camera
+            renderer.camera.yaw, renderer.camera.pitch, renderer.camera.distance = yaw, pitch, distance
+            renderer.camera.target = np.array(target, dtype=np.float32)
+            # Кадр рисуется прямо в буфер кольца
+            renderer.color_buffer = slots[slot][:renderer.width * renderer.height]
+            renderer.RenderFrame()
+        except Exception as e:
+            errors.append(("RenderFrame", f"{type(e).__name__}: {e}"))
+            conn.send(("error", errors))
+            continue
+        conn.send(("done", renderer.width, renderer.height, {
+            "objects": renderer.GetObjectCount(),
+            "visible": renderer.GetVisibleCount(),
+            "culled": renderer.GetCulledCount(),
+            "occluded": renderer.GetOccludedCount(),
+            "impostors": renderer.GetImpostorCount(),
+            "voxel_quads": renderer.GetVoxelQuadCount(),
+        }, errors))
+    renderer.CloseRenderer3D()
+    renderer.color_buffer = np.zeros(0, dtype=np.uint32)
+    slots = []
+    if ring is not None:
+        ring.close()
+
@@ -0,0 +1,193 @@
+"""
+Очередь команд рендера и поток, который их исполняет.
+
+Обработчики интерфейса не вызывают сцену и рендерер напрямую, а кладут в
+очередь типизированные команды (добавить пачку, очистить, сдвиг камеры,
+произвольный вызов) и сразу получают Future. Поток рендера забирает всё
+накопившееся в начале кадра и применяет пачкой: соседние добавления
+сливаются в одно, сдвиги камеры суммируются. Поэтому время обработчика в
+потоке Qt не зависит от размера пачки.
+
+Сцена привязана к потоку, который разбирает очередь (Scene.bind_thread):
+прямой вызов сцены из обработчика интерфейса сразу бросает RuntimeError,
+а не портит её посреди кадра.
+
+Очередь - collections.deque: append и popleft атомарны, блокировок нет.
+С threaded=False (DLL: её окно и события SDL привязаны к потоку, который
+её создал) кадры и команды исполняются в потоке Qt, но так же пачкой на
+границе кадра.
+"""
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future
+
+import numpy as np
+from PyQt6 import QtCore
+
+# Команды. Результат Future у AddBatch и Clear - число кубов после команды
+AddBatch = namedtuple("AddBatch", "cubes colors", defaults=(None,))
+Clear = namedtuple("Clear", "")
+CameraDelta = namedtuple("CameraDelta", "rotate_x rotate_y move_x move_y zoom", defaults=(0.0,) * 5)
+Call = namedtuple("Call", "function args", defaults=((),))
+
+
+class RenderQueue(QtCore.QObject):
+    """Команды из интерфейса -> поток рендера; frame_callback рисует кадр"""
+
+    submitted = QtCore.pyqtSignal()  # команда добавлена (в потоке интерфейса)
+    applied = QtCore.pyqtSignal(int)  # команды применены, число применённых
+    frame_ready = QtCore.pyqtSignal(float)  # кадр готов, время кадра в секундах
+
+    def __init__(self, scene, renderer, frame_callback, threaded=True, parent=None):
+        super().__init__(parent)
+        self.scene = scene
+        self.renderer = renderer
+        self.frame_callback = frame_callback
+        self.threaded = threaded
+        self.commands = deque()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        if not self.threaded:
+            self.scene.bind_thread(threading.get_ident())
+        if self.threaded and self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="render", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Дожидается конца текущего кадра и останавливает поток"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self.scene.bind_thread(None)
+
+    # === Из потока интерфейса ===
+
+    def submit(self, command):
+        """Кладёт команду в очередь и сразу возвращает Future с её результатом"""
+        future = Future()
+        self.commands.append((command, future))
+        self.submitted.emit()
+        return future
+
+    def call(self, function, *args):
+        return self.submit(Call(function, args))
+
+    def request_frame(self):
+        """Просит кадр; несколько запросов до начала кадра сливаются в один"""
+        if self.threaded:
+            self._wake.set()
+        else:
+            self._frame()
+
+    def wait(self, future):
+        """Результат команды; без потока рендера очередь разбирается сразу"""
+        if not self.threaded:
+            self.drain()
+        else:
+            # Кадр обычно просит планировщик из цикла Qt, а он сейчас ждёт здесь
+            self._wake.set()
+        return future.result()
+
+    # === Из потока рендера ===
+
+    def _run(self):
+        self.scene.bind_thread(threading.get_ident())
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stopping:
+                return
+            self._frame()
+
+    def _frame(self):
+        started = time.perf_counter()
+        try:
+            self.frame_callback()
+        except Exception as e:
+            print(f"❌ Ошибка кадра: {e}")
+        self.frame_ready.emit(time.perf_counter() - started)
+
+    def drain(self):
+        """Применяет все накопившиеся команды; вызывается в начале кадра"""
+        batch = []
+        while True:
+            try:
+                batch.append(self.commands.popleft())
+            except IndexError:
+                break
+        if not batch:
+            return 0
+
+        adds = []  # подряд идущие AddBatch одного вида - одним add_many
+        camera = np.zeros(5)
+        for command, future in batch:
+            if isinstance(command, CameraDelta):
+                camera += command
+                future.set_result(None)
+                continue
+            if not (isinstance(command, AddBatch) and adds
+                    and (command.colors is None) == (adds[0][0].colors is None)):
+                self._flush_adds(adds)
+                adds = []
+            if isinstance(command, AddBatch):
+                adds.append((command, future))
+                continue
+            # Камера до вызова (например, ResetCamera) должна сдвинуться раньше него
+            self._apply_camera(camera)
+            camera[:] = 0
+            self._run_command(command, future)
+        self._flush_adds(adds)
+        self._apply_camera(camera)
+        self.applied.emit(len(batch))
+        return len(batch)
+
+    def _apply(self, command):
+        if isinstance(command, Clear):
+            self.scene.clear()
+            return 0
+        return command.function(*command.args)
+
+    def _flush_adds(self, adds):
+        if not adds:
+            return
+        futures = [future for _, future in adds]
+        try:
+            if len(adds) == 1:
+                cubes, colors = adds[0][0]
+            else:
+                cubes = np.concatenate([np.asarray(c.cubes, dtype=np.float32).reshape(-1, 4) for c, _ in adds])
+                colors = None
+                if adds[0][0].colors is not None:
+                    colors = np.concatenate([np.asarray(c.colors, dtype=np.uint32) for c, _ in adds])
+            self.scene.add_many(cubes, colors)
+        except Exception as e:
+            print(f"❌ Ошибка добавления кубов: {e}")
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future in futures:
+            future.set_result(len(self.scene))
+
+    def _apply_camera(self, delta):
+        rotate_x, rotate_y, move_x, move_y, zoom = delta
+        if rotate_x or rotate_y:
+            self.renderer.RotateCamera(rotate_x, rotate_y)
+        if move_x or move_y:
+            self.renderer.MoveCamera(move_x, move_y)
+        if zoom:
+            self.renderer.ZoomCamera(zoom)
+
+    def _run_command(self, command, future):
+        try:
+            future.set_result(self._apply(command))
+        except Exception as e:
+            print(f"❌ Ошибка команды рендера: {e}")
+            future.set_exception(e)
@@ -0,0 +1,1039 @@
+"""
+Программный CPU-рендерер на NumPy.
+
+Повторяет API renderer3d.dll (InitRenderer3D, AddCube, RenderFrame, ...),
+поэтому test_improved.py может подставить его вместо DLL там, где её нет
+(например, на Linux). Кадр рисуется в z-буферизованный NumPy-фреймбуфер
+без циклов по пикселям: трансформация, отсечение и растеризация
+выполняются пакетно для всех граней сразу. SetRenderEngine(ENGINE_RAYCAST)
+заменяет растеризацию граней лучами (raycast.py) - сцена, камера,
+отсечение и LOD остаются общими.
+"""
+import ctypes
+import math
+import threading
+
+import numpy as np
+
+import hiz
+import raycast
+from tile_pool import TilePool
+from bvh import CubeBVH, classify_boxes, frustum_planes
+
+# Вершины единичного куба: бит 0 - x, бит 1 - y, бит 2 - z
+CUBE_VERTICES = np.array(
+    [[(i & 1) - 0.5, ((i >> 1) & 1) - 0.5, ((i >> 2) & 1) - 0.5] for i in range(8)],
+    dtype=np.float32,
+)
+
+# Грани куба (обход по контуру) и их нормали
+CUBE_FACES = np.array([
+    [0, 2, 6, 4],  # -X
+    [1, 3, 7, 5],  # +X
+    [0, 1, 5, 4],  # -Y
+    [2, 3, 7, 6],  # +Y
+    [0, 1, 3, 2],  # -Z
+    [4, 5, 7, 6],  # +Z
+], dtype=np.int32)
+
+# Рёбра куба: пары вершин, различающихся одним битом
+CUBE_EDGES = np.array(
+    [[i, i | 1 << k] for i in range(8) for k in range(3) if not i & 1 << k],
+    dtype=np.int32,
+)
+
+CUBE_FACE_NORMALS = np.array([
+    [-1, 0, 0], [1, 0, 0],
+    [0, -1, 0], [0, 1, 0],
+    [0, 0, -1], [0, 0, 1],
+], dtype=np.float32)
+
+# Палитра кубов - те же цвета, что у кнопок панели управления
+CUBE_PALETTE = np.array(
+    [0xe74c3c, 0xf39c12, 0x9b59b6, 0x1abc9c, 0x27ae60, 0x3498db],
+    dtype=np.uint32,
+)
+
+# Направление на источник света и параметры освещения
+LIGHT_DIRECTION = np.array([0.4, 0.7, 0.6], dtype=np.float32)
+LIGHT_DIRECTION /= np.linalg.norm(LIGHT_DIRECTION)
+AMBIENT = 0.35
+
+# Параметры камеры по умолчанию
+DEFAULT_TARGET = (0.0, 0.0, -10.0)
+DEFAULT_DISTANCE = 10.0
+MIN_DISTANCE = 1.0
+MAX_DISTANCE = 200.0
+MAX_PITCH = 1.5
+FOV_Y = math.radians(60.0)
+NEAR = 0.1
+FAR = 1000.0
+
+# Фрагментов в одном пакете растеризации: небольшие пакеты ограничивают
+# память и позволяют раннему тесту глубины отбрасывать перекрытые фрагменты
+RASTER_CHUNK = 1 << 15
+
+# Высота тайла (строк) при многопоточной растеризации
+TILE_ROWS = 64
+
+# LOD: кубы мельче LOD_POINT_PIXELS пикселей на экране рисуются точками;
+# точки в одной ячейке LOD_CLUSTER_PIXELS x LOD_CLUSTER_PIXELS сливаются в одну
+LOD_POINT_PIXELS = 2.0
+LOD_CLUSTER_PIXELS = 2
+
+# Hi-Z: первые OCCLUDERS_MIN ближайших кубов - окклюдеры, дальше пачки
+# растут в OCCLUDER_GROWTH раз
+OCCLUDERS_MIN = 256
+OCCLUDER_GROWTH = 2
+
+# Тест окупается (замер 800x600) от ~800 видимых кубов и только если
+# перекрыта заметная их доля: ниже OCCLUSION_MIN_VISIBLE он не делается, а
+# после кадра, где скрыто меньше OCCLUSION_MIN_SHARE, пропускается
+# OCCLUSION_RETRY_FRAMES кадров
+OCCLUSION_MIN_VISIBLE = 1024
+OCCLUSION_MIN_SHARE = 0.2
+OCCLUSION_RETRY_FRAMES = 30
+
+# Движки рисования кубов (SetRenderEngine): грани треугольниками или лучами
+ENGINE_RASTER = 0
+ENGINE_RAYCAST = 1
+ENGINE_NAMES = ("raster", "raycast")
+
+
+def pack_rgb(r, g, b):
+    """Упаковывает цвет 0..1 в формат 0xFFRRGGBB (QImage.Format_RGB32)"""
+    r, g, b = (min(max(int(round(c * 255)), 0), 255) for c in (r, g, b))
+    return np.uint32(0xff000000 | (r << 16) | (g << 8) | b)
+
+
+def shade_colors(colors, intensity):
+    """Умножает упакованные цвета на яркость (векторно)"""
+    colors = np.asarray(colors, dtype=np.uint32)
+    intensity = np.asarray(intensity, dtype=np.float32)
+    r = ((colors >> 16) & 0xff) * intensity
+    g = ((colors >> 8) & 0xff) * intensity
+    b = (colors & 0xff) * intensity
+    return (np.uint32(0xff000000)
+            | (r.astype(np.uint32) << 16)
+            | (g.astype(np.uint32) << 8)
+            | b.astype(np.uint32))
+
+
+class OrbitCamera:
+    """Орбитальная камера: вращается вокруг точки target на расстоянии distance"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.target = np.array(DEFAULT_TARGET, dtype=np.float32)
+        self.distance = DEFAULT_DISTANCE
+        self.yaw = 0.0
+        self.pitch = 0.0
+
+    def rotate(self, dx, dy):
+        self.yaw += dx
+        self.pitch = min(max(self.pitch + dy, -MAX_PITCH), MAX_PITCH)
+
+    def zoom(self, factor):
+        self.distance = min(max(self.distance + factor, MIN_DISTANCE), MAX_DISTANCE)
+
+    def move(self, dx, dy):
+        right, up, _ = self.basis()
+        self.target = (self.target + right * dx + up * dy).astype(np.float32)
+
+    def state(self):
+        """Всё, от чего зависит вид камеры - для проверки, сдвинулась ли она"""
+        return (self.yaw, self.pitch, self.distance) + tuple(self.target.tolist())
+
+    def basis(self):
+        """Возвращает (right, up, forward) камеры в мировых координатах"""
+        cp, sp = math.cos(self.pitch), math.sin(self.pitch)
+        cy, sy = math.cos(self.yaw), math.sin(self.yaw)
+        forward = np.array([sy * cp, -sp, -cy * cp], dtype=np.float32)
+        right = np.array([cy, 0.0, sy], dtype=np.float32)
+        up = np.cross(right, forward)
+        return right, up, forward
+
+    def eye(self):
+        _, _, forward = self.basis()
+        return self.target - forward * self.distance
+
+    def view_matrix(self):
+        right, up, forward = self.basis()
+        eye = self.eye()
+        view = np.identity(4, dtype=np.float32)
+        view[0, :3] = right
+        view[1, :3] = up
+        view[2, :3] = -forward
+        view[:3, 3] = -view[:3, :3] @ eye
+        return view
+
+    def ray(self, x, y, width, height, fov_y=FOV_Y):
+        """Луч (origin, direction) из камеры через точку экрана (x, y) в пикселях"""
+        right, up, forward = self.basis()
+        tan_half = math.tan(fov_y / 2)
+        nx = (2 * x / width - 1) * tan_half * width / max(height, 1)
+        ny = (1 - 2 * y / height) * tan_half
+        direction = forward + right * nx + up * ny
+        return self.eye(), direction / np.linalg.norm(direction)
+
+
+def perspective_matrix(width, height, fov_y=FOV_Y, near=NEAR, far=FAR):
+    """Перспективная проекция в стиле OpenGL (clip z в [-w, w])"""
+    aspect = width / max(height, 1)
+    f = 1.0 / math.tan(fov_y / 2)
+    proj = np.zeros((4, 4), dtype=np.float32)
+    proj[0, 0] = f / aspect
+    proj[1, 1] = f
+    proj[2, 2] = (far + near) / (near - far)
+    proj[2, 3] = 2 * far * near / (near - far)
+    proj[3, 2] = -1.0
+    return proj
+
+
+def clip_near(tris, colors):
+    """
+    Отсекает треугольники плоскостью near (z + w >= 0) в clip-пространстве.
+    tris: (T, 3, 4), colors: (T,). Треугольник с одной вершиной за плоскостью
+    превращается в два, с двумя - в один.
+    """
+    d = tris[:, :, 2] + tris[:, :, 3]
+    inside = d >= 0
+    n_in = inside.sum(axis=1)
+    if n_in.min(initial=3) == 3:
+        return tris, colors
+
+    result = [tris[n_in == 3]]
+    result_colors = [colors[n_in == 3]]
+    order = np.arange(3)
+
+    # Одна вершина внутри: поворачиваем так, чтобы она стала первой
+    sel = n_in == 1
+    if sel.any():
+        first = np.argmax(inside[sel], axis=1)
+        idx = (first[:, None] + order) % 3
+        t = np.take_along_axis(tris[sel], idx[:, :, None], axis=1)
+        dd = np.take_along_axis(d[sel], idx, axis=1)
+        a, b, c = t[:, 0], t[:, 1], t[:, 2]
+        pb = a + (b - a) * (dd[:, 0] / (dd[:, 0] - dd[:, 1]))[:, None]
+        pc = a + (c - a) * (dd[:, 0] / (dd[:, 0] - dd[:, 2]))[:, None]
+        result.append(np.stack([a, pb, pc], axis=1))
+        result_colors.append(colors[sel])
+
+    # Две вершины внутри: первой делаем ту, что снаружи, получаем четырёхугольник
+    sel = n_in == 2
+    if sel.any():
+        first = np.argmin(inside[sel], axis=1)
+        idx = (first[:, None] + order) % 3
+        t = np.take_along_axis(tris[sel], idx[:, :, None], axis=1)
+        dd = np.take_along_axis(d[sel], idx, axis=1)
+        o, b, c = t[:, 0], t[:, 1], t[:, 2]
+        pb = o + (b - o) * (dd[:, 0] / (dd[:, 0] - dd[:, 1]))[:, None]
+        pc = o + (c - o) * (dd[:, 0] / (dd[:, 0] - dd[:, 2]))[:, None]
+        result.append(np.stack([pb, b, c], axis=1))
+        result.append(np.stack([pb, c, pc], axis=1))
+        result_colors += [colors[sel], colors[sel]]
+
+    return np.concatenate(result), np.concatenate(result_colors)
+
+
+def clip_quads(quads, colors):
+    """
+    Отсекает грани (Q, 4, 4) плоскостью near. Грани целиком перед камерой
+    остаются четырёхугольниками; пересекающие плоскость режутся на треугольники,
+    которые дополняются до четырёх вершин повтором последней.
+    """
+    d = quads[:, :, 2] + quads[:, :, 3]
+    crossing = (d < 0).any(axis=1)
+    if not crossing.any():
+        return quads, colors
+
+    cut = quads[crossing]
+    tris = np.concatenate([cut[:, [0, 1, 2]], cut[:, [0, 2, 3]]])
+    tri_colors = np.concatenate([colors[crossing], colors[crossing]])
+    tris, tri_colors = clip_near(tris, tri_colors)
+    return (np.concatenate([quads[~crossing], tris[:, [0, 1, 2, 2]]]),
+            np.concatenate([colors[~crossing], tri_colors]))
+
+
+def to_screen(polys, width, height):
+    """Перспективное деление: clip (P, K, 4) -> экран (P, K, 3) с z в NDC"""
+    w = polys[..., 3]
+    screen = np.empty(polys.shape[:2] + (3,), dtype=np.float32)
+    screen[..., 0] = (polys[..., 0] / w * 0.5 + 0.5) * width
+    screen[..., 1] = (0.5 - polys[..., 1] / w * 0.5) * height
+    screen[..., 2] = polys[..., 2] / w
+    return screen
+
+
+def near_screen_bounds(clip, width, height):
+    """
+    Экранная рамка (lo, hi) кубов (K, 8, 4), пересекающих ближнюю плоскость:
+    по вершинам перед ней и точкам, где её пересекают рёбра. У куба целиком
+    за плоскостью рамка пустая (lo = inf, hi = -inf).
+    """
+    p0, p1 = clip[:, CUBE_EDGES[:, 0]], clip[:, CUBE_EDGES[:, 1]]
+    w0, w1 = p0[..., 3:], p1[..., 3:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cut = p0 + (p1 - p0) * ((NEAR - w0) / (w1 - w0))
+    points = np.concatenate([clip, cut], axis=1)
+    valid = np.concatenate([clip[..., 3] > NEAR, (w0[..., 0] > NEAR) != (w1[..., 0] > NEAR)], axis=1)
+    points[..., 3] = np.where(valid, points[..., 3], 1.0)  # без деления на ноль
+    screen = to_screen(points, width, height)
+    lo = np.where(valid[..., None], screen, np.inf).min(axis=1)
+    hi = np.where(valid[..., None], screen, -np.inf).max(axis=1)
+    return lo, hi
+
+
+def rasterize(polys, colors, color_buffer, depth_buffer, width, height, rows=None):
+    """
+    Растеризует выпуклые экранные многоугольники в буферы.
+    polys: (P, K, 3) - x, y в пикселях и z (NDC), K = 3 или 4; colors: (P,) uint32.
+    rows: (y0, y1) - рисовать только строки экрана y0 <= y < y1 (тайл).
+    Для каждой строки многоугольника аналитически вычисляется отрезок [xs, xe]
+    по рёберным функциям, затем фрагменты строк разворачиваются в плоские
+    массивы. Многоугольники идут от ближних к дальним; строки, целиком
+    перекрытые буфером глубины на входе, отбрасываются ещё до разворота
+    (hiz.row_max), а остальные перекрытые фрагменты - ранним тестом глубины
+    до np.minimum.at.
+    """
+    if len(polys) == 0:
+        return
+
+    x, y, z = polys[:, :, 0], polys[:, :, 1], polys[:, :, 2]
+    xn, yn = np.roll(x, -1, axis=1), np.roll(y, -1, axis=1)
+
+    # Знак площади (формула шнурков) - внутри все рёберные функции >= 0
+    area = (x * yn - xn * y).sum(axis=1)
+    y0, y1 = rows if rows is not None else (0, height)
+    row_start = np.maximum(np.ceil(y.min(axis=1) - 0.5), y0).astype(np.int32)
+    row_end = np.minimum(np.floor(y.max(axis=1) - 0.5), y1 - 1).astype(np.int32)
+    keep = (np.abs(area) > 1e-6) & (row_end >= row_start) \
+        & (x.max(axis=1) > 0) & (x.min(axis=1) < width)
+    if not keep.any():
+        return
+
+    # Ближние многоугольники первыми
+    order = np.flatnonzero(keep)
+    order = order[np.argsort(z[order].min(axis=1), kind="stable")]
+    x, y, z, xn, yn = x[order], y[order], z[order], xn[order], yn[order]
+    area, colors = area[order], colors[order]
+    row_start, row_end = row_start[order], row_end[order]
+
+    # Рёберные функции e = A*x + B*y + C, внутри многоугольника все e >= 0.
+    # В строке y ребро с A > 0 ограничивает отрезок слева, с A < 0 - справа:
+    # граница x = x0 + slope * (y - y0), где (x0, y0) - начало ребра.
+    # Горизонтальные рёбра не нужны: строки и так ограничены по y.
+    sign = np.sign(area)[:, None]
+    edge_a = (y - yn) * sign
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(y != yn, (xn - x) / (yn - y), 0)
+    left_edges = np.stack([np.where(edge_a > 0, x, -np.inf),
+                           np.where(edge_a > 0, slope, 0), y], axis=-1).astype(np.float32)
+    right_edges = np.stack([np.where(edge_a < 0, x, np.inf),
+                            np.where(edge_a < 0, slope, 0), y], axis=-1).astype(np.float32)
+
+    # Плоскость глубины z = z0 + dzdx * (x - x0) + dzdy * (y - y0) по вершинам 0, 1, 2
+    ex1, ey1, ez1 = x[:, 1] - x[:, 0], y[:, 1] - y[:, 0], z[:, 1] - z[:, 0]
+    ex2, ey2, ez2 = x[:, 2] - x[:, 0], y[:, 2] - y[:, 0], z[:, 2] - z[:, 0]
+    det = ex1 * ey2 - ey1 * ex2
+    det = np.where(np.abs(det) > 1e-12, det, 1e-12)
+    dzdx = ((ez1 * ey2 - ey1 * ez2) / det).astype(np.float32)
+    dzdy = ((ex1 * ez2 - ez1 * ex2) / det).astype(np.float32)
+
+    # Строки: каждая строка многоугольника - отдельный элемент
+    rows = row_end - row_start + 1
+    prim = np.repeat(np.arange(len(rows)), rows)
+    row_y = (np.arange(len(prim)) - np.repeat(np.cumsum(rows) - rows, rows)
+             + row_start[prim]).astype(np.int32)
+    yc = row_y.astype(np.float32) + 0.5
+
+    # Граница строки по каждому ребру отдельно: по столбцам рёбер, а не
+    # свёрткой (R, K) по короткой оси
+    left = right = None
+    for k in range(polys.shape[1]):
+        edge = [np.repeat(column, rows) for column in left_edges[:, k].T]
+        bound = edge[0] + edge[1] * (yc - edge[2])
+        left = bound if left is None else np.maximum(left, bound, out=left)
+        edge = [np.repeat(column, rows) for column in right_edges[:, k].T]
+        bound = edge[0] + edge[1] * (yc - edge[2])
+        right = bound if right is None else np.minimum(right, bound, out=right)
+
+    xs = np.maximum(np.ceil(left - 0.5), 0)
+    xe = np.minimum(np.floor(right - 0.5), width - 1)
+    lengths = np.where(xe < xs, 0, xe - xs + 1).astype(np.int32)
+
+    # Дальше работаем только с непустыми строками
+    live = np.flatnonzero(lengths)
+    if len(live) == 0:
+        return
+    prim, lengths = prim[live], lengths[live]
+    xs, yc, row_y = xs[live].astype(np.int32), yc[live], row_y[live]
+
+    # Глубина и адрес первого пикселя каждой строки, шаг глубины по x
+    row_dz = dzdx[prim]
+    row_z = (z[prim, 0] + row_dz * (xs + 0.5 - x[prim, 0])
+             + dzdy[prim] * (yc - y[prim, 0])).astype(np.float32)
+
+    # Строки, целиком дальше уже нарисованного, отбрасываются до разворота
+    # во фрагменты. Глубина линейна вдоль строки - минимум на одном из
+    # концов (теми же операциями, что у фрагментов)
+    row_near = np.minimum(row_z, row_z + row_dz * (lengths - 1).astype(np.float32))
+    row_far = hiz.row_max(hiz.build_rows(depth_buffer, width, y0, y1), y0, row_y, xs, xs + lengths - 1)
+    live = np.flatnonzero(row_near < row_far)
+    if len(live) == 0:
+        return
+    prim, lengths, xs, row_y, row_dz, row_z = (prim[live], lengths[live], xs[live], row_y[live],
+                                               row_dz[live], row_z[live])
+    row_pix = row_y * width + xs
+    row_colors = colors[prim]
+
+    # Фрагменты пакетами примерно по RASTER_CHUNK штук
+    ends = np.cumsum(lengths, dtype=np.int64)
+    cuts = np.searchsorted(ends, np.arange(RASTER_CHUNK, ends[-1], RASTER_CHUNK))
+    for r0, r1 in zip(np.concatenate([[0], cuts]), np.concatenate([cuts, [len(lengths)]])):
+        span = lengths[r0:r1]
+        total = int(span.sum())
+        if total == 0:
+            continue
+        # Смещение фрагмента от начала своей строки
+        offset = np.arange(total, dtype=np.int32) - np.repeat(np.cumsum(span) - span, span)
+        pix = np.repeat(row_pix[r0:r1], span) + offset
+        depth = np.repeat(row_z[r0:r1], span) + np.repeat(row_dz[r0:r1], span) * offset.astype(np.float32)
+
+        # Ранний тест глубины против уже записанного
+        front = depth < depth_buffer[pix]
+        pix, depth = pix[front], depth[front]
+        fragment_colors = np.repeat(row_colors[r0:r1], span)[front]
+        np.minimum.at(depth_buffer, pix, depth)
+        win = np.flatnonzero(depth <= depth_buffer[pix])[::-1]
+        # При равной глубине побеждает первый фрагмент, как между пакетами
+        # (там тест строгий), - иначе итог зависел бы от границ пакетов и
+        # тайлов. Из повторов индекса присваивание оставляет последний
+        color_buffer[pix[win]] = fragment_colors[win]
+
+
+def splat(x, y, sizes, depths, colors, color_buffer, depth_buffer, width, height):
+    """
+    Рисует точки-импостеры: квадраты sizes x sizes пикселей с центром (x, y)
+    и постоянной глубиной, с тем же тестом глубины, что у многоугольников.
+    """
+    for size in np.unique(sizes):
+        sel = np.flatnonzero(sizes == size)
+        x0 = np.floor(x[sel] - size * 0.5 + 0.5).astype(np.int32)
+        y0 = np.floor(y[sel] - size * 0.5 + 0.5).astype(np.int32)
+        grid = np.arange(size, dtype=np.int32)
+        px = (x0[:, None, None] + grid[None, None, :]).repeat(size, axis=1).ravel()
+        py = (y0[:, None, None] + grid[None, :, None]).repeat(size, axis=2).ravel()
+        depth = np.repeat(depths[sel], size * size)
+        color = np.repeat(colors[sel], size * size)
+        inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+        pix = py[inside] * width + px[inside]
+        depth, color = depth[inside], color[inside]
+        np.minimum.at(depth_buffer, pix, depth)
+        win = depth <= depth_buffer[pix]
+        color_buffer[pix[win]] = color[win]
+
+
+def rasterize_tiled(polys, colors, color_buffer, depth_buffer, width, height, pool):
+    """
+    Делит экран на горизонтальные тайлы по TILE_ROWS строк, раскладывает
+    многоугольники по тайлам, которые они задевают, и растеризует тайлы
+    параллельно в процессах пула (TilePool). Тайлы пишут в
+    непересекающиеся строки буферов, поэтому синхронизация не нужна.
+    """
+    if len(polys) == 0:
+        return
+    ys = polys[:, :, 1]
+    top = np.ceil(ys.min(axis=1) - 0.5)
+    bottom = np.floor(ys.max(axis=1) - 0.5)
+
+    # Тайлов хотя бы вдвое больше процессов, чтобы выровнять нагрузку
+    tile_rows = max(8, min(TILE_ROWS, -(-height // (2 * pool.workers))))
+    jobs, first, last = [], height, 0
+    for y0 in range(0, height, tile_rows):
+        y1 = min(y0 + tile_rows, height)
+        idx = np.flatnonzero((bottom >= y0) & (top < y1))
+        if len(idx):
+            jobs.append(((polys[idx], colors[idx]), (width, height, (y0, y1))))
+            first, last = min(first, y0), y1
+    if jobs:
+        pool.run(rasterize, jobs, color_buffer, depth_buffer, (first * width, last * width))
+
+
+# Цветовых буферов кадра: выводимый, готовый к выводу и тот, в который рисуем
+FRAME_BUFFERS = 3
+
+
+class CpuRenderer:
+    """Замена renderer3d.dll: те же функции, рендер в NumPy-буфер"""
+
+    def __init__(self):
+        self.camera = OrbitCamera()
+        self.width = 0
+        self.height = 0
+        self.background = pack_rgb(0.1, 0.1, 0.15)
+        self.color_buffer = np.zeros(0, dtype=np.uint32)  # сюда рисуется текущий кадр
+        self.depth_buffer = np.zeros(0, dtype=np.float32)
+        self._buffers = []
+        self._back = 0  # номер буфера, в который рисуется кадр
+        self._front = None  # номер последнего готового кадра (после swap_buffers)
+        self._front_frame = None
+        self._presenting = None  # номер буфера, который сейчас читает вывод
+        self._swap_lock = threading.Lock()
+        self.running = False
+        self.visible_count = 0
+        self.culled_count = 0
+        self.occluded_count = 0
+        self.occlusion_culling = True
+        self._occlusion_skip = 0  # кадров без теста Hi-Z, пока он не окупается
+        self.impostor_count = 0
+        self.lod_point_pixels = LOD_POINT_PIXELS
+        self.lod_cluster_pixels = LOD_CLUSTER_PIXELS
+        self.profiler = None  # FrameProfiler: время стадий cull/transform/raster
+        self.voxel_size = 1.0
+        self._voxels = None  # VoxelWorld в воксельном режиме
+        self.engine = ENGINE_RASTER
+        self._rays_key = None  # вид, для которого посчитаны направления лучей
+        self._ray_inv = None
+        self._hiz_levels = None  # пирамида Hi-Z текущей пачки кубов
+        # Матрицы вида кадра: пересчитываются, только когда камера сдвинулась или сменился размер
+        self._view_key = None
+        self._view = None
+        self.view_updates = 0
+        # Один процесс, пока замер не покажет выигрыш от тайлов; больше - через SetWorkerCount
+        self.workers = 1
+        self._pool = None
+        self._bvh = CubeBVH()
+        self._clear_storage()
+
+    def _clear_storage(self):
+        self._count = 0
+        self._cubes = np.zeros((16, 4), dtype=np.float32)
+        self._colors = np.zeros(16, dtype=np.uint32)
+        self._bvh.clear()
+        if self._voxels is not None:
+            self._voxels.clear()
+
+    def _reserve(self, count):
+        """Амортизированный рост массивов сцены"""
+        capacity = len(self._cubes)
+        if count <= capacity:
+            return
+        while capacity < count:
+            capacity *= 2
+        for name in ("_cubes", "_colors"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._count] = old[:self._count]
+            setattr(self, name, new)
+
+    @property
+    def framebuffer(self):
+        """Цветовой буфер кадра (height, width) uint32 в формате 0xFFRRGGBB"""
+        return self.color_buffer.reshape(self.height, self.width)
+
+    # === Вывод кадра без копирования ===
+
+    def swap_buffers(self):
+        """
+        Готовый кадр становится передним, следующий рисуется в свободный
+        буфер - не передний и не тот, что сейчас выводится.
+        """
+        with self._swap_lock:
+            self._front = self._back
+            self._front_frame = self.framebuffer
+            for i in range(len(self._buffers)):
+                if i != self._front and i != self._presenting:
+                    self._back = i
+                    break
+            self.color_buffer = self._buffers[self._back]
+
+    def acquire_front(self):
+        """Передний кадр (height, width) или None; не перерисуется до release_front"""
+        with self._swap_lock:
+            self._presenting = self._front
+            return self._front_frame
+
+    def release_front(self):
+        with self._swap_lock:
+            self._presenting = None
+
+    # === API, совместимый с renderer3d.dll ===
+
+    def InitRenderer3D(self, width, height):
+        self.ResizeRenderer(width, height)
+        self.SetWorkerCount(self.workers)  # пул процессов после CloseRenderer3D
+        self.camera.reset()
+        self._clear_storage()
+        self.running = True
+
+    def ResizeRenderer(self, width, height):
+        """Меняет размер кадра: пересоздаются только буферы, сцена и камера остаются"""
+        self.width = max(int(width), 1)
+        self.height = max(int(height), 1)
+        # Проекция считается из width/height в каждом кадре
+        buffers = [np.full(self.width * self.height, self.background, dtype=np.uint32)
+                   for _ in range(FRAME_BUFFERS)]
+        with self._swap_lock:
+            # Последний готовый кадр остаётся передним (держит свой старый
+            # буфер), пока swap_buffers не отдаст кадр нового размера, -
+            # вывод растягивает его, а не пропускает отрисовку
+            self._buffers = buffers
+            self._back, self._front = 0, None
+            self.color_buffer = buffers[0]
+        self.depth_buffer = np.full(self.width * self.height, np.inf, dtype=np.float32)
+
+    def CloseRenderer3D(self):
+        self.running = False
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def SetWorkerCount(self, count):
+        """Число процессов растеризации; 1 - без тайлов, в текущем потоке"""
+        count = max(int(count), 1)
+        if count == self.workers and (count == 1 or self._pool is not None):
+            return
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.workers = count
+        if count > 1:
+            self._pool = TilePool(count)
+
+    def GetWorkerCount(self):
+        return self.workers
+
+    def IsRunning(self):
+        return self.running
+
+    def AddCube(self, x, y, z, size):
+        self._append(np.array([[x, y, z, size]], dtype=np.float32))
+
+    def AddCubes(self, data, count):
+        """
+        Добавляет count кубов из непрерывного буфера (count, 4) float32:
+        x, y, z, size. data - указатель ctypes (как у DLL) или любой объект
+        с протоколом буфера; данные читаются без промежуточного копирования.
+        """
+        count = int(count)
+        if count <= 0:
+            return
+        if isinstance(data, ctypes._Pointer):
+            cubes = np.ctypeslib.as_array(data, shape=(count, 4))
+        else:
+            cubes = np.frombuffer(data, dtype=np.float32, count=count * 4).reshape(count, 4)
+        self._append(cubes)
+
+    def SetCubeColors(self, data, first, count):
+        """Задаёт цвета кубов [first, first + count) из буфера uint32 0xRRGGBB"""
+        count = int(count)
+        if count <= 0:
+            return
+        if isinstance(data, ctypes._Pointer):
+            colors = np.ctypeslib.as_array(data, shape=(count,))
+        else:
+            colors = np.frombuffer(data, dtype=np.uint32, count=count)
+        self._colors[first:first + count] = colors | np.uint32(0xff000000)
+
+    def SetCubes(self, data, first, count):
+        """
+        Заменяет кубы [first, first + count) данными (count, 4) float32 из
+        буфера, как у AddCubes; цвета остаются. BVH пересчитывает только
+        листья изменённых кубов.
+        """
+        count = int(count)
+        if count <= 0:
+            return
+        first = int(first)
+        if first < 0 or first + count > self._count:
+            raise ValueError(f"кубы [{first}, {first + count}) вне сцены из {self._count}")
+        if isinstance(data, ctypes._Pointer):
+            cubes = np.ctypeslib.as_array(data, shape=(count, 4))
+        else:
+            cubes = np.frombuffer(data, dtype=np.float32, count=count * 4).reshape(count, 4)
+        self._cubes[first:first + count] = cubes
+        self._bvh.update(self._cubes[:self._count], np.arange(first, first + count))
+        self._rebuild_voxels()
+
+    def TruncateCubes(self, count):
+        """Оставляет первые count кубов - удаление с конца (swap-remove сцены)"""
+        count = max(int(count), 0)
+        if count >= self._count:
+            return
+        self._count = count
+        self._bvh.truncate(self._cubes[:count], count)
+        self._rebuild_voxels()
+
+    def _rebuild_voxels(self):
+        # Одну ячейку могут делить несколько кубов, поэтому после правки на
+        # месте воксели собираются заново, а не вычитаются
+        if self._voxels is not None:
+            self._voxels.clear()
+            self._voxels.add_cubes(self._cubes[:self._count])
+
+    def _append(self, cubes):
+        start, end = self._count, self._count + len(cubes)
+        self._reserve(end)
+        self._cubes[start:end] = cubes
+        self._colors[start:end] = CUBE_PALETTE[np.arange(start, end) % len(CUBE_PALETTE)]
+        self._count = end
+        self._bvh.append(self._cubes[:end], start)
+        if self._voxels is not None:
+            self._voxels.add_cubes(cubes)
+
+    def ClearScene(self):
+        self._clear_storage()
+
+    def GetObjectCount(self):
+        return self._count
+
+    def GetVisibleCount(self):
+        """Сколько кубов (в воксельном режиме - граней) прошло отсечение в последнем кадре"""
+        return self.visible_count
+
+    def GetCulledCount(self):
+        """Сколько кубов (в воксельном режиме - граней) отсечено в последнем кадре"""
+        return self.culled_count
+
+    def GetOccludedCount(self):
+        """Сколько видимых кубов пропущено как закрытые другими (Hi-Z)"""
+        return self.occluded_count
+
+    def SetOcclusionCulling(self, enabled):
+        self.occlusion_culling = bool(enabled)
+        self._occlusion_skip = 0
+
+    def SetLodThresholds(self, point_pixels, cluster_pixels):
+        """Порог размера куба (пиксели) для замены точкой и размер ячейки слияния; 0 - LOD выключен"""
+        self.lod_point_pixels = max(float(point_pixels), 0.0)
+        self.lod_cluster_pixels = max(int(cluster_pixels), 1)
+
+    def GetImpostorCount(self):
+        """Сколько кубов в последнем кадре нарисовано точками-импостерами"""
+        return self.impostor_count
+
+    def SetVoxelMode(self, enabled, voxel_size=1.0):
+        """
+        Воксельный режим: каждый куб - воксель решётки с шагом voxel_size (по
+        ячейке своего центра), рисуются только открытые грани, слитые в
+        прямоугольники по чанкам (voxels.py). Кубы сцены не меняются.
+        """
+        if not enabled:
+            self._voxels = None
+            return
+        import voxels  # voxels берёт палитру отсюда - импорт только по требованию
+        self.voxel_size = float(voxel_size)
+        self._voxels = voxels.VoxelWorld(self.voxel_size)
+        self._voxels.add_cubes(self._cubes[:self._count])
+
+    def GetVoxelQuadCount(self):
+        """Граней (по два треугольника) в сетке воксельного режима; 0 - режим выключен"""
+        return 0 if self._voxels is None else self._voxels.quad_count
+
+    def SetRenderEngine(self, engine):
+        """ENGINE_RASTER - растеризация граней, ENGINE_RAYCAST - лучи с точной глубиной"""
+        engine = int(engine)
+        if engine not in (ENGINE_RASTER, ENGINE_RAYCAST):
+            raise ValueError(f"неизвестный движок рендера: {engine}")
+        self.engine = engine
+
+    def GetRenderEngine(self):
+        return self.engine
+
+    def RotateCamera(self, dx, dy):
+        self.camera.rotate(dx, dy)
+
+    def MoveCamera(self, dx, dy):
+        self.camera.move(dx, dy)
+
+    def ZoomCamera(self, factor):
+        self.camera.zoom(factor)
+
+    def ResetCamera(self):
+        self.camera.reset()
+
+    def SetBackgroundColor(self, r, g, b):
+        self.background = pack_rgb(r, g, b)
+
+    def RenderFrame(self):
+        if self.width == 0:
+            return
+        self.color_buffer.fill(self.background)
+        self.depth_buffer.fill(np.inf)
+        self.visible_count, self.culled_count, self.occluded_count = 0, self._count, 0
+        self.impostor_count = 0
+        self._hiz_levels = None
+        if self._count == 0:
+            return
+
+        n = self._count
+        prof = self.profiler
+        proj, view_proj, planes, eye = self.view()
+
+        if self._voxels is not None:
+            self._draw_voxels(view_proj, planes, eye)
+            return
+
+        # Иерархическое отсечение: только кубы из узлов BVH, задевающих пирамиду
+        candidates = self._bvh.query(self._cubes[:n], planes)
+        if prof is not None:
+            prof.lap("cull")
+
+        # Инстансинг: 8 вершин единичного куба преобразуются один раз за кадр,
+        # а каждый экземпляр - это только центр и масштаб:
+        # VP * (c + s * v) = VP * c + s * (VP * v без сдвига)
+        unit_clip = (CUBE_VERTICES @ view_proj[:, :3].T).astype(np.float32)
+        instances = self._cubes[candidates]
+        center_clip = instances[:, :3] @ view_proj[:, :3].T + view_proj[:, 3]
+        clip = center_clip[:, None, :] + instances[:, 3, None, None] * unit_clip
+        if prof is not None:
+            prof.lap("transform")
+
+        # Точное отсечение оставшихся кубов по пирамиде видимости
+        cx, cy, cz, cw = clip[..., 0], clip[..., 1], clip[..., 2], clip[..., 3]
+        outside = ((cx > cw).all(axis=1) | (cx < -cw).all(axis=1)
+                   | (cy > cw).all(axis=1) | (cy < -cw).all(axis=1)
+                   | (cz > cw).all(axis=1) | (cz < -cw).all(axis=1))
+        local = np.flatnonzero(~outside)
+        clip = clip[local]
+        visible = candidates[local]
+        self.visible_count, self.culled_count = len(visible), n - len(visible)
+        if len(visible) == 0:
+            return
+
+        # LOD: кубы размером меньше порога на экране рисуются точками
+        if self.lod_point_pixels > 0:
+            w = center_clip[local, 3]
+            pixels = instances[local, 3] * proj[1, 1] * self.height * 0.5 / np.maximum(w, NEAR)
+            small = (pixels < self.lod_point_pixels) & (w > NEAR)
+            if small.any():
+                self._draw_impostors(visible[small], center_clip[local[small]], pixels[small], eye)
+                big = ~small
+                visible, clip = visible[big], clip[big]
+                if len(visible) == 0:
+                    return
+
+        # Отсечение нелицевых граней: грань видна, если камера перед её плоскостью.
+        # Лучам оно не нужно - луч сам находит ближнюю грань
+        to_eye = eye - self._cubes[visible, :3]
+        facing = None
+        if self.engine == ENGINE_RASTER:
+            facing = (to_eye @ CUBE_FACE_NORMALS.T) > self._cubes[visible, 3:4] * 0.5
+        if prof is not None:
+            prof.lap("cull")
+
+        if not self.occlusion_culling or len(visible) < OCCLUSION_MIN_VISIBLE or self._occlusion_skip > 0:
+            self._occlusion_skip = max(self._occlusion_skip - 1, 0)
+            self._draw_cubes(visible, clip, facing)
+            return
+
+        # Кубы рисуются пачками от ближних к дальним: первая пачка - окклюдеры,
+        # каждая следующая (вдвое больше) сначала проверяется по пирамиде
+        # глубины всего, что уже нарисовано. Пирамида строится один раз после
+        # окклюдеров, дальше в ней обновляется только рамка предыдущей пачки
+        order = np.argsort(np.einsum("ij,ij->i", to_eye, to_eye))
+        start, size, dirty = 0, OCCLUDERS_MIN, None
+        while start < len(order):
+            batch = order[start:start + size]
+            if start > 0:
+                if self._hiz_levels is None:
+                    self._hiz_levels = hiz.build_pyramid(self.depth_buffer, self.width, self.height)
+                elif dirty is not None:
+                    hiz.refresh(self._hiz_levels, *dirty)
+                hidden, dirty = self._occluded(clip[batch])
+                self.occluded_count += int(hidden.sum())
+                batch = batch[~hidden]
+                if prof is not None:
+                    prof.lap("cull")
+            self._draw_cubes(visible[batch], clip[batch], None if facing is None else facing[batch])
+            start, size = start + size, size * OCCLUDER_GROWTH
+        if self.occluded_count < OCCLUSION_MIN_SHARE * len(visible):
+            self._occlusion_skip = OCCLUSION_RETRY_FRAMES
+
+    def view(self):
+        """
+        (proj, view_proj, плоскости пирамиды, положение камеры) текущего кадра.
+        Пересчитываются, только если камера сдвинулась или сменился размер кадра.
+        """
+        key = self.camera.state() + (self.width, self.height)
+        if key != self._view_key:
+            proj = perspective_matrix(self.width, self.height)
+            view_proj = proj @ self.camera.view_matrix()
+            self._view = (proj, view_proj, frustum_planes(view_proj), self.camera.eye())
+            self._view_key = key
+            self.view_updates += 1
+        return self._view
+
+    def _draw_impostors(self, cubes, center_clip, pixels, eye):
+        """
+        Мелкие кубы - точки с глубиной центра и цветом грани, обращённой к
+        камере. Точки одной ячейки LOD_CLUSTER_PIXELS сливаются в один
+        импостер: ближайший куб ячейки, размером с крупнейший из слитых.
+        """
+        self.impostor_count = len(cubes)
+        w = center_clip[:, 3]
+        x = (center_clip[:, 0] / w * 0.5 + 0.5) * self.width
+        y = (0.5 - center_clip[:, 1] / w * 0.5) * self.height
+        depth = (center_clip[:, 2] / w).astype(np.float32)
+
+        cell = self.lod_cluster_pixels
+        columns = -(-self.width // cell)
+        key = np.floor(y / cell).astype(np.int64) * columns + np.floor(x / cell).astype(np.int64)
+        order = np.lexsort((depth, key))
+        key = key[order]
+        first = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        sizes = np.maximum.reduceat(pixels[order], first)
+        nearest = order[first]
+
+        # Яркость грани, сильнее всего повёрнутой к камере
+        to_eye = eye - self._cubes[cubes[nearest], :3]
+        face = np.argmax(to_eye @ CUBE_FACE_NORMALS.T, axis=1)
+        intensity = AMBIENT + (1 - AMBIENT) * np.maximum(CUBE_FACE_NORMALS @ LIGHT_DIRECTION, 0)
+        colors = shade_colors(self._colors[cubes[nearest]], intensity[face])
+
+        sizes = np.clip(np.ceil(sizes), 1, cell).astype(np.int32)
+        splat(x[nearest], y[nearest], sizes, depth[nearest], colors,
+              self.color_buffer, self.depth_buffer, self.width, self.height)
+
+    def _occluded(self, clip):
+        """
+        Маска кубов (по их 8 вершинам в clip-пространстве), закрытых уже
+        нарисованным, и рамка x0, y0, x1, y1, куда попадут оставшиеся
+        (None - им ничего не нужно рисовать)
+        """
+        w = clip[..., 3]
+        # Кубы, пересекающие ближнюю плоскость, не проверяем
+        front = (w > NEAR).all(axis=1)
+        result = np.zeros(len(clip), dtype=bool)
+        everywhere = (0, 0, self.width - 1, self.height - 1)
+        if not front.any():
+            return result, everywhere
+        idx = np.flatnonzero(front)
+        screen = to_screen(clip[idx], self.width, self.height)
+        lo, hi = screen.min(axis=1), screen.max(axis=1)
+        x0 = np.clip(np.floor(lo[:, 0]), 0, self.width - 1).astype(np.int32)
+        x1 = np.clip(np.floor(hi[:, 0]), 0, self.width - 1).astype(np.int32)
+        y0 = np.clip(np.floor(lo[:, 1]), 0, self.height - 1).astype(np.int32)
+        y1 = np.clip(np.floor(hi[:, 1]), 0, self.height - 1).astype(np.int32)
+        hidden = hiz.occluded(self._hiz_levels, x0, y0, x1, y1, lo[:, 2])
+        result[idx] = hidden
+        if len(idx) < len(clip):
+            return result, everywhere
+        shown = ~hidden
+        if not shown.any():
+            return result, None
+        return result, (int(x0[shown].min()), int(y0[shown].min()), int(x1[shown].max()), int(y1[shown].max()))
+
+    def _draw_cubes(self, cubes, clip, facing):
+        """Освещает, отсекает по ближней плоскости и растеризует лицевые грани кубов"""
+        if self.engine == ENGINE_RAYCAST:
+            self._cast_cubes(cubes, clip)
+            return
+        cube_idx, face_idx = np.nonzero(facing)
+
+        # Освещение: одна яркость на каждую из 6 нормалей
+        intensity = AMBIENT + (1 - AMBIENT) * np.maximum(CUBE_FACE_NORMALS @ LIGHT_DIRECTION, 0)
+        face_colors = shade_colors(self._colors[cubes[cube_idx]], intensity[face_idx])
+
+        self._draw_quads(clip[cube_idx[:, None], CUBE_FACES[face_idx]], face_colors)
+
+    def _cast_cubes(self, cubes, clip):
+        """Движок лучей: лучи пикселей экранной рамки куба против его AABB"""
+        prof = self.profiler
+        proj, _, _, eye = self.view()
+        if self._rays_key != self._view_key:
+            right, up, forward = self.camera.basis()
+            self._ray_inv = raycast.inverse_directions(right, up, forward, self.width, self.height, FOV_Y)
+            self._rays_key = self._view_key
+
+        # Экранная рамка по 8 вершинам; у кубов, пересекающих ближнюю
+        # плоскость, - по вершинам перед ней и точкам пересечения рёбер
+        w = clip[..., 3]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            screen = to_screen(clip, self.width, self.height)
+        lo, hi = screen.min(axis=1), screen.max(axis=1)
+        crossing = np.flatnonzero((w <= NEAR).any(axis=1))
+        if len(crossing):
+            lo[crossing], hi[crossing] = near_screen_bounds(clip[crossing], self.width, self.height)
+        bounds = np.stack([
+            np.clip(np.ceil(lo[:, 0] - 0.5), 0, self.width),
+            np.clip(np.ceil(lo[:, 1] - 0.5), 0, self.height),
+            np.clip(np.floor(hi[:, 0] - 0.5), -1, self.width - 1),
+            np.clip(np.floor(hi[:, 1] - 0.5), -1, self.height - 1),
+        ], axis=1).astype(np.int32)
+
+        # Ближняя точка куба не ближе ближайшей вершины (глубина линейна) и near
+        a, b = -proj[2, 2], proj[2, 3]
+        depth_min = (a + b / np.maximum(w.min(axis=1), NEAR)).astype(np.float32)
+        order = np.argsort(depth_min, kind="stable")
+        cubes, bounds, depth_min = cubes[order], bounds[order], depth_min[order]
+
+        centers = self._cubes[cubes, :3] - eye
+        half = self._cubes[cubes, 3:4] * 0.5
+        intensity = AMBIENT + (1 - AMBIENT) * np.maximum(CUBE_FACE_NORMALS @ LIGHT_DIRECTION, 0)
+        face_colors = shade_colors(self._colors[cubes, None], intensity[None, :])
+        if prof is not None:
+            prof.lap("transform")
+
+        # Максимум глубины по тайлам пакетов - из пирамиды Hi-Z этой пачки
+        levels = self._hiz_levels
+        tile_depth = levels[raycast.RAY_TILE_SHIFT] if levels and len(levels) > raycast.RAY_TILE_SHIFT else None
+        args = ((centers - half).T.copy(), (centers + half).T.copy(), bounds, depth_min, face_colors, self._ray_inv,
+                (a, b), NEAR, self.color_buffer, self.depth_buffer, self.width, self.height)
+        if self._pool is not None:
+            raycast.cast_tiled(*args, tile_depth, self._pool, TILE_ROWS)
+        else:
+            raycast.cast(*args, tile_depth=tile_depth)
+        if prof is not None:
+            prof.lap("raster")
+
+    def _draw_voxels(self, view_proj, planes, eye):
+        """Воксельный режим: слитые грани чанков, задевающих пирамиду видимости"""
+        prof = self.profiler
+        voxels = self._voxels
+        voxels.update()  # сетка только изменённых чанков
+        if prof is not None:
+            prof.lap("upload")
+
+        mins, maxs = voxels.chunk_boxes()
+        outside, _ = classify_boxes(mins, maxs, planes)
+        quads, faces, colors = voxels.mesh(~outside)
+        # Грань видна, если камера перед её плоскостью
+        axis, sign = faces // 2, np.where(faces % 2, 1.0, -1.0)
+        facing = (eye[axis] - quads[np.arange(len(quads)), 0, axis]) * sign > 0
+        quads, faces, colors = quads[facing], faces[facing], colors[facing]
+
+        clip = quads @ view_proj[:, :3].T + view_proj[:, 3]
+        cx, cy, cz, cw = clip[..., 0], clip[..., 1], clip[..., 2], clip[..., 3]
+        inside = ~((cx > cw).all(axis=1) | (cx < -cw).all(axis=1)
+                   | (cy > cw).all(axis=1) | (cy < -cw).all(axis=1)
+                   | (cz > cw).all(axis=1) | (cz < -cw).all(axis=1))
+        clip, faces, colors = clip[inside], faces[inside], colors[inside]
+        self.visible_count = len(clip)
+        self.culled_count = voxels.quad_count - len(clip)
+        if prof is not None:
+            prof.lap("cull")
+
+        intensity = AMBIENT + (1 - AMBIENT) * np.maximum(CUBE_FACE_NORMALS @ LIGHT_DIRECTION, 0)
+        self._draw_quads(clip.astype(np.float32), shade_colors(colors, intensity[faces]))
+
+    def _draw_quads(self, quads, colors):
+        """Отсекает по ближней плоскости и растеризует грани (Q, 4, 4) в clip-пространстве"""
+        prof = self.profiler
+        polys, poly_colors = clip_quads(quads, colors)
+        if len(polys) == 0:
+            return
+        screen = to_screen(polys, self.width, self.height)
+        if prof is not None:
+            prof.lap("transform")
+
+        if self._pool is not None:
+            rasterize_tiled(screen, poly_colors, self.color_buffer, self.depth_buffer,
+                            self.width, self.height, self._pool)
+        else:
+            rasterize(screen, poly_colors, self.color_buffer, self.depth_buffer, self.width, self.height)
+        if prof is not None:
+            prof.lap("raster")
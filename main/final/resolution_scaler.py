@@ -0,0 +1,75 @@
+"""
+Динамическое разрешение: время кадра держится в заданном бюджете.
+
+Рендерер рисует в уменьшенный буфер (масштаб стороны от MIN_SCALE до 1),
+вывод растягивает кадр на весь виджет. После каждого кадра измеренное
+время сглаживается, и масштаб подбирается так, чтобы площадь кадра
+соответствовала запасу до бюджета: при перегрузке разрешение падает
+сразу, при запасе растёт не быстрее MAX_GROWTH за кадр. Масштаб
+округляется до SCALE_STEP, чтобы мелкие колебания времени не
+пересоздавали буферы каждый кадр.
+"""
+import math
+
+# Меньше этой доли стороны разрешение не опускается
+MIN_SCALE = 0.25
+
+# Шаг масштаба
+SCALE_STEP = 1 / 32
+
+# Вес нового кадра в сглаженном времени
+SMOOTHING = 0.3
+
+# Целимся в эту долю бюджета, чтобы скачки времени не выходили за него
+HEADROOM = 0.9
+
+# Во сколько раз сторона может вырасти за кадр (падает - сразу)
+MAX_GROWTH = 1.1
+
+
+class ResolutionScaler:
+    """Масштаб внутреннего разрешения по времени последних кадров"""
+
+    def __init__(self, budget=0.0, min_scale=MIN_SCALE):
+        self.budget = budget  # бюджет кадра, с; 0 - всегда полное разрешение
+        self.min_scale = min_scale
+        self.scale = 1.0
+        self.frame_time = None  # сглаженное время кадра при текущем масштабе
+        self.changes = 0
+
+    @property
+    def enabled(self):
+        return self.budget > 0
+
+    def set_budget(self, budget):
+        """Новый бюджет; True, если масштаб изменился (выключение - снова полное разрешение)"""
+        self.budget = max(budget, 0.0)
+        self.frame_time = None
+        if self.enabled or self.scale == 1.0:
+            return False
+        self.scale = 1.0
+        return True
+
+    def size(self, width, height):
+        """Внутреннее разрешение для виджета width x height"""
+        return max(int(width * self.scale), 1), max(int(height * self.scale), 1)
+
+    def frame_finished(self, seconds):
+        """Учитывает время кадра; True, если масштаб изменился и буферы нужно пересоздать"""
+        if not self.enabled or seconds <= 0:
+            return False
+        if self.frame_time is None:
+            self.frame_time = seconds
+        else:
+            self.frame_time += SMOOTHING * (seconds - self.frame_time)
+        # Время растра пропорционально площади кадра, то есть квадрату масштаба
+        target = self.scale * math.sqrt(self.budget * HEADROOM / self.frame_time)
+        target = min(target, self.scale * MAX_GROWTH, 1.0)
+        target = max(round(target / SCALE_STEP) * SCALE_STEP, self.min_scale)
+        if abs(target - self.scale) < SCALE_STEP / 2:
+            return False
+        # Ожидаемое время при новом масштабе - пока не измерено новое
+        self.frame_time *= (target / self.scale) ** 2
+        self.scale = target
+        self.changes += 1
+        return True
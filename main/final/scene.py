@@ -0,0 +1,393 @@
+"""
+Хранилище сцены на стороне Python: структура массивов (SoA) на NumPy.
+
+Каждый куб - одна строка в колонках фиксированного типа:
+позиция и размер (float32 x4), цвет (uint32), флаги (uint8), плюс
+таблицы handle <-> слот (int32). Это ~29 байт на куб, поэтому сцены
+в миллионы кубов помещаются в память. Сцена - единственный источник
+истины: рендерер получает изменения пачками через take_upload() (новые
+кубы) и take_changes() (правки уже выгруженных: диапазоны слотов и
+укорочение после удаления).
+
+Сцену меняет и читает по handle только поток рендера: RenderQueue
+привязывает её к нему (bind_thread), и из других потоков такие вызовы
+бросают RuntimeError. Счётчики (len, uploaded, pending) можно читать
+откуда угодно.
+"""
+import threading
+
+import numpy as np
+
+from renderer_cpu import CUBE_PALETTE
+from spatial_hash import SpatialHash
+
+# Флаги куба
+FLAG_VISIBLE = 1
+FLAG_SELECTED = 2
+
+# Сколько слотов и handle сверяет adopt
+ADOPT_SAMPLE = 4096
+
+
+class Scene:
+    """Массив кубов со стабильными handle и удалением за O(1) (swap-remove)"""
+
+    def __init__(self, capacity=1024):
+        capacity = max(int(capacity), 1)
+        self._count = 0
+        self._xyzs = np.zeros((capacity, 4), dtype=np.float32)
+        self._colors = np.zeros(capacity, dtype=np.uint32)
+        self._flags = np.zeros(capacity, dtype=np.uint8)
+        self._slot_handle = np.zeros(capacity, dtype=np.int32)
+        self._handle_slot = np.full(capacity, -1, dtype=np.int32)
+        self._next_handle = 0
+        self._free_handles = np.zeros(0, dtype=np.int32)
+        self._free_count = 0
+        # Состояние синхронизации с рендерером: первые _uploaded кубов уже
+        # там, в них изменены слоты [lo, hi) положения и цвета
+        self._uploaded = 0
+        self._moved = None
+        self._recolored = None
+        self._truncated = False
+        self._needs_reset = False
+        self._owner = None  # поток, которому доступна сцена (None - любой)
+        self._spatial = None  # хеш-сетка строится при первом пространственном запросе
+
+    def __len__(self):
+        return self._count
+
+    # === Колонки (представления без копирования) ===
+
+    @property
+    def cubes(self):
+        """(N, 4) float32: x, y, z, size - готовый буфер для AddCubes"""
+        return self._xyzs[:self._count]
+
+    @property
+    def positions(self):
+        return self._xyzs[:self._count, :3]
+
+    @property
+    def sizes(self):
+        return self._xyzs[:self._count, 3]
+
+    @property
+    def colors(self):
+        return self._colors[:self._count]
+
+    @property
+    def flags(self):
+        return self._flags[:self._count]
+
+    @property
+    def handles(self):
+        return self._slot_handle[:self._count]
+
+    @property
+    def handle_slots(self):
+        """Таблица handle -> слот (-1 для удалённых) по всем выданным handle"""
+        return self._handle_slot[:self._next_handle]
+
+    @property
+    def nbytes(self):
+        """Память под колонки и таблицы handle"""
+        return (self._xyzs.nbytes + self._colors.nbytes + self._flags.nbytes
+                + self._slot_handle.nbytes + self._handle_slot.nbytes
+                + self._free_handles.nbytes)
+
+    # === Изменение сцены ===
+
+    def add(self, x, y, z, size, color=None, flags=FLAG_VISIBLE):
+        """Добавляет один куб, возвращает его handle"""
+        colors = None if color is None else [color]
+        return int(self.add_many([[x, y, z, size]], colors, flags)[0])
+
+    def add_many(self, cubes, colors=None, flags=FLAG_VISIBLE):
+        """Добавляет массив кубов (N, 4), возвращает массив handle"""
+        self._check_thread()
+        cubes = np.asarray(cubes, dtype=np.float32).reshape(-1, 4)
+        n = len(cubes)
+        start, end = self._count, self._count + n
+        self._reserve(end)
+
+        handles = self._allocate_handles(n)
+        self._xyzs[start:end] = cubes
+        if colors is None:
+            self._colors[start:end] = CUBE_PALETTE[handles % len(CUBE_PALETTE)]
+        else:
+            self._colors[start:end] = colors
+        self._flags[start:end] = flags
+        self._slot_handle[start:end] = handles
+        self._handle_slot[handles] = np.arange(start, end, dtype=np.int32)
+        self._count = end
+        if self._spatial is not None:
+            self._spatial.insert(handles, cubes)
+        return handles
+
+    def remove(self, handle):
+        """Удаляет куб: на его место переносится последний (O(1))"""
+        self._check_thread()
+        slot = self.slot_of(handle)
+        last = self._count - 1
+        if slot != last:
+            moved = self._slot_handle[last]
+            self._xyzs[slot] = self._xyzs[last]
+            self._colors[slot] = self._colors[last]
+            self._flags[slot] = self._flags[last]
+            self._slot_handle[slot] = moved
+            self._handle_slot[moved] = slot
+            self._mark(slot, moved=True, recolored=True)
+        self._handle_slot[handle] = -1
+        self._release_handle(handle)
+        if self._spatial is not None:
+            self._spatial.remove([handle])
+        self._count = last
+        # Рендерер отрезает хвост, перенесённый куб уходит правкой слота
+        if self._uploaded > last:
+            self._uploaded = last
+            self._truncated = True
+            self._moved = self._clip(self._moved)
+            self._recolored = self._clip(self._recolored)
+
+    def clear(self):
+        self._check_thread()
+        self._count = 0
+        self._handle_slot.fill(-1)
+        self._next_handle = 0
+        self._free_count = 0
+        self._spatial = None
+        self._needs_reset = True
+
+    def set_cube(self, handle, x, y, z, size):
+        self._check_thread()
+        slot = self.slot_of(handle)
+        self._xyzs[slot] = (x, y, z, size)
+        if self._spatial is not None:
+            self._spatial.remove([handle])
+            self._spatial.insert([handle], [(x, y, z, size)])
+        self._mark(slot, moved=True)
+
+    def set_color(self, handle, color):
+        self._check_thread()
+        slot = self.slot_of(handle)
+        self._colors[slot] = color
+        self._mark(slot, recolored=True)
+
+    def select(self, handle):
+        """Выделяет один куб (None - снять выделение); рендерер флаги не видит"""
+        self._check_thread()
+        self.flags[:] &= ~np.uint8(FLAG_SELECTED)
+        if handle is not None:
+            self._flags[self.slot_of(handle)] |= FLAG_SELECTED
+
+    def adopt(self, xyzs, colors, flags, handles, handle_slot):
+        """
+        Заменяет содержимое сцены готовыми колонками без копирования (например,
+        отображёнными в память из файла). Массивы должны быть доступны на запись
+        (для файла - режим copy-on-write); при росте сцены они копируются.
+        ValueError, если колонки не согласованы: длины не совпадают или
+        таблицы handle <-> слот не обратны друг другу (проверяется выборка
+        ADOPT_SAMPLE слотов и handle - без чтения файла целиком).
+        """
+        self._check_thread()
+        count = len(xyzs)
+        if xyzs.ndim != 2 or xyzs.shape[1] != 4:
+            raise ValueError(f"кубы должны быть массивом (N, 4), а не {xyzs.shape}")
+        for name, column in (("цветов", colors), ("флагов", flags), ("handle", handles)):
+            if len(column) != count:
+                raise ValueError(f"{name} {len(column)}, а кубов {count}")
+        if count > len(handle_slot):
+            raise ValueError(f"кубов {count}, а выданных handle только {len(handle_slot)}")
+        slots = np.unique(np.linspace(0, count - 1, min(count, ADOPT_SAMPLE)).astype(np.int64))
+        sampled = np.asarray(handles[slots], dtype=np.int64)
+        if ((sampled < 0) | (sampled >= len(handle_slot))).any() \
+                or (handle_slot[np.clip(sampled, 0, len(handle_slot) - 1)] != slots).any():
+            raise ValueError("таблица handle -> слот не обратна таблице слот -> handle")
+        ids = np.unique(np.linspace(0, len(handle_slot) - 1, min(len(handle_slot), ADOPT_SAMPLE)).astype(np.int64))
+        owned = np.asarray(handle_slot[ids], dtype=np.int64)
+        live = owned >= 0
+        if (owned < -1).any() or (owned >= count).any() or (handles[owned[live]] != ids[live]).any():
+            raise ValueError("таблица слот -> handle не обратна таблице handle -> слот")
+        self._count = count
+        self._xyzs = xyzs
+        self._colors = colors
+        self._flags = flags
+        self._slot_handle = handles
+        self._handle_slot = handle_slot
+        self._next_handle = len(handle_slot)
+        self._free_count = 0
+        self._spatial = None
+        self._needs_reset = True
+
+    def invalidate(self):
+        """Рендерер потерял сцену (переинициализация) - выгрузить всё заново"""
+        self._check_thread()
+        self._needs_reset = True
+
+    def bind_thread(self, ident):
+        """Привязывает сцену к потоку (threading.get_ident()); None - снять привязку"""
+        self._owner = ident
+
+    # === Доступ по handle ===
+
+    def contains(self, handle):
+        return 0 <= handle < self._next_handle and self._handle_slot[handle] >= 0
+
+    def slot_of(self, handle):
+        self._check_thread()
+        if not self.contains(handle):
+            raise KeyError(f"Нет куба с handle {handle}")
+        return int(self._handle_slot[handle])
+
+    def get(self, handle):
+        """Возвращает (x, y, z, size) куба"""
+        return tuple(float(v) for v in self._xyzs[self.slot_of(handle)])
+
+    # === Пространственные запросы ===
+
+    @property
+    def spatial(self):
+        """Хеш-сетка по кубам; строится при первом обращении, дальше обновляется сама"""
+        self._check_thread()
+        if self._spatial is None:
+            self._spatial = SpatialHash()
+            self._spatial.insert(self.handles, self.cubes)
+        return self._spatial
+
+    def pick(self, origin, direction, max_distance=np.inf):
+        """Ближайший куб на луче: (handle, расстояние) или (None, inf)"""
+        return self.spatial.pick(self._xyzs, self._handle_slot, origin, direction, max_distance)
+
+    def query_radius(self, center, radius):
+        """Handle кубов с центром в пределах radius от center"""
+        return self.spatial.query_radius(self._xyzs, self._handle_slot, center, radius)
+
+    def find_overlaps(self, cubes):
+        """(число пересечений, признак дубликата) для каждого из новых кубов (N, 4)"""
+        return self.spatial.overlaps(self._xyzs, self._handle_slot, cubes)
+
+    # === Синхронизация с рендерером ===
+
+    @property
+    def uploaded(self):
+        """Сколько первых кубов уже отправлено в рендерер"""
+        return 0 if self._needs_reset else self._uploaded
+
+    @property
+    def pending(self):
+        """Сколько кубов ещё не отправлено в рендерер"""
+        return self._count if self._needs_reset else self._count - self._uploaded
+
+    def take_changes(self):
+        """
+        Возвращает (count, moved, recolored): правки уже выгруженных кубов с
+        прошлого вызова. count - сколько первых кубов оставить в рендерере
+        (None - не укорачивать); moved и recolored - (first, кубы) и
+        (first, цвета) изменённого диапазона слотов или None. Применять до
+        take_upload, в этом порядке; при полной перезаливке правок нет.
+        """
+        self._check_thread()
+        if self._needs_reset:
+            return None, None, None
+        count = self._uploaded if self._truncated else None
+        moved = recolored = None
+        if self._moved is not None:
+            lo, hi = self._moved
+            moved = (lo, self._xyzs[lo:hi])
+        if self._recolored is not None:
+            lo, hi = self._recolored
+            recolored = (lo, self._colors[lo:hi])
+        self._moved = self._recolored = None
+        self._truncated = False
+        return count, moved, recolored
+
+    def take_upload(self, limit=None):
+        """
+        Возвращает (reset, cubes, colors): что отправить в рендерер с прошлого
+        вызова. reset=True - сначала очистить сцену рендерера и залить cubes
+        с начала; иначе cubes - добавленные с прошлого раза кубы. limit
+        ограничивает пачку - остаток уйдёт следующими вызовами.
+        """
+        self._check_thread()
+        if self._needs_reset:
+            start = 0
+        else:
+            start = self._uploaded
+        end = self._count if limit is None else min(self._count, start + limit)
+        reset = self._needs_reset
+        if reset:
+            self._moved = self._recolored = None
+            self._truncated = False
+        self._needs_reset = False
+        self._uploaded = end
+        return reset, self._xyzs[start:end], self._colors[start:end]
+
+    # === Внутреннее ===
+
+    def _check_thread(self):
+        if self._owner is not None and threading.get_ident() != self._owner:
+            raise RuntimeError("Сцена доступна только из потока рендера - передайте вызов через RenderQueue")
+
+    def _mark(self, slot, moved=False, recolored=False):
+        """Слот уже выгруженного куба изменился - расширить диапазоны правок"""
+        if self._needs_reset or slot >= self._uploaded:
+            return  # уйдёт с выгрузкой
+        if moved:
+            self._moved = self._grow(self._moved, slot)
+        if recolored:
+            self._recolored = self._grow(self._recolored, slot)
+
+    @staticmethod
+    def _grow(span, slot):
+        if span is None:
+            return slot, slot + 1
+        return min(span[0], slot), max(span[1], slot + 1)
+
+    def _clip(self, span):
+        """Диапазон правок в пределах выгруженных кубов (после укорочения)"""
+        if span is None or span[0] >= self._uploaded:
+            return None
+        return span[0], min(span[1], self._uploaded)
+
+    def _reserve(self, count):
+        """Амортизированный рост колонок (удвоение ёмкости)"""
+        capacity = len(self._xyzs)
+        if count <= capacity:
+            return
+        capacity = max(capacity, 1)
+        while capacity < count:
+            capacity *= 2
+        for name in ("_xyzs", "_colors", "_flags", "_slot_handle"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._count] = old[:self._count]
+            setattr(self, name, new)
+
+    def _allocate_handles(self, n):
+        # Сначала переиспользуем освобождённые handle
+        reused = min(n, self._free_count)
+        handles = np.empty(n, dtype=np.int32)
+        handles[:reused] = self._free_handles[self._free_count - reused:self._free_count]
+        self._free_count -= reused
+
+        fresh = n - reused
+        first = self._next_handle
+        self._next_handle += fresh
+        handles[reused:] = np.arange(first, self._next_handle, dtype=np.int32)
+
+        if self._next_handle > len(self._handle_slot):
+            capacity = max(len(self._handle_slot), 1)
+            while capacity < self._next_handle:
+                capacity *= 2
+            table = np.full(capacity, -1, dtype=np.int32)
+            table[:first] = self._handle_slot[:first]
+            self._handle_slot = table
+        return handles
+
+    def _release_handle(self, handle):
+        if self._free_count == len(self._free_handles):
+            grown = np.zeros(max(16, 2 * len(self._free_handles)), dtype=np.int32)
+            grown[:self._free_count] = self._free_handles[:self._free_count]
+            self._free_handles = grown
+        self._free_handles[self._free_count] = handle
+        self._free_count += 1
@@ -0,0 +1,122 @@
+"""
+Бинарный формат сцены (.r3ds), открывается через отображение в память.
+
+Файл - заголовок и колонки сцены подряд, каждая выровнена по ALIGNMENT:
+
+    заголовок (128 байт, little-endian):
+        magic       8s   b"R3DSCENE"
+        version     u32
+        reserved    u32
+        count       u64  число кубов
+        handles     u64  размер таблицы handle -> слот
+        offsets     5 x u64  смещения колонок xyzs, colors, flags, handles, handle_slot
+    xyzs        count x 4 float32 (x, y, z, size)
+    colors      count x uint32 (0xAARRGGBB)
+    flags       count x uint8
+    handles     count x int32 (handle куба в слоте)
+    handle_slot handles x int32 (слот по handle, -1 - удалён)
+
+При загрузке колонки не читаются, а отображаются в память (copy-on-write),
+поэтому открытие не зависит от размера файла: страницы подгружаются при
+первом обращении, а правки сцены не трогают файл.
+
+Отображение ускоряет только открытие. Рендерер получает сцену потоково:
+upload_scene каждый кадр отдаёт ему пачки по UPLOAD_CHUNK кубов, пока не
+выйдет UPLOAD_BUDGET, и рендерер копирует их в своё хранилище и BVH. Так
+что страницы файла читаются по мере выгрузки, а большая сцена появляется
+на экране за несколько кадров.
+"""
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"R3DSCENE"
+VERSION = 1
+ALIGNMENT = 64
+HEADER = struct.Struct("<8sIIQQ5Q")
+HEADER_SIZE = 2 * ALIGNMENT  # 72 байта полей + запас под будущие версии
+
+# Колонки в порядке записи: (имя, dtype, число значений на куб)
+COLUMNS = (
+    ("xyzs", np.float32, 4),
+    ("colors", np.uint32, 1),
+    ("flags", np.uint8, 1),
+    ("handles", np.int32, 1),
+)
+
+
+class SceneFileError(ValueError):
+    """Файл не является сценой или версия не поддерживается"""
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _layout(count, handles):
+    """Смещения колонок и полный размер файла"""
+    offsets = []
+    offset = HEADER_SIZE
+    for _, dtype, width in COLUMNS:
+        offsets.append(offset)
+        offset = _align(offset + count * width * np.dtype(dtype).itemsize)
+    offsets.append(offset)
+    offset += handles * np.dtype(np.int32).itemsize
+    return offsets, offset
+
+
+def save_scene(scene, path):
+    """Записывает сцену; файл сначала пишется рядом и подменяется целиком"""
+    count = len(scene)
+    handle_slots = scene.handle_slots
+    offsets, _ = _layout(count, len(handle_slots))
+    columns = (scene.cubes, scene.colors, scene.flags, scene.handles, handle_slots)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        header = HEADER.pack(MAGIC, VERSION, 0, count, len(handle_slots), *offsets)
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        for offset, column in zip(offsets, columns):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(np.ascontiguousarray(column).data)
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """Возвращает (count, handles, offsets), проверяя сигнатуру, версию и размер"""
+    with open(path, "rb") as f:
+        raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise SceneFileError("Файл слишком короткий для сцены")
+    magic, version, _, count, handles, *offsets = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise SceneFileError("Это не файл сцены (неверная сигнатура)")
+    if version != VERSION:
+        raise SceneFileError(f"Неподдерживаемая версия файла сцены: {version}")
+    expected, size = _layout(count, handles)
+    if list(offsets) != expected or os.path.getsize(path) < size:
+        raise SceneFileError("Файл сцены повреждён или обрезан")
+    return count, handles, offsets
+
+
+def load_scene(scene, path):
+    """Подменяет колонки сцены отображёнными в память колонками файла"""
+    count, handles, offsets = read_header(path)
+    columns = []
+    for (_, dtype, width), offset in zip(COLUMNS, offsets):
+        shape = (count, width) if width > 1 else (count,)
+        columns.append(_map(path, dtype, offset, shape))
+    columns.append(_map(path, np.int32, offsets[-1], (handles,)))
+    try:
+        scene.adopt(*columns)
+    except ValueError as e:
+        raise SceneFileError(f"Файл сцены повреждён: {e}") from e
+    return count
+
+
+def _map(path, dtype, offset, shape):
+    if shape[0] == 0:
+        # mmap не умеет отображать пустой диапазон
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="c", offset=offset, shape=shape)
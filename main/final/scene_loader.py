@@ -0,0 +1,123 @@
+"""
+Потоковая загрузка больших сцен без заморозки интерфейса.
+
+Источник - генератор пачек кубов. SceneLoader забирает пачки по таймеру
+между кадрами и добавляет их в сцену, пока не исчерпан бюджет времени
+тика, после чего отдаёт управление циклу событий Qt: камера, кнопки и
+рендер продолжают работать, а сцена растёт на глазах.
+
+С очередью рендера (queue) пачки не добавляются в сцену напрямую, а
+отправляются командами AddBatch: за тик - сколько успело прочитаться за
+бюджет (страницы файла читаются здесь, а не в потоке рендера), очередь
+сливает их в одно добавление. Следующий тик - когда поток рендера
+применил отправленное, так что очередь не разбухает.
+"""
+import time
+
+import numpy as np
+from PyQt6 import QtCore
+
+import scene_file
+from render_queue import AddBatch
+
+# Кубов в пачке и время на загрузку за один тик, секунды
+CHUNK_SIZE = 65536
+TICK_BUDGET = 0.008
+
+
+def array_chunks(cubes, colors=None, chunk_size=CHUNK_SIZE):
+    """Пачки (cubes, colors) из готовых массивов (N, 4) и (N,)"""
+    cubes = np.asarray(cubes, dtype=np.float32).reshape(-1, 4)
+    for start in range(0, len(cubes), chunk_size):
+        end = start + chunk_size
+        yield cubes[start:end], None if colors is None else colors[start:end]
+
+
+def file_chunks(path, chunk_size=CHUNK_SIZE):
+    """Пачки (cubes, colors) из файла сцены; страницы читаются по мере обхода"""
+    count, _, offsets = scene_file.read_header(path)
+    if count == 0:
+        return
+    cubes = np.memmap(path, dtype=np.float32, mode="r", offset=offsets[0], shape=(count, 4))
+    colors = np.memmap(path, dtype=np.uint32, mode="r", offset=offsets[1], shape=(count,))
+    yield from array_chunks(cubes, colors, chunk_size)
+
+
+class SceneLoader(QtCore.QObject):
+    """Добавляет пачки из генератора в сцену, укладываясь в TICK_BUDGET за тик"""
+
+    progress = QtCore.pyqtSignal(int, int)  # загружено, всего
+    finished = QtCore.pyqtSignal(int)
+    cancelled = QtCore.pyqtSignal(int)
+
+    def __init__(self, scene, budget=TICK_BUDGET, queue=None, parent=None):
+        super().__init__(parent)
+        self.scene = scene
+        self.budget = budget
+        self.queue = queue
+        self._in_flight = None  # Future последней отправленной в очередь пачки
+        self.chunks = None
+        self.total = 0
+        self.loaded = 0
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self._tick)
+
+    @property
+    def active(self):
+        return self.chunks is not None
+
+    def start(self, chunks, total):
+        """Начинает загрузку; предыдущая незаконченная загрузка отменяется"""
+        if self.active:
+            self.cancel()
+        self.chunks = iter(chunks)
+        self.total = int(total)
+        self.loaded = 0
+        self.progress.emit(0, self.total)
+        if self.queue is not None:
+            self.queue.applied.connect(self._tick)
+            self._in_flight = None
+            self._tick()
+        else:
+            self.timer.start(0)
+
+    def cancel(self):
+        """Останавливает загрузку; уже добавленные кубы остаются в сцене"""
+        if not self.active:
+            return
+        self._stop()
+        self.cancelled.emit(self.loaded)
+
+    def _stop(self):
+        self.timer.stop()
+        if self.queue is not None:
+            self.queue.applied.disconnect(self._tick)
+        close = getattr(self.chunks, "close", None)
+        if close is not None:
+            close()
+        self.chunks = None
+
+    def _tick(self, *args):
+        if not self.active or (self._in_flight is not None and not self._in_flight.done()):
+            return
+        started = time.perf_counter()
+        while time.perf_counter() - started < self.budget:
+            try:
+                cubes, colors = next(self.chunks)
+            except StopIteration:
+                if self._in_flight is not None and not self._in_flight.done():
+                    # Последние пачки ещё в очереди - закончим, когда применятся
+                    self.chunks = iter(())
+                    break
+                self._stop()
+                self.finished.emit(self.loaded)
+                return
+            self.loaded += len(cubes)
+            if self.queue is not None:
+                # Копия читает пачку (страницы memmap) в счёт бюджета тика
+                cubes = np.array(cubes, dtype=np.float32)
+                colors = None if colors is None else np.array(colors, dtype=np.uint32)
+                self._in_flight = self.queue.submit(AddBatch(cubes, colors))
+                continue
+            self.scene.add_many(cubes, colors)
+        self.progress.emit(self.loaded, self.total)
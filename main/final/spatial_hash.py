@@ -0,0 +1,269 @@
+"""
+Равномерная пространственная хеш-сетка над кубами сцены.
+
+Каждый куб записывается во все ячейки (CELL_SIZE), которые задевает его
+AABB; кубы крупнее ячейки хранятся отдельным списком и проверяются
+перебором (их мало). Ячейки хранятся как отсортированные пары
+(ключ ячейки, handle): поиск ячейки - searchsorted. Новые кубы
+дописываются в небольшой несортированный хвост и вливаются в основной
+массив, когда хвост разрастается; удалённые handle просто помечаются.
+
+Запросы:
+    pick(origin, direction) - ближайший куб на луче (обход ячеек по DDA
+                              пачками с ранним выходом)
+    query_radius(center, r) - кубы с центром в пределах радиуса
+    overlaps(cubes)         - существующие кубы, пересекающиеся с новыми
+"""
+import math
+
+import numpy as np
+
+CELL_SIZE = 2.0
+
+# Ячеек луча в первой пачке; следующие пачки вдвое больше, чтобы длинный
+# луч через пустые области обходился за несколько обращений к массивам.
+# Пачка шагается разом, поэтому лишние ячейки за попаданием почти бесплатны
+PICK_BATCH = 64
+
+# Хвост вливается в основной массив, когда он больше этого и 1/8 основного
+MERGE_MIN = 4096
+
+# Бит карты занятости на ключ ячейки: ложных "занято" около 1/8
+OCCUPANCY_BITS_PER_KEY = 8
+
+# 21 бит на ось: координаты ячеек в [-2^20, 2^20)
+_BITS = 21
+_OFFSET = 1 << (_BITS - 1)
+_MASK = (1 << _BITS) - 1
+
+
+def cell_keys(i, j, k):
+    """Упаковывает целые координаты ячеек в один int64-ключ"""
+    i = (np.asarray(i, dtype=np.int64) + _OFFSET) & _MASK
+    j = (np.asarray(j, dtype=np.int64) + _OFFSET) & _MASK
+    k = (np.asarray(k, dtype=np.int64) + _OFFSET) & _MASK
+    return (i << (2 * _BITS)) | (j << _BITS) | k
+
+
+def _hash(keys, bits):
+    """Номера битов карты занятости для ключей (мультипликативный хеш)"""
+    mixed = keys.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return (mixed >> np.uint64(64 - bits)).astype(np.int64)
+
+
+def ray_box(origin, inv_dir, mins, maxs):
+    """Параметры входа/выхода луча для ящиков (N, 3); промах - t_in > t_out"""
+    with np.errstate(invalid="ignore"):
+        t0 = (mins - origin) * inv_dir
+        t1 = (maxs - origin) * inv_dir
+    t_in = np.nanmax(np.minimum(t0, t1), axis=1)
+    t_out = np.nanmin(np.maximum(t0, t1), axis=1)
+    return t_in, t_out
+
+
+class SpatialHash:
+    """Хеш-сетка handle кубов; позиции читаются из массива xyzs по слотам"""
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = float(cell_size)
+        self.clear()
+
+    def clear(self):
+        self.keys = np.zeros(0, dtype=np.int64)  # отсортированные ключи ячеек
+        self.items = np.zeros(0, dtype=np.int32)  # handle для каждого ключа
+        self.tail_keys = np.zeros(0, dtype=np.int64)
+        self.tail_items = np.zeros(0, dtype=np.int32)
+        self.large = np.zeros(0, dtype=np.int32)  # handle кубов крупнее ячейки
+        self.alive = np.zeros(0, dtype=bool)
+        # Карта занятости: бит на хеш ключа, ставится для каждой непустой
+        # ячейки - пустые ячейки луча отсеиваются без поиска в keys
+        self.occupancy_bits = 16
+        self.occupancy = np.zeros(1 << (16 - 3), dtype=np.uint8)
+        self.bounds = None  # (mins, maxs) всех когда-либо добавленных кубов
+
+    # === Изменение ===
+
+    def insert(self, handles, cubes):
+        """Добавляет кубы (N, 4) x, y, z, size с заданными handle"""
+        handles = np.asarray(handles, dtype=np.int32)
+        cubes = np.asarray(cubes, dtype=np.float32).reshape(-1, 4)
+        if len(handles) == 0:
+            return
+        if handles.max() >= len(self.alive):
+            grown = np.zeros(max(int(handles.max()) + 1, 2 * len(self.alive)), dtype=bool)
+            grown[:len(self.alive)] = self.alive
+            self.alive = grown
+        self.alive[handles] = True
+
+        half = cubes[:, 3:4] * 0.5
+        mins, maxs = cubes[:, :3] - half, cubes[:, :3] + half
+        lo, hi = mins.min(axis=0), maxs.max(axis=0)
+        if self.bounds is not None:
+            lo, hi = np.minimum(lo, self.bounds[0]), np.maximum(hi, self.bounds[1])
+        self.bounds = (lo, hi)
+
+        large = cubes[:, 3] > self.cell_size
+        if large.any():
+            self.large = np.concatenate([self.large, handles[large]])
+            handles, mins, maxs = handles[~large], mins[~large], maxs[~large]
+
+        # Куб не больше ячейки задевает не больше 2 ячеек по каждой оси
+        c0 = np.floor(mins / self.cell_size).astype(np.int64)
+        c1 = np.floor(maxs / self.cell_size).astype(np.int64)
+        keys, items = [], []
+        for corner in range(8):
+            d = np.array([corner & 1, (corner >> 1) & 1, (corner >> 2) & 1])
+            cell = c0 + d
+            # Угол за пределами AABB повторяет уже записанную ячейку
+            use = (cell <= c1).all(axis=1)
+            keys.append(cell_keys(cell[use, 0], cell[use, 1], cell[use, 2]))
+            items.append(handles[use])
+        self.tail_keys = np.concatenate([self.tail_keys] + keys)
+        self.tail_items = np.concatenate([self.tail_items] + items)
+        if len(self.tail_keys) > max(MERGE_MIN, len(self.keys) // 8):
+            self._merge()
+        else:
+            bit = _hash(np.concatenate(keys), self.occupancy_bits)
+            np.bitwise_or.at(self.occupancy, bit >> 3, (1 << (bit & 7)).astype(np.uint8))
+
+    def remove(self, handles):
+        """Помечает кубы удалёнными; записи в ячейках отфильтруются при запросах"""
+        # Если handle потом выдадут снова, старые записи останутся лишними
+        # кандидатами - их отсеивает точная проверка по текущей позиции
+        self.alive[np.asarray(handles, dtype=np.int32)] = False
+
+    def _merge(self):
+        keys = np.concatenate([self.keys, self.tail_keys])
+        items = np.concatenate([self.items, self.tail_items])
+        # Заодно выбрасываем записи удалённых кубов
+        live = self.alive[items]
+        keys, items = keys[live], items[live]
+        order = np.argsort(keys, kind="stable")
+        self.keys, self.items = keys[order], items[order]
+        self.tail_keys = np.zeros(0, dtype=np.int64)
+        self.tail_items = np.zeros(0, dtype=np.int32)
+        self.large = self.large[self.alive[self.large]]
+        # Карта занятости заново - с запасом на дописывание до следующего слияния
+        self.occupancy_bits = max(16, int(len(self.keys) * OCCUPANCY_BITS_PER_KEY * 9 // 8).bit_length())
+        occupied = np.zeros(1 << self.occupancy_bits, dtype=bool)
+        occupied[_hash(self.keys, self.occupancy_bits)] = True
+        self.occupancy = np.packbits(occupied, bitorder="little")
+
+    # === Запросы ===
+
+    def _lookup(self, keys, distinct=False):
+        """Handle живых кубов из ячеек keys (с повторами); distinct - ключи уже без повторов"""
+        if not distinct:
+            keys = np.unique(keys)
+        bit = _hash(keys, self.occupancy_bits)
+        keys = keys[(self.occupancy[bit >> 3] >> (bit & 7)) & 1 == 1]
+        start = np.searchsorted(self.keys, keys, side="left")
+        end = np.searchsorted(self.keys, keys, side="right")
+        lengths = end - start
+        total = int(lengths.sum())
+        found = self.items[np.repeat(start, lengths) + np.arange(total)
+                           - np.repeat(np.cumsum(lengths) - lengths, lengths)]
+        if len(self.tail_keys):
+            found = np.concatenate([found, self.tail_items[np.isin(self.tail_keys, keys)]])
+        found = np.concatenate([found, self.large])
+        return found[self.alive[found]]
+
+    def pick(self, xyzs, handle_slot, origin, direction, max_distance=math.inf):
+        """
+        Ближайший куб на луче: (handle, t) или (None, inf).
+        xyzs - колонки сцены (слот -> x, y, z, size), handle_slot - handle -> слот.
+        """
+        if self.bounds is None:
+            return None, math.inf
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        direction = direction / np.linalg.norm(direction)
+        with np.errstate(divide="ignore"):
+            inv_dir = 1.0 / direction
+
+        # Отрезок луча внутри ограничивающего ящика всех кубов
+        t_in, t_out = ray_box(origin, inv_dir, self.bounds[0][None], self.bounds[1][None])
+        t, t_end = max(float(t_in[0]), 0.0), min(float(t_out[0]), max_distance)
+        if t > t_end:
+            return None, math.inf
+
+        # 3D DDA (Amanatides-Woo) по ячейкам сетки
+        size = self.cell_size
+        point = origin + direction * t
+        cell = np.floor(point / size).astype(np.int64)
+        step = np.where(direction >= 0, 1, -1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            next_boundary = (cell + (step > 0)) * size
+            t_max = np.where(direction != 0, t + (next_boundary - point) * inv_dir, math.inf)
+            t_delta = np.where(direction != 0, size * np.abs(inv_dir), math.inf)
+
+        # Оси, вдоль которых луч пересекает границы ячеек
+        axes = np.flatnonzero(direction != 0)
+        best_handle, best_t = None, math.inf
+        batch_size = PICK_BATCH
+        while t <= t_end:
+            # Пачка шагов DDA разом: моменты пересечения границ по осям
+            # сливаются по времени, ячейка - начальная плюс шаги по осям до неё
+            n = np.arange(batch_size)
+            crossings = (t_max[axes, None] + n * t_delta[axes, None]).ravel()
+            order = np.argsort(crossings, kind="stable")[:batch_size]
+            times = crossings[order]
+            axis = axes[order // batch_size]
+            moves = np.zeros((batch_size + 1, 3), dtype=np.int64)
+            moves[np.arange(1, batch_size + 1), axis] = step[axis]
+            moves = np.cumsum(moves, axis=0)
+            # Ячейка i входит в момент times[i - 1]; дальше t_end не идём
+            inside = 1 + int(np.searchsorted(times[:-1], t_end, side="right"))
+            batch = cell + moves[:inside]
+            cell = cell + moves[-1]
+            t_max[axes] += np.abs(moves[-1, axes]) * t_delta[axes]
+            t = float(times[-1])
+            batch_size *= 2
+            # Ячейки DDA не повторяются; куб из нескольких ячеек может
+            # проверяться дважды - на ближайшее попадание это не влияет
+            found = self._lookup(cell_keys(batch[:, 0], batch[:, 1], batch[:, 2]), distinct=True)
+            if len(found):
+                cubes = xyzs[handle_slot[found]]
+                half = cubes[:, 3:4] * 0.5
+                hit_in, hit_out = ray_box(origin, inv_dir, cubes[:, :3] - half, cubes[:, :3] + half)
+                hit = (hit_in <= hit_out) & (hit_out >= 0) & (hit_in <= max_distance)
+                if hit.any():
+                    hit_t = np.maximum(hit_in[hit], 0.0)
+                    nearest = int(np.argmin(hit_t))
+                    if hit_t[nearest] < best_t:
+                        best_t, best_handle = float(hit_t[nearest]), int(found[hit][nearest])
+            # Любой куб из дальних ячеек начинается не ближе, чем их граница
+            if best_t <= t:
+                break
+        return best_handle, best_t
+
+    def query_radius(self, xyzs, handle_slot, center, radius):
+        """Handle кубов, чьи центры не дальше radius от center"""
+        center = np.asarray(center, dtype=np.float64)
+        c0 = np.floor((center - radius) / self.cell_size).astype(np.int64)
+        c1 = np.floor((center + radius) / self.cell_size).astype(np.int64)
+        i, j, k = np.meshgrid(*(np.arange(a, b + 1) for a, b in zip(c0, c1)), indexing="ij")
+        found = np.unique(self._lookup(cell_keys(i.ravel(), j.ravel(), k.ravel())))
+        centers = xyzs[handle_slot[found], :3]
+        dist2 = ((centers - center) ** 2).sum(axis=1)
+        return found[dist2 <= radius * radius]
+
+    def overlaps(self, xyzs, handle_slot, cubes):
+        """
+        Для каждого нового куба (N, 4) - число пересекающихся с ним существующих
+        кубов и признак точного дубликата (та же позиция и размер).
+        """
+        cubes = np.asarray(cubes, dtype=np.float32).reshape(-1, 4)
+        counts = np.zeros(len(cubes), dtype=np.int32)
+        duplicate = np.zeros(len(cubes), dtype=bool)
+        for n, cube in enumerate(cubes):
+            half = cube[3] * 0.5
+            c0 = np.floor((cube[:3] - half) / self.cell_size).astype(np.int64)
+            c1 = np.floor((cube[:3] + half) / self.cell_size).astype(np.int64)
+            i, j, k = np.meshgrid(*(np.arange(a, b + 1) for a, b in zip(c0, c1)), indexing="ij")
+            found = np.unique(self._lookup(cell_keys(i.ravel(), j.ravel(), k.ravel())))
+            other = xyzs[handle_slot[found]]
+            gap = np.abs(other[:, :3] - cube[:3]) - (other[:, 3:4] + cube[3]) * 0.5
+            counts[n] = int((gap < 0).all(axis=1).sum())
+            duplicate[n] = bool((other == cube).all(axis=1).any())
+        return counts, duplicate
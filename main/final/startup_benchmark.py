@@ -0,0 +1,117 @@
+"""
+Замер времени запуска: от старта процесса до первого нарисованного кадра.
+
+Каждый прогон - отдельный процесс Python (иначе модули уже в памяти):
+
+    python startup_benchmark.py --repeat 5
+    python startup_benchmark.py --offscreen --output startup.json
+
+Этапы: старт интерпретатора, импорт test_improved, создание и показ окна
+(здесь загружается рендерер), первый кадр (frame_ready очереди рендера).
+"""
+import time
+
+_STARTED = time.time()  # до тяжёлых импортов - отсчёт внутри процесса-замера
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+STAGES = ("interpreter_ms", "import_ms", "window_ms", "first_frame_ms")
+
+
+def measure():
+    """Замер в текущем процессе; возвращает моменты этапов (time.time())"""
+    stamps = {"started": _STARTED}
+    import test_improved
+    from PyQt6 import QtCore, QtWidgets
+    stamps["imported"] = time.time()
+
+    app = QtWidgets.QApplication(sys.argv[:1])
+    window = test_improved.MainWindow()
+    window.show()
+    stamps["shown"] = time.time()
+
+    def first_frame(seconds):
+        stamps.setdefault("first_frame", time.time())
+        app.quit()
+
+    window.control_panel.sdl_widget.queue.frame_ready.connect(first_frame)
+    # Первый кадр не пришёл за 30 с - что-то сломано, не висим вечно
+    QtCore.QTimer.singleShot(30000, app.quit)
+    app.exec()
+    window.close()
+    stamps["backend"] = test_improved.backend.get().name
+    return stamps
+
+
+def run_once(offscreen):
+    """Один запуск в новом процессе; время этапов в мс"""
+    env = dict(os.environ, PYTHONIOENCODING="utf-8")  # эмодзи в диагностике
+    if offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    spawned = time.time()
+    child = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                           env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                           capture_output=True, text=True, encoding="utf-8")
+    if child.returncode != 0:
+        raise RuntimeError(child.stderr.strip() or f"код выхода {child.returncode}")
+    stamps = json.loads(child.stdout.strip().splitlines()[-1])
+    if "first_frame" not in stamps:
+        raise RuntimeError("первый кадр не нарисован за 30 с")
+    return {
+        "backend": stamps["backend"],
+        "interpreter_ms": (stamps["started"] - spawned) * 1000,
+        "import_ms": (stamps["imported"] - stamps["started"]) * 1000,
+        "window_ms": (stamps["shown"] - stamps["imported"]) * 1000,
+        "first_frame_ms": (stamps["first_frame"] - stamps["shown"]) * 1000,
+        "total_ms": (stamps["first_frame"] - spawned) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время от запуска до первого кадра")
+    parser.add_argument("--repeat", type=int, default=5, help="число запусков")
+    parser.add_argument("--offscreen", action="store_true", help="без настоящего окна (QT_QPA_PLATFORM=offscreen)")
+    parser.add_argument("--output", help="файл для JSON (по умолчанию stdout)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        # Диагностика test_improved идёт в stdout - ответ последней строкой
+        print(json.dumps(measure()))
+        return 0
+
+    runs = []
+    for i in range(args.repeat):
+        try:
+            result = run_once(args.offscreen)
+        except RuntimeError as e:
+            print(f"❌ Запуск {i + 1} не удался: {e}", file=sys.stderr)
+            return 1
+        runs.append(result)
+        print(f"✅ Запуск {i + 1}: {result['total_ms']:.0f} мс до первого кадра "
+              f"(интерпретатор {result['interpreter_ms']:.0f}, импорт {result['import_ms']:.0f}, "
+              f"окно {result['window_ms']:.0f}, кадр {result['first_frame_ms']:.0f})", file=sys.stderr)
+
+    report = {
+        "backend": runs[0]["backend"],
+        "repeat": args.repeat,
+        "median": {key: float(np.median([r[key] for r in runs])) for key in STAGES + ("total_ms",)},
+        "runs": runs,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,89 +2,190 @@ import sys
 import ctypes
 import random
 import math
+import time
+import multiprocessing
+import numpy as np
 from PyQt6 import QtWidgets, QtCore, QtGui
 
-# Загрузка DLL
-renderer3d = ctypes.CDLL("./renderer3d.dll")
+from scene import Scene
+import scene_file
+import scene_loader
+import generators
+from frame_scheduler import FrameScheduler
+from render_queue import RenderQueue, AddBatch, Clear
+from camera_input import CameraInput
+from resolution_scaler import ResolutionScaler
+from profiler import FrameProfiler
+import backend
 
-# Определение типов функций (только те, что доступны в текущей DLL)
-renderer3d.InitRenderer3D.argtypes = [ctypes.c_int, ctypes.c_int]
-renderer3d.RenderFrame.restype = None
-renderer3d.AddCube.argtypes = [ctypes.c_float, ctypes.c_float, ctypes.c_float, ctypes.c_float]
+# Рендерер выбирается лениво (backend.py): импорт модуля не загружает DLL.
+# Флаги ниже заполняет load_renderer() перед созданием окна
+renderer3d = backend.renderer
+renderer_is_native = False
+available_functions = ()
+has_camera_controls = has_move_camera = has_zoom_camera = False
+has_clear_scene = has_reset_camera = has_object_count = has_background_color = False
+has_add_cubes = has_cube_colors = has_cull_stats = has_resize_renderer = False
+has_worker_count = has_occlusion_culling = has_lod = has_extended_functions = False
+has_voxels = has_render_engine = has_set_cubes = has_truncate_cubes = False
 
-# Проверяем доступные функции
-available_functions = []
-functions_to_check = [
-    "CloseRenderer3D", "IsRunning", "RotateCamera", "MoveCamera", "ZoomCamera",
-    "ClearScene", "ResetCamera", "GetObjectCount", "SetBackgroundColor"
-]
 
-for func_name in functions_to_check:
-    try:
-        func = getattr(renderer3d, func_name)
-        available_functions.append(func_name)
-    except AttributeError:
-        pass
+def load_renderer():
+    """Загружает рендерер (один раз) и выставляет флаги доступных функций"""
+    global renderer3d, renderer_is_native, available_functions
+    global has_camera_controls, has_move_camera, has_zoom_camera, has_clear_scene
+    global has_reset_camera, has_object_count, has_background_color, has_add_cubes
+    global has_cube_colors, has_cull_stats, has_resize_renderer, has_worker_count
+    global has_occlusion_culling, has_lod, has_extended_functions, has_voxels, has_render_engine
+    global has_set_cubes, has_truncate_cubes
+    if renderer3d is not backend.renderer:
+        return
+    selected = backend.get()
+    renderer3d = selected.renderer  # дальше - без обёртки
+    renderer_is_native = selected.is_native
+    available_functions = selected.functions
+    if selected.name == "process":
+        print("✅ CPU-рендерер запущен в отдельном процессе")
+    elif not renderer_is_native:
+        print("⚠️ renderer3d.dll не найден - используется CPU-рендерер (NumPy)")
 
-# Настройка доступных функций
-has_camera_controls = "RotateCamera" in available_functions
-has_move_camera = "MoveCamera" in available_functions
-has_zoom_camera = "ZoomCamera" in available_functions
-has_clear_scene = "ClearScene" in available_functions
-has_reset_camera = "ResetCamera" in available_functions
-has_object_count = "GetObjectCount" in available_functions
-has_background_color = "SetBackgroundColor" in available_functions
+    # Настройка доступных функций
+    has_camera_controls = "RotateCamera" in available_functions
+    has_move_camera = "MoveCamera" in available_functions
+    has_zoom_camera = "ZoomCamera" in available_functions
+    has_clear_scene = "ClearScene" in available_functions
+    has_reset_camera = "ResetCamera" in available_functions
+    has_object_count = "GetObjectCount" in available_functions
+    has_background_color = "SetBackgroundColor" in available_functions
+    has_add_cubes = "AddCubes" in available_functions
+    has_cube_colors = "SetCubeColors" in available_functions
+    has_set_cubes = "SetCubes" in available_functions
+    has_truncate_cubes = "TruncateCubes" in available_functions
+    has_cull_stats = "GetVisibleCount" in available_functions and "GetCulledCount" in available_functions
+    has_resize_renderer = "ResizeRenderer" in available_functions
+    has_worker_count = "SetWorkerCount" in available_functions and "GetWorkerCount" in available_functions
+    has_occlusion_culling = "GetOccludedCount" in available_functions and "SetOcclusionCulling" in available_functions
+    has_lod = "SetLodThresholds" in available_functions and "GetImpostorCount" in available_functions
+    has_voxels = "SetVoxelMode" in available_functions and "GetVoxelQuadCount" in available_functions
+    has_render_engine = "SetRenderEngine" in available_functions
 
-# Общая проверка на расширенные функции
-has_extended_functions = has_background_color and has_object_count and has_reset_camera
+    # Общая проверка на расширенные функции
+    has_extended_functions = has_background_color and has_object_count and has_reset_camera
 
-print(f"✅ Доступно функций: {len(available_functions)}")
-print(f"🎮 Управление камерой: {'✅' if has_camera_controls else '❌'}")
-print(f"🔧 Расширенные функции: {'✅' if has_extended_functions else '❌'}")
-print(f"📋 Доступные функции: {', '.join(available_functions)}")
+    print(f"✅ Доступно функций: {len(available_functions)}")
+    print(f"🎮 Управление камерой: {'✅' if has_camera_controls else '❌'}")
+    print(f"🔧 Расширенные функции: {'✅' if has_extended_functions else '❌'}")
+    print(f"📋 Доступные функции: {', '.join(available_functions)}")
 
-if "RotateCamera" in available_functions:
-    renderer3d.RotateCamera.argtypes = [ctypes.c_float, ctypes.c_float]
 
-if "MoveCamera" in available_functions:
-    renderer3d.MoveCamera.argtypes = [ctypes.c_float, ctypes.c_float]
-
-if "ZoomCamera" in available_functions:
-    renderer3d.ZoomCamera.argtypes = [ctypes.c_float]
+def add_cubes(cubes):
+    """
+    Добавляет пачку кубов одним вызовом AddCubes.
+    cubes - массив (N, 4) x, y, z, size; в рендерер уходит указатель на
+    непрерывный float32-буфер (рендерер копирует кубы в своё хранилище).
+    Возвращает число кубов.
+    """
+    cubes = np.ascontiguousarray(cubes, dtype=np.float32).reshape(-1, 4)
+    if len(cubes) == 0:
+        return 0
+    if has_add_cubes:
+        renderer3d.AddCubes(cubes.ctypes.data_as(ctypes.POINTER(ctypes.c_float)), len(cubes))
+    else:
+        # Старая DLL без AddCubes - по одному кубу
+        for x, y, z, size in cubes.tolist():
+            renderer3d.AddCube(x, y, z, size)
+    return len(cubes)
 
-if "ClearScene" in available_functions:
-    renderer3d.ClearScene.argtypes = []
 
-if "IsRunning" in available_functions:
-    renderer3d.IsRunning.restype = ctypes.c_bool
+# Кубов в одной пачке выгрузки и время на выгрузку за кадр
+UPLOAD_CHUNK = 16384
+UPLOAD_BUDGET = 0.008
 
-if "CloseRenderer3D" in available_functions:
-    renderer3d.CloseRenderer3D.restype = None
+# Радиус, в котором считаются соседи выбранного щелчком куба
+PICK_NEIGHBOUR_RADIUS = 3.0
 
-if "GetObjectCount" in available_functions:
-    renderer3d.GetObjectCount.restype = ctypes.c_int
 
-if "SetBackgroundColor" in available_functions:
-    renderer3d.SetBackgroundColor.argtypes = [ctypes.c_float, ctypes.c_float, ctypes.c_float]
+def upload_scene(scene, budget=None):
+    """
+    Отправляет в рендерер изменения сцены с прошлого кадра: правки уже
+    выгруженных кубов - диапазонами слотов, новые кубы - пачками по
+    UPLOAD_CHUNK. С budget (секунды) останавливается, когда время вышло, -
+    остаток уйдёт в следующих кадрах. Возвращает число невыгруженных кубов.
+    """
+    started = time.perf_counter()
+    count, moved, recolored = scene.take_changes()
+    if (count is not None and not has_truncate_cubes) or (moved is not None and not has_set_cubes):
+        # Старая DLL не умеет править кубы на месте - залить сцену заново
+        scene.invalidate()
+    else:
+        if count is not None:
+            renderer3d.TruncateCubes(count)
+        if moved is not None:
+            first, cubes = moved
+            cubes = np.ascontiguousarray(cubes)
+            renderer3d.SetCubes(cubes.ctypes.data_as(ctypes.POINTER(ctypes.c_float)), first, len(cubes))
+        if recolored is not None and has_cube_colors:
+            first, colors = recolored
+            colors = np.ascontiguousarray(colors)
+            renderer3d.SetCubeColors(colors.ctypes.data_as(ctypes.POINTER(ctypes.c_uint32)), first, len(colors))
+    while True:
+        reset, cubes, colors = scene.take_upload(UPLOAD_CHUNK if budget is not None else None)
+        if reset and has_clear_scene:
+            renderer3d.ClearScene()
+        first = scene.uploaded - len(cubes)
+        add_cubes(cubes)
+        if has_cube_colors and len(colors):
+            colors = np.ascontiguousarray(colors)
+            renderer3d.SetCubeColors(colors.ctypes.data_as(ctypes.POINTER(ctypes.c_uint32)), first, len(colors))
+        if scene.pending == 0 or time.perf_counter() - started > budget:
+            return scene.pending
 
 class SDLWidget(QtWidgets.QWidget):
-    def __init__(self, parent=None):
+    # handle (-1 - мимо), (x, y, z, размер, соседей) или None, время выбора в мс
+    cube_picked = QtCore.pyqtSignal(int, object, float)
+
+    def __init__(self, scene, parent=None):
         super().__init__(parent)
-        self.setAttribute(QtCore.Qt.WidgetAttribute.WA_NativeWindow)
-        self.setAttribute(QtCore.Qt.WidgetAttribute.WA_PaintOnScreen)
+        self.scene = scene  # Сцена, которую показывает виджет
+        if renderer_is_native:
+            # DLL рисует сама в нативное окно виджета
+            self.setAttribute(QtCore.Qt.WidgetAttribute.WA_NativeWindow)
+            self.setAttribute(QtCore.Qt.WidgetAttribute.WA_PaintOnScreen)
         self.setAttribute(QtCore.Qt.WidgetAttribute.WA_NoSystemBackground)
 
-        self.timer = QtCore.QTimer()
-        self.timer.timeout.connect(self.update_frame)
-        self.timer.start(16)  # ~60 FPS
+        # Кадры рисуются по требованию: при вводе, изменении сцены и ресайзе.
+        # С CPU-рендерером кадр рисует отдельный поток, сюда приходит готовый
+        self.scheduler = FrameScheduler(self.update_frame, external_timing=not renderer_is_native, parent=self)
+        self.scheduler.start()
+
+        # Сцену и рендерер меняют только команды из очереди - на границе кадра
+        self.queue = RenderQueue(self.scene, renderer3d, self.render_frame,
+                                 threaded=not renderer_is_native, parent=self)
+        self.queue.submitted.connect(self.scheduler.mark_dirty)
+        self.queue.frame_ready.connect(self.on_frame_ready)
+
+        # Сдвиги камеры от мыши и колеса копятся здесь и уходят в очередь раз в кадр
+        self.camera_input = CameraInput()
+
+        # Динамическое разрешение (CPU-рендерер): буфер кадра подбирается под
+        # бюджет времени кадра, вывод растягивает его на весь виджет
+        self.resolution = ResolutionScaler()
+        self.output_size = (0, 0)
+        self.resolution_changed = False
+
+        # Время стадий кадра; CPU-рендерер сам отмечает cull/transform/raster
+        self.profiler = FrameProfiler()
+        if not renderer_is_native:
+            renderer3d.profiler = self.profiler
+        if backend.get().name == "process":
+            # Упавший процесс рендера перезапускается пустым - сцена заливается заново
+            renderer3d.on_restart = self.scene.invalidate
         
-        self.object_count = 0  # Локальный счетчик
         self.is_initialized = False  # Флаг инициализации
         
-        # УБИРАЕМ переменные для управления мышью - теперь DLL сам всё делает!
-        # self.left_mouse_pressed = False    
-        # self.middle_mouse_pressed = False  
-        # self.last_mouse_pos = None
+        # Мышью управляет DLL; для CPU-рендерера камеру ведём из Python
+        self.last_mouse_pos = None
+        self.press_pos = None  # где нажата кнопка: щелчок без сдвига - выбор куба
         self.setMouseTracking(True)  # Включаем отслеживание мыши для DLL
         self.setFocusPolicy(QtCore.Qt.FocusPolicy.StrongFocus)
         
@@ -95,109 +196,235 @@ class SDLWidget(QtWidgets.QWidget):
         """Обработка изменения размера виджета"""
         super().resizeEvent(event)
         
-        # Простое решение: перезапускаем весь рендерер только если сильно изменился размер
         if self.is_initialized:
             old_size = event.oldSize()
             new_size = event.size()
             
-            # Проверяем, если изменение размера критичное
-            if (abs(new_size.width() - old_size.width()) > 100 or 
-                abs(new_size.height() - old_size.height()) > 100):
+            self.output_size = (new_size.width(), new_size.height())
+            if has_resize_renderer:
+                # Меняются только буферы кадра и проекция - сцена и камера остаются
+                self.queue.call(self.resize_renderer)
+            # Старая DLL: перезапускаем весь рендерер, только если сильно изменился размер
+            elif (abs(new_size.width() - old_size.width()) > 100 or 
+                  abs(new_size.height() - old_size.height()) > 100):
                 
-                try:
-                    # Останавливаем таймер
-                    self.timer.stop()
-                    
-                    # Переинициализируем рендерер
-                    renderer3d.InitRenderer3D(new_size.width(), new_size.height())
-                    renderer3d.AddCube(0.0, 0.0, -10.0, 1.0)
-                    
-                    # Перезапускаем таймер
-                    self.timer.start(16)
-                    
-                except Exception as e:
-                    print(f"Ошибка при изменении размера: {e}")
-                    # Если не получается, просто продолжаем с текущими настройками
+                # Переинициализируем рендерер и заново отдаём ему сцену
+                self.queue.call(self.reinit_renderer, new_size.width(), new_size.height())
+            self.scheduler.mark_dirty()
+
+    def resize_renderer(self):
+        """В потоке рендера: буфер кадра = размер виджета с учётом динамического разрешения"""
+        renderer3d.ResizeRenderer(*self.resolution.size(*self.output_size))
+
+    def set_frame_budget(self, seconds):
+        """В потоке рендера: бюджет кадра для динамического разрешения (0 - выключить)"""
+        if self.resolution.set_budget(seconds):
+            self.resize_renderer()
+
+    def reinit_renderer(self, width, height):
+        renderer3d.InitRenderer3D(width, height)
+        self.scene.invalidate()
 
     def enterEvent(self, event):
         """Получаем фокус при наведении мыши"""
         self.setFocus()
+        if renderer_is_native:
+            # DLL читает мышь сама внутри RenderFrame - пока курсор над виджетом, рисуем постоянно
+            self.scheduler.begin_interaction('hover')
         super().enterEvent(event)
 
     def leaveEvent(self, event):
         """Сбрасываем состояние при уходе мыши"""
         # DLL сам управляет состоянием кнопок мыши
-        pass
+        self.scheduler.end_interaction('hover')
 
     def showEvent(self, event):
         if not self.is_initialized:
             size = self.size()
+            self.output_size = (size.width(), size.height())
             renderer3d.InitRenderer3D(size.width(), size.height())
             
             # Добавим начальную сцену - отодвигаем куб дальше от камеры
-            try:
-                renderer3d.AddCube(0.0, 0.0, -10.0, 1.0)
-                self.object_count += 1
-                print(f"✅ Начальный куб добавлен! Позиция: (0, 0, -10), размер: 1.0")
-            except Exception as e:
-                print(f"❌ Ошибка добавления начального куба: {e}")
+            self.queue.submit(AddBatch([(0.0, 0.0, -10.0, 1.0)]))
+            print(f"✅ Начальный куб добавлен! Позиция: (0, 0, -10), размер: 1.0")
             
             self.is_initialized = True
+            self.queue.start()
 
     def mousePressEvent(self, event):
-        """Обработка нажатия мыши - ОТКЛЮЧЕНА, так как DLL сам обрабатывает мышь"""
+        """Обработка нажатия мыши (с DLL мышь обрабатывает сама DLL)"""
         # Устанавливаем фокус на этот виджет для колесика мыши
         self.setFocus()
-        # Больше НЕ обрабатываем мышь в Python - пусть DLL делает всё сам!
+        self.scheduler.begin_interaction('mouse')
+        if not renderer_is_native:
+            self.last_mouse_pos = event.position()
+            self.press_pos = event.position()
 
     def mouseMoveEvent(self, event):
-        """Обработка движения мыши - ОТКЛЮЧЕНА, так как DLL сам обрабатывает мышь"""
-        # ВАЖНО: НЕ вызываем RotateCamera из Python!
-        # DLL теперь сам обрабатывает SDL события мыши в handleCameraInput()
-        pass
+        """Орбита (ЛКМ/ПКМ) и панорамирование (СКМ) для CPU-рендерера"""
+        # DLL сама обрабатывает SDL события мыши в handleCameraInput()
+        if renderer_is_native or self.last_mouse_pos is None:
+            return
+        started = time.perf_counter()
+        pos = event.position()
+        dx = pos.x() - self.last_mouse_pos.x()
+        dy = pos.y() - self.last_mouse_pos.y()
+        self.last_mouse_pos = pos
+
+        buttons = event.buttons()
+        if buttons & (QtCore.Qt.MouseButton.LeftButton | QtCore.Qt.MouseButton.RightButton):
+            self.camera_input.add(rotate_x=dx * 0.01, rotate_y=dy * 0.01)
+        elif buttons & QtCore.Qt.MouseButton.MiddleButton:
+            scale = renderer3d.camera.distance * 0.002
+            self.camera_input.add(move_x=-dx * scale, move_y=dy * scale)
+        self.scheduler.mark_dirty()
+        self.profiler.add('input', time.perf_counter() - started)
 
     def mouseReleaseEvent(self, event):
-        """Обработка отпускания мыши - ОТКЛЮЧЕНА, так как DLL сам обрабатывает мышь"""
-        # DLL сам управляет состоянием кнопок мыши
-        pass
+        """Обработка отпускания мыши; щелчок ЛКМ без перетаскивания выбирает куб"""
+        self.last_mouse_pos = None
+        self.scheduler.end_interaction('mouse')
+        if renderer_is_native or self.press_pos is None:
+            return
+        pos, self.press_pos = event.position(), self.press_pos
+        if (event.button() == QtCore.Qt.MouseButton.LeftButton
+                and (pos - self.press_pos).manhattanLength() < 4):
+            self.pick_cube(pos.x(), pos.y())
+        self.press_pos = None
+
+    def pick_cube(self, x, y):
+        """Выбирает ближайший куб под курсором лучом из камеры CPU-рендерера"""
+        self.queue.call(self._pick, x, y, self.width(), self.height())
+
+    def _pick(self, x, y, width, height):
+        # В потоке рендера: камера и сцена не меняются во время выбора.
+        # Всё о кубе читается здесь же - GUI получает готовые значения
+        started = time.perf_counter()
+        origin, direction = renderer3d.camera.ray(x, y, width, height)
+        handle, _ = self.scene.pick(origin, direction)
+        elapsed = time.perf_counter() - started
+        self.scene.select(handle)
+        if handle is None:
+            self.cube_picked.emit(-1, None, elapsed * 1000)
+            return
+        cx, cy, cz, size = self.scene.get(handle)
+        neighbours = len(self.scene.query_radius((cx, cy, cz), PICK_NEIGHBOUR_RADIUS)) - 1
+        self.cube_picked.emit(handle, (cx, cy, cz, size, neighbours), elapsed * 1000)
 
     def wheelEvent(self, event):
         """Обработка колесика мыши для зума"""
         if has_zoom_camera:
-            try:
-                # Получаем направление прокрутки
-                delta = event.angleDelta().y()
-                # ИНВЕРТИРОВАННЫЕ ЗНАЧЕНИЯ: DLL работает наоборот
-                # Скролл вверх (delta > 0) = приближение = отрицательный zoom_factor
-                zoom_factor = -0.3 if delta > 0 else 0.3
-                renderer3d.ZoomCamera(zoom_factor)
-            except Exception as e:
-                print(f"❌ Ошибка зума: {e}")
+            started = time.perf_counter()
+            # Величина прокрутки: ступень колеса - 0.3, тачпад шлёт доли ступени.
+            # ИНВЕРТИРОВАННЫЕ ЗНАЧЕНИЯ: скролл вверх = приближение = отрицательный zoom
+            self.camera_input.add_wheel(event.angleDelta().y())
+            self.scheduler.mark_dirty()
+            self.profiler.add('input', time.perf_counter() - started)
 
     def update_frame(self):
-        try:
-            if "IsRunning" in available_functions and not renderer3d.IsRunning():
-                self.timer.stop()
-                if "CloseRenderer3D" in available_functions:
-                    renderer3d.CloseRenderer3D()
-                QtWidgets.QApplication.quit()
+        """Тик планировщика: заказывает кадр у потока рендера"""
+        if "IsRunning" in available_functions and not renderer3d.IsRunning():
+            self.scheduler.stop()
+            self.queue.stop()
+            if "CloseRenderer3D" in available_functions:
+                renderer3d.CloseRenderer3D()
+            QtWidgets.QApplication.quit()
+        else:
+            # Весь ввод с прошлого кадра - одной командой камеры
+            delta = self.camera_input.take()
+            if delta is not None:
+                self.queue.submit(delta)
+            if self.camera_input.active:
+                # Сглаживание ещё догоняет ввод - кадры нужны и без новых событий
+                self.scheduler.begin_interaction('smoothing')
             else:
-                renderer3d.RenderFrame()
-        except:
-            # Если произошла ошибка, просто продолжаем рендерить
-            try:
-                renderer3d.RenderFrame()
-            except:
-                pass  # Игнорируем ошибки рендеринга
+                self.scheduler.end_interaction('smoothing')
+            self.queue.request_frame()
+
+    def render_frame(self):
+        """Кадр в потоке рендера: команды очереди, выгрузка сцены, RenderFrame"""
+        profiler = self.profiler
+        profiler.begin_frame()
+        raster = 0.0
+        try:
+            self.queue.drain()
+            profiler.lap('input')
+            upload_scene(self.scene, UPLOAD_BUDGET)
+            profiler.lap('upload')
+            # DLL не разделяет стадии - всё её время уходит в raster
+            started = time.perf_counter()
+            renderer3d.RenderFrame()
+            raster = time.perf_counter() - started
+            profiler.lap('raster')
+        except (RuntimeError, ValueError, OSError, ctypes.ArgumentError) as e:
+            # Команда или кадр не прошли - рендерер мог принять только часть
+            # изменений, поэтому сцена выгружается в него заново. Остальные
+            # исключения - ошибки кода: их пишет RenderQueue
+            print(f"❌ Ошибка кадра: {e}")
+            self.scene.invalidate()
+        if not renderer_is_native:
+            # Готовый кадр уходит на вывод, следующий рисуется в другой буфер
+            renderer3d.swap_buffers()
+            profiler.lap('present')
+            # Следующий кадр - в разрешении под бюджет по времени этого
+            if has_resize_renderer and self.resolution.frame_finished(raster):
+                self.resize_renderer()
+                self.resolution_changed = True
+        profiler.end_frame()
+
+    def on_frame_ready(self, seconds):
+        """Кадр готов (в потоке интерфейса): статистика, вывод, догрузка сцены"""
+        if self.scheduler.external_timing:
+            self.scheduler.frame_finished(seconds)
+        if self.scene.pending:
+            # Большая сцена уходит в рендерер по частям между кадрами
+            self.scheduler.mark_dirty()
+        if self.resolution_changed:
+            # Кадр в новом разрешении; пока есть запас, разрешение растёт кадр за кадром
+            self.resolution_changed = False
+            self.scheduler.mark_dirty()
+        if not renderer_is_native:
+            self.update()
+
+    def paintEvent(self, event):
+        """Вывод кадра CPU-рендерера (DLL рисует в окно сама)"""
+        if renderer_is_native or not self.is_initialized:
+            return
+        frame = renderer3d.acquire_front()
+        try:
+            if frame is None:
+                return
+            # QImage - обёртка над буфером рендерера, пиксели не копируются;
+            # пока буфер выводится, рендерер рисует в другой
+            image = QtGui.QImage(frame.data, frame.shape[1], frame.shape[0], frame.strides[0],
+                                 QtGui.QImage.Format.Format_RGB32)
+            painter = QtGui.QPainter(self)
+            if frame.shape[1] != self.width():
+                # Динамическое разрешение: кадр меньше виджета - растягиваем с фильтрацией
+                painter.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform)
+            painter.drawImage(self.rect(), image)
+            painter.end()
+        finally:
+            renderer3d.release_front()
 
     def paintEngine(self):
-        return None
+        if renderer_is_native:
+            return None
+        return super().paintEngine()
 
 class MainControlPanel(QtWidgets.QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.object_count = 1
+        self.scene = Scene()  # Единственный источник истины о сцене
         self.init_ui()
+        # Сцену меняем только командами через очередь виджета рендера
+        self.queue = self.sdl_widget.queue
+        self.queue.applied.connect(self.update_object_count)
+        # Потоковая загрузка больших сцен пачками между кадрами
+        self.loader = scene_loader.SceneLoader(self.scene, queue=self.queue, parent=self)
+        self.loader.progress.connect(self.update_object_count)
+        self.loader.finished.connect(self.update_object_count)
+        self.loader.cancelled.connect(self.update_object_count)
         
     def init_ui(self):
         # Основной layout на всё окно
@@ -227,7 +454,7 @@ class MainControlPanel(QtWidgets.QWidget):
         left_layout.addWidget(title)
         
         # 3D виджет
-        self.sdl_widget = SDLWidget()
+        self.sdl_widget = SDLWidget(self.scene)
         self.sdl_widget.setMinimumSize(800, 600)
         self.sdl_widget.setStyleSheet("""
             QWidget {
@@ -318,6 +545,35 @@ class MainControlPanel(QtWidgets.QWidget):
         buttons_layout.addLayout(buttons_grid)
         right_layout.addWidget(buttons_group)
         
+        # === ГЕНЕРАТОРЫ ===
+        generator_group = QtWidgets.QGroupBox("Генераторы сцен")
+        generator_layout = QtWidgets.QFormLayout(generator_group)
+        generator_layout.setSpacing(10)
+        
+        self.generator_combo = QtWidgets.QComboBox()
+        for name, (title, _) in generators.GENERATORS.items():
+            self.generator_combo.addItem(title, name)
+        generator_layout.addRow("Узор:", self.generator_combo)
+        
+        # Миллионы кубов - для нагрузочных тестов
+        self.generator_count = QtWidgets.QSpinBox()
+        self.generator_count.setRange(1, 10_000_000)
+        self.generator_count.setSingleStep(10000)
+        self.generator_count.setValue(10000)
+        self.generator_count.setGroupSeparatorShown(True)
+        generator_layout.addRow("Кубов:", self.generator_count)
+        
+        self.generator_seed = QtWidgets.QSpinBox()
+        self.generator_seed.setRange(0, 2 ** 31 - 1)
+        generator_layout.addRow("Seed:", self.generator_seed)
+        
+        btn_generate = QtWidgets.QPushButton("🏗️ Сгенерировать")
+        btn_generate.clicked.connect(self.generate_scene)
+        btn_generate.setStyleSheet(self.get_clean_button_style("#16a085"))
+        generator_layout.addRow(btn_generate)
+        
+        right_layout.addWidget(generator_group)
+        
         # === НАСТРОЙКИ ===
         settings_group = QtWidgets.QGroupBox("Настройки объектов")
         settings_layout = QtWidgets.QFormLayout(settings_group)
@@ -490,11 +746,20 @@ class MainControlPanel(QtWidgets.QWidget):
     def add_cube(self):
         x, y, z = self.get_current_position()
         size = self.get_current_size()
+        self.queue.call(self.add_unique_cube, x, y, z, size)
+
+    def add_unique_cube(self, x, y, z, size):
+        """Добавляет куб, если точно такого ещё нет (в потоке рендера)"""
         try:
-            renderer3d.AddCube(x, y, z, size)
-            self.object_count += 1
-            self.update_object_count()
+            # Повторное нажатие с теми же полями не плодит кубы друг в друге
+            overlaps, duplicate = self.scene.find_overlaps([(x, y, z, size)])
+            if duplicate[0]:
+                print(f"⚠️ Такой куб уже есть: ({x:.1f}, {y:.1f}, {z:.1f}), размер: {size:.1f}")
+                return
+            self.scene.add(x, y, z, size)
             print(f"✅ Куб добавлен! Позиция: ({x:.1f}, {y:.1f}, {z:.1f}), размер: {size:.1f}")
+            if overlaps[0]:
+                print(f"⚠️ Куб пересекается с {overlaps[0]} другими")
         except Exception as e:
             print(f"❌ Ошибка добавления куба: {e}")
     
@@ -504,41 +769,47 @@ class MainControlPanel(QtWidgets.QWidget):
         z = random.uniform(-15, -8)
         size = random.uniform(0.3, 1.5)
         try:
-            renderer3d.AddCube(x, y, z, size)
-            self.object_count += 1
-            self.update_object_count()
+            self.queue.submit(AddBatch([(x, y, z, size)]))
             print(f"✅ Случайный куб добавлен! Позиция: ({x:.1f}, {y:.1f}, {z:.1f}), размер: {size:.1f}")
         except Exception as e:
             print(f"❌ Ошибка добавления случайного куба: {e}")
     
     def add_cube_line(self):
-        for i in range(5):
-            x = (i - 2) * 1.5
-            y = 0
-            z = -10
-            size = 0.5
-            renderer3d.AddCube(x, y, z, size)
-            self.object_count += 1
-        self.update_object_count()
+        x = (np.arange(5) - 2) * 1.5
+        cubes = np.column_stack([x, np.zeros(5), np.full(5, -10.0), np.full(5, 0.5)])
+        self.queue.submit(AddBatch(cubes))
     
     def add_cube_circle(self):
         radius = 3.0
         num_cubes = 8
-        for i in range(num_cubes):
-            angle = (i / num_cubes) * 2 * math.pi
-            x = math.cos(angle) * radius
-            z = math.sin(angle) * radius - 10
-            y = 0
-            size = 0.4
-            renderer3d.AddCube(x, y, z, size)
-            self.object_count += 1
-        self.update_object_count()
+        angle = np.arange(num_cubes) / num_cubes * 2 * math.pi
+        cubes = np.column_stack([
+            np.cos(angle) * radius,
+            np.zeros(num_cubes),
+            np.sin(angle) * radius - 10,
+            np.full(num_cubes, 0.4),
+        ])
+        self.queue.submit(AddBatch(cubes))
+    
+    def generate_scene(self):
+        name = self.generator_combo.currentData()
+        count = self.generator_count.value()
+        seed = self.generator_seed.value()
+        # Генерация и добавление - в потоке рендера, интерфейс не ждёт
+        self.queue.call(self.add_generated, name, count, seed)
+    
+    def add_generated(self, name, count, seed):
+        """Строит кубы генератором и добавляет в сцену (в потоке рендера)"""
+        started = time.perf_counter()
+        cubes = generators.generate(name, count, seed)
+        self.scene.add_many(cubes)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"✅ {generators.GENERATORS[name][0]}: {len(cubes)} кубов за {elapsed:.0f} мс (seed {seed})")
     
     def clear_scene(self):
         if has_clear_scene:
-            renderer3d.ClearScene()
-            self.object_count = 0
-            self.update_object_count()
+            self.loader.cancel()
+            self.queue.submit(Clear())
         else:
             reply = QtWidgets.QMessageBox.question(
                 self, 'Очистка сцены', 
@@ -549,917 +820,50 @@ class MainControlPanel(QtWidgets.QWidget):
             if reply == QtWidgets.QMessageBox.StandardButton.Yes:
                 QtWidgets.QApplication.quit()
     
-    def update_object_count(self):
-        if has_object_count:
-            try:
-                count = renderer3d.GetObjectCount()
-                self.object_count_label.setText(f"Объектов в сцене: {count}")
-            except:
-                self.object_count_label.setText(f"Объектов в сцене: {self.object_count}")
-        else:
-            self.object_count_label.setText(f"Объектов в сцене: {self.object_count}")
+    def update_object_count(self, *args):
+        text = f"Объектов в сцене: {len(self.scene)}"
+        if self.loader.active and self.loader.total:
+            text += f" (загрузка {self.loader.loaded * 100 // self.loader.total}%)"
+        self.object_count_label.setText(text)
     
     def create_demo_scene(self):
         # Создаем красивую демо-сцену
-        initial_count = self.object_count
-        
         # Центральный большой куб
-        renderer3d.AddCube(0, 0, -12, 1.5)
-        self.object_count += 1
+        center = np.array([[0, 0, -12, 1.5]])
         
         # Малые кубы вокруг
-        for i in range(4):
-            angle = (i / 4) * 2 * math.pi
-            x = math.cos(angle) * 3.5
-            z = math.sin(angle) * 3.5 - 12
-            renderer3d.AddCube(x, 0, z, 0.5)
-            self.object_count += 1
+        angle = np.arange(4) / 4 * 2 * math.pi
+        ring = np.column_stack([np.cos(angle) * 3.5, np.zeros(4), np.sin(angle) * 3.5 - 12, np.full(4, 0.5)])
         
         # Башня кубов
-        for i in range(5):
-            renderer3d.AddCube(4, i * 1.2 - 2, -15, 0.6)
-            self.object_count += 1
+        tower = np.column_stack([np.full(5, 4.0), np.arange(5) * 1.2 - 2, np.full(5, -15.0), np.full(5, 0.6)])
         
         # Случайные кубы
-        for _ in range(10):
-            x = random.uniform(-8, 8)
-            y = random.uniform(-3, 3)
-            z = random.uniform(-20, -8)
-            size = random.uniform(0.2, 0.8)
-            renderer3d.AddCube(x, y, z, size)
-            self.object_count += 1
+        scattered = np.array([
+            [random.uniform(-8, 8), random.uniform(-3, 3), random.uniform(-20, -8), random.uniform(0.2, 0.8)]
+            for _ in range(10)
+        ])
         
-        self.update_object_count()
+        self.queue.submit(AddBatch(np.concatenate([center, ring, tower, scattered])))
 
     def reset_camera(self):
         if has_reset_camera:
-            try:
-                renderer3d.ResetCamera()
-                print("📷 Камера сброшена в исходное положение")
-            except Exception as e:
-                print(f"❌ Ошибка сброса камеры: {e}")
+            self.sdl_widget.camera_input.clear()  # недоигранное сглаживание не должно сдвинуть сброшенную камеру
+            self.queue.call(renderer3d.ResetCamera)
+            print("📷 Камера сброшена в исходное положение")
         else:
             print("⚠️ Функция ResetCamera недоступна в текущей DLL")
 
     def open_casino(self):
-        """Открывает окно секретного казино"""
+        """Открывает окно секретного казино (модуль грузится при первом открытии)"""
+        from casino import SlotMachineWindow
         casino_window = SlotMachineWindow(self)
         casino_window.exec()
 
-class SlotMachineWindow(QtWidgets.QDialog):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("🎰 Казино 3D Рендерера")
-        self.setFixedSize(400, 380)  # Увеличил высоту для кнопки блэкджека
-        self.coins = 100  # Устанавливаем монеты ПЕРЕД инициализацией UI
-        
-        # Для анимации
-        self.animation_timer = QtCore.QTimer()
-        self.animation_timer.timeout.connect(self.animate_reels)
-        self.animation_counter = 0
-        self.final_result = []
-        self.symbols = ["🍒", "🍋", "🍊", "🍇", "💎", "⭐", "🎯", "🔥"]
-        
-        self.init_ui()
-        
-    def init_ui(self):
-        layout = QtWidgets.QVBoxLayout(self)
-        layout.setSpacing(10)
-        layout.setContentsMargins(15, 15, 15, 15)
-        
-        # Заголовок
-        title = QtWidgets.QLabel("🎰 Слот Машина")
-        title.setStyleSheet("""
-            QLabel {
-                font-size: 18px;
-                font-weight: bold;
-                color: white;
-                background-color: #3498db;
-                padding: 10px;
-                border-radius: 6px;
-                text-align: center;
-            }
-        """)
-        title.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(title)
-        
-        # Счетчик монет
-        self.coins_label = QtWidgets.QLabel(f"💰 Монеты: {self.coins}")
-        self.coins_label.setStyleSheet("""
-            QLabel {
-                font-size: 14px;
-                font-weight: bold;
-                color: white;
-                background-color: #27ae60;
-                padding: 8px;
-                border-radius: 4px;
-                text-align: center;
-            }
-        """)
-        self.coins_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(self.coins_label)
-        
-        # Барабаны - компактно
-        reels_layout = QtWidgets.QHBoxLayout()
-        reels_layout.setSpacing(8)
-        
-        self.reels = []
-        
-        for i in range(3):
-            reel = QtWidgets.QLabel("🎲")
-            reel.setStyleSheet("""
-                QLabel {
-                    font-size: 32px;
-                    background-color: white;
-                    border: 2px solid #34495e;
-                    border-radius: 6px;
-                    padding: 8px;
-                    text-align: center;
-                    min-width: 60px;
-                    max-width: 60px;
-                    min-height: 60px;
-                    max-height: 60px;
-                }
-            """)
-            reel.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-            self.reels.append(reel)
-            reels_layout.addWidget(reel)
-        
-        layout.addLayout(reels_layout)
-        
-        # Кнопка КРУТИТЬ
-        self.spin_button = QtWidgets.QPushButton("🎰 Крутить! (10 монет)")
-        self.spin_button.clicked.connect(self.spin_reels)
-        self.spin_button.setStyleSheet("""
-            QPushButton {
-                background-color: #e74c3c;
-                color: white;
-                font-weight: bold;
-                font-size: 14px;
-                border: none;
-                border-radius: 6px;
-                padding: 12px;
-            }
-            QPushButton:hover {
-                background-color: #c0392b;
-            }
-            QPushButton:pressed {
-                background-color: #a93226;
-            }
-        """)
-        layout.addWidget(self.spin_button)
-        
-        # Результат
-        self.result_label = QtWidgets.QLabel("Добро пожаловать в казино!")
-        self.result_label.setStyleSheet("""
-            QLabel {
-                font-size: 12px;
-                font-weight: bold;
-                color: #2c3e50;
-                background-color: #ecf0f1;
-                padding: 8px;
-                border-radius: 4px;
-                border: 1px solid #bdc3c7;
-                text-align: center;
-            }
-        """)
-        self.result_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(self.result_label)
-        
-        # Кнопка перехода к блэкджеку
-        blackjack_button = QtWidgets.QPushButton("🃏 Играть в Блэкджек")
-        blackjack_button.clicked.connect(self.open_blackjack)
-        blackjack_button.setStyleSheet("""
-            QPushButton {
-                background-color: #8e44ad;
-                color: white;
-                font-weight: bold;
-                font-size: 12px;
-                border: none;
-                border-radius: 4px;
-                padding: 8px;
-            }
-            QPushButton:hover {
-                background-color: #7d3c98;
-            }
-        """)
-        layout.addWidget(blackjack_button)
-        
-        # Кнопка закрыть
-        close_button = QtWidgets.QPushButton("❌ Закрыть")
-        close_button.clicked.connect(self.close)
-        close_button.setStyleSheet("""
-            QPushButton {
-                background-color: #95a5a6;
-                color: white;
-                font-weight: bold;
-                font-size: 12px;
-                border: none;
-                border-radius: 4px;
-                padding: 8px;
-            }
-            QPushButton:hover {
-                background-color: #7f8c8d;
-            }
-        """)
-        layout.addWidget(close_button)
-        
-        # Общий стиль окна
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #ffffff;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-        """)
-    
-    def spin_reels(self):
-        if self.coins < 10:
-            self.result_label.setText("❌ Недостаточно монет!")
-            self.result_label.setStyleSheet("""
-                QLabel {
-                    font-size: 12px;
-                    font-weight: bold;
-                    color: white;
-                    background-color: #e74c3c;
-                    padding: 8px;
-                    border-radius: 4px;
-                    text-align: center;
-                }
-            """)
-            return
-            
-        self.coins -= 10
-        self.update_coins_display()
-        
-        # Отключаем кнопку во время анимации
-        self.spin_button.setEnabled(False)
-        self.result_label.setText("🎰 Крутим...")
-        self.result_label.setStyleSheet("""
-            QLabel {
-                font-size: 12px;
-                font-weight: bold;
-                color: #2c3e50;
-                background-color: #f39c12;
-                padding: 8px;
-                border-radius: 4px;
-                text-align: center;
-            }
-        """)
-        
-        # Генерируем финальный результат
-        self.final_result = [random.choice(self.symbols) for _ in range(3)]
-        
-        # Запускаем анимацию
-        self.animation_counter = 0
-        self.animation_timer.start(100)  # Обновляем каждые 100мс
-        
-    def animate_reels(self):
-        """Анимация кручения барабанов"""
-        # Показываем случайные символы во время анимации
-        for i, reel in enumerate(self.reels):
-            # Первые 20 итераций - быстрая смена символов
-            if self.animation_counter < 20:
-                reel.setText(random.choice(self.symbols))
-                # Добавляем эффект "кручения" - меняем стиль
-                reel.setStyleSheet("""
-                    QLabel {
-                        font-size: 32px;
-                        background-color: #f39c12;
-                        border: 3px solid #e67e22;
-                        border-radius: 6px;
-                        padding: 8px;
-                        text-align: center;
-                        min-width: 60px;
-                        max-width: 60px;
-                        min-height: 60px;
-                        max-height: 60px;
-                    }
-                """)
-            # Барабаны останавливаются по очереди
-            elif self.animation_counter == 20 + i * 5:
-                reel.setText(self.final_result[i])
-                # Возвращаем обычный стиль
-                reel.setStyleSheet("""
-                    QLabel {
-                        font-size: 32px;
-                        background-color: white;
-                        border: 2px solid #27ae60;
-                        border-radius: 6px;
-                        padding: 8px;
-                        text-align: center;
-                        min-width: 60px;
-                        max-width: 60px;
-                        min-height: 60px;
-                        max-height: 60px;
-                    }
-                """)
-        
-        self.animation_counter += 1
-        
-        # Останавливаем анимацию после того как все барабаны остановились
-        if self.animation_counter >= 35:  # 20 + 3*5 = 35
-            self.animation_timer.stop()
-            self.finish_spin()
-    
-    def finish_spin(self):
-        """Завершаем спин и показываем результат"""
-        # Проверяем выигрыш
-        winnings = self.check_winnings(self.final_result)
-        self.coins += winnings
-        self.update_coins_display()
-        
-        # Возвращаем обычный стиль барабанам
-        for reel in self.reels:
-            reel.setStyleSheet("""
-                QLabel {
-                    font-size: 32px;
-                    background-color: white;
-                    border: 2px solid #34495e;
-                    border-radius: 6px;
-                    padding: 8px;
-                    text-align: center;
-                    min-width: 60px;
-                    max-width: 60px;
-                    min-height: 60px;
-                    max-height: 60px;
-                }
-            """)
-        
-        if winnings > 0:
-            self.result_label.setText(f"🎉 Выиграли {winnings} монет! 🎉")
-            self.result_label.setStyleSheet("""
-                QLabel {
-                    font-size: 12px;
-                    font-weight: bold;
-                    color: white;
-                    background-color: #27ae60;
-                    padding: 8px;
-                    border-radius: 4px;
-                    text-align: center;
-                }
-            """)
-            
-            # Анимация выигрыша - мигание барабанов
-            QtCore.QTimer.singleShot(500, self.flash_winning_reels)
-        else:
-            self.result_label.setText("😢 В этот раз не повезло...")
-            self.result_label.setStyleSheet("""
-                QLabel {
-                    font-size: 12px;
-                    font-weight: bold;
-                    color: #2c3e50;
-                    background-color: #ecf0f1;
-                    padding: 8px;
-                    border-radius: 4px;
-                    border: 1px solid #bdc3c7;
-                    text-align: center;
-                }
-            """)
-            
-        # Включаем кнопку обратно
-        self.spin_button.setEnabled(True)
-    
-    def flash_winning_reels(self):
-        """Мигание барабанов при выигрыше"""
-        for reel in self.reels:
-            reel.setStyleSheet("""
-                QLabel {
-                    font-size: 32px;
-                    background-color: #f1c40f;
-                    border: 3px solid #f39c12;
-                    border-radius: 6px;
-                    padding: 8px;
-                    text-align: center;
-                    min-width: 60px;
-                    max-width: 60px;
-                    min-height: 60px;
-                    max-height: 60px;
-                }
-            """)
-        
-        # Возвращаем обычный стиль через полсекунды
-        QtCore.QTimer.singleShot(500, lambda: self.restore_normal_reels())
-    
-    def restore_normal_reels(self):
-        """Возвращаем обычный стиль барабанам"""
-        for reel in self.reels:
-            reel.setStyleSheet("""
-                QLabel {
-                    font-size: 32px;
-                    background-color: white;
-                    border: 2px solid #34495e;
-                    border-radius: 6px;
-                    padding: 8px;
-                    text-align: center;
-                    min-width: 60px;
-                    max-width: 60px;
-                    min-height: 60px;
-                    max-height: 60px;
-                }
-            """)
-        
-    def check_winnings(self, result):
-        """Проверяет выигрышные комбинации"""
-        # Джекпот - все символы одинаковые
-        if result[0] == result[1] == result[2]:
-            if result[0] == "💎":
-                return 1000  # Джекпот бриллианты
-            elif result[0] == "⭐":
-                return 500   # Звезды
-            elif result[0] == "🔥":
-                return 300   # Огонь
-            else:
-                return 100   # Другие тройки
-                
-        # Пара символов
-        elif result[0] == result[1] or result[1] == result[2] or result[0] == result[2]:
-            if "💎" in result:
-                return 50
-            elif "⭐" in result:
-                return 30
-            else:
-                return 20
-                
-        return 0
-        
-    def update_coins_display(self):
-        self.coins_label.setText(f"💰 Монеты: {self.coins}")
-        if self.coins < 10:
-            self.coins_label.setStyleSheet("""
-                QLabel {
-                    font-size: 14px;
-                    font-weight: bold;
-                    color: white;
-                    background-color: #e74c3c;
-                    padding: 8px;
-                    border-radius: 4px;
-                    text-align: center;
-                }
-            """)
-        else:
-            self.coins_label.setStyleSheet("""
-                QLabel {
-                    font-size: 14px;
-                    font-weight: bold;
-                    color: white;
-                    background-color: #27ae60;
-                    padding: 8px;
-                    border-radius: 4px;
-                    text-align: center;
-                }
-            """)
-
-    def open_blackjack(self):
-        """Открывает игру в блэкджек с текущими монетами"""
-        blackjack_window = BlackjackWindow(self, self.coins)
-        result = blackjack_window.exec()
-        if result:
-            # Обновляем монеты после игры в блэкджек
-            self.coins = blackjack_window.coins
-            self.update_coins_display()
-
-class BlackjackWindow(QtWidgets.QDialog):
-    def __init__(self, parent=None, coins=100):
-        super().__init__(parent)
-        self.setWindowTitle("🃏 Блэкджек")
-        self.setFixedSize(500, 600)
-        self.coins = coins
-        self.bet = 0
-        self.player_cards = []
-        self.dealer_cards = []
-        self.game_in_progress = False
-        self.dealer_hidden = True
-        
-        # Колода карт
-        self.deck = self.create_deck()
-        random.shuffle(self.deck)
-        
-        self.init_ui()
-        
-    def create_deck(self):
-        """Создает колоду карт"""
-        suits = ['♠', '♥', '♦', '♣']
-        ranks = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
-        deck = []
-        for suit in suits:
-            for rank in ranks:
-                deck.append(f"{rank}{suit}")
-        return deck
-        
-    def init_ui(self):
-        layout = QtWidgets.QVBoxLayout(self)
-        layout.setSpacing(10)
-        layout.setContentsMargins(15, 15, 15, 15)
-        
-        # Заголовок
-        title = QtWidgets.QLabel("🃏 Блэкджек")
-        title.setStyleSheet("""
-            QLabel {
-                font-size: 18px;
-                font-weight: bold;
-                color: white;
-                background-color: #2c3e50;
-                padding: 10px;
-                border-radius: 6px;
-                text-align: center;
-            }
-        """)
-        title.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(title)
-        
-        # Счетчик монет
-        self.coins_label = QtWidgets.QLabel(f"💰 Монеты: {self.coins}")
-        self.coins_label.setStyleSheet("""
-            QLabel {
-                font-size: 14px;
-                font-weight: bold;
-                color: white;
-                background-color: #27ae60;
-                padding: 8px;
-                border-radius: 4px;
-                text-align: center;
-            }
-        """)
-        self.coins_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(self.coins_label)
-        
-        # Ставка
-        bet_layout = QtWidgets.QHBoxLayout()
-        bet_label = QtWidgets.QLabel("Ставка:")
-        bet_label.setStyleSheet("font-weight: bold; font-size: 14px;")
-        bet_layout.addWidget(bet_label)
-        
-        self.bet_slider = QtWidgets.QSlider(QtCore.Qt.Orientation.Horizontal)
-        self.bet_slider.setRange(10, min(100, self.coins))
-        self.bet_slider.setValue(10)
-        self.bet_value_label = QtWidgets.QLabel("10")
-        self.bet_slider.valueChanged.connect(lambda v: self.bet_value_label.setText(str(v)))
-        
-        bet_layout.addWidget(self.bet_slider)
-        bet_layout.addWidget(self.bet_value_label)
-        layout.addLayout(bet_layout)
-        
-        # Карты дилера
-        dealer_label = QtWidgets.QLabel("🎩 Дилер:")
-        dealer_label.setStyleSheet("font-weight: bold; font-size: 14px; color: #e74c3c;")
-        layout.addWidget(dealer_label)
-        
-        self.dealer_cards_label = QtWidgets.QLabel("🂠 🂠")
-        self.dealer_cards_label.setStyleSheet("""
-            QLabel {
-                font-size: 24px;
-                background-color: #2c3e50;
-                color: white;
-                padding: 10px;
-                border-radius: 6px;
-                text-align: center;
-                min-height: 40px;
-            }
-        """)
-        self.dealer_cards_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(self.dealer_cards_label)
-        
-        self.dealer_score_label = QtWidgets.QLabel("Очки: ?")
-        self.dealer_score_label.setStyleSheet("font-weight: bold; text-align: center;")
-        self.dealer_score_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(self.dealer_score_label)
-        
-        # Карты игрока
-        player_label = QtWidgets.QLabel("👤 Ваши карты:")
-        player_label.setStyleSheet("font-weight: bold; font-size: 14px; color: #3498db;")
-        layout.addWidget(player_label)
-        
-        self.player_cards_label = QtWidgets.QLabel("🂠 🂠")
-        self.player_cards_label.setStyleSheet("""
-            QLabel {
-                font-size: 24px;
-                background-color: #3498db;
-                color: white;
-                padding: 10px;
-                border-radius: 6px;
-                text-align: center;
-                min-height: 40px;
-            }
-        """)
-        self.player_cards_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(self.player_cards_label)
-        
-        self.player_score_label = QtWidgets.QLabel("Очки: 0")
-        self.player_score_label.setStyleSheet("font-weight: bold; text-align: center;")
-        self.player_score_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(self.player_score_label)
-        
-        # Кнопки управления игрой
-        game_buttons_layout = QtWidgets.QHBoxLayout()
-        
-        self.start_button = QtWidgets.QPushButton("🎮 Начать игру")
-        self.start_button.clicked.connect(self.start_game)
-        self.start_button.setStyleSheet("""
-            QPushButton {
-                background-color: #27ae60;
-                color: white;
-                font-weight: bold;
-                font-size: 12px;
-                border: none;
-                border-radius: 4px;
-                padding: 10px;
-            }
-            QPushButton:hover {
-                background-color: #229954;
-            }
-        """)
-        game_buttons_layout.addWidget(self.start_button)
-        
-        self.hit_button = QtWidgets.QPushButton("🃏 Еще карту")
-        self.hit_button.clicked.connect(self.hit)
-        self.hit_button.setEnabled(False)
-        self.hit_button.setStyleSheet("""
-            QPushButton {
-                background-color: #f39c12;
-                color: white;
-                font-weight: bold;
-                font-size: 12px;
-                border: none;
-                border-radius: 4px;
-                padding: 10px;
-            }
-            QPushButton:hover {
-                background-color: #e67e22;
-            }
-            QPushButton:disabled {
-                background-color: #bdc3c7;
-            }
-        """)
-        game_buttons_layout.addWidget(self.hit_button)
-        
-        self.stand_button = QtWidgets.QPushButton("🛑 Остановиться")
-        self.stand_button.clicked.connect(self.stand)
-        self.stand_button.setEnabled(False)
-        self.stand_button.setStyleSheet("""
-            QPushButton {
-                background-color: #e74c3c;
-                color: white;
-                font-weight: bold;
-                font-size: 12px;
-                border: none;
-                border-radius: 4px;
-                padding: 10px;
-            }
-            QPushButton:hover {
-                background-color: #c0392b;
-            }
-            QPushButton:disabled {
-                background-color: #bdc3c7;
-            }
-        """)
-        game_buttons_layout.addWidget(self.stand_button)
-        
-        layout.addLayout(game_buttons_layout)
-        
-        # Результат игры
-        self.result_label = QtWidgets.QLabel("Сделайте ставку и начните игру!")
-        self.result_label.setStyleSheet("""
-            QLabel {
-                font-size: 14px;
-                font-weight: bold;
-                color: #2c3e50;
-                background-color: #ecf0f1;
-                padding: 10px;
-                border-radius: 6px;
-                border: 1px solid #bdc3c7;
-                text-align: center;
-            }
-        """)
-        self.result_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(self.result_label)
-        
-        # Кнопка закрыть
-        close_button = QtWidgets.QPushButton("❌ Назад к слотам")
-        close_button.clicked.connect(self.accept)
-        close_button.setStyleSheet("""
-            QPushButton {
-                background-color: #95a5a6;
-                color: white;
-                font-weight: bold;
-                font-size: 12px;
-                border: none;
-                border-radius: 4px;
-                padding: 8px;
-            }
-            QPushButton:hover {
-                background-color: #7f8c8d;
-            }
-        """)
-        layout.addWidget(close_button)
-        
-        # Общий стиль окна
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #ffffff;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-        """)
-        
-    def start_game(self):
-        """Начинает новую игру"""
-        if self.coins < 10:
-            self.result_label.setText("❌ Недостаточно монет для игры!")
-            return
-            
-        self.bet = self.bet_slider.value()
-        if self.bet > self.coins:
-            self.result_label.setText("❌ Ставка больше доступных монет!")
-            return
-            
-        self.coins -= self.bet
-        self.update_coins_display()
-        
-        # Сброс игры
-        self.player_cards = []
-        self.dealer_cards = []
-        self.game_in_progress = True
-        self.dealer_hidden = True
-        
-        # Раздача карт
-        self.player_cards.append(self.deal_card())
-        self.dealer_cards.append(self.deal_card())
-        self.player_cards.append(self.deal_card())
-        self.dealer_cards.append(self.deal_card())
-        
-        self.update_display()
-        
-        # Проверка на блэкджек
-        if self.calculate_score(self.player_cards) == 21:
-            self.dealer_hidden = False
-            self.update_display()
-            if self.calculate_score(self.dealer_cards) == 21:
-                self.end_game("🟡 Ничья! Блэкджек у обоих!", self.bet)
-            else:
-                self.end_game("🎉 БЛЭКДЖЕК! Вы выиграли!", int(self.bet * 2.5))
-            return
-            
-        # Активируем кнопки
-        self.start_button.setEnabled(False)
-        self.hit_button.setEnabled(True)
-        self.stand_button.setEnabled(True)
-        
-        self.result_label.setText(f"💰 Ставка: {self.bet} монет. Ваш ход!")
-        
-    def deal_card(self):
-        """Раздает карту из колоды"""
-        if len(self.deck) < 10:
-            self.deck = self.create_deck()
-            random.shuffle(self.deck)
-        return self.deck.pop()
-        
-    def calculate_score(self, cards):
-        """Подсчитывает очки руки"""
-        score = 0
-        aces = 0
-        
-        for card in cards:
-            rank = card[:-1]  # Убираем масть
-            if rank in ['J', 'Q', 'K']:
-                score += 10
-            elif rank == 'A':
-                aces += 1
-                score += 11
-            else:
-                score += int(rank)
-        
-        # Обработка тузов
-        while score > 21 and aces > 0:
-            score -= 10
-            aces -= 1
-            
-        return score
-        
-    def update_display(self):
-        """Обновляет отображение карт и очков"""
-        # Карты игрока
-        player_display = " ".join(self.player_cards)
-        self.player_cards_label.setText(player_display)
-        player_score = self.calculate_score(self.player_cards)
-        self.player_score_label.setText(f"Очки: {player_score}")
-        
-        # Карты дилера
-        if self.dealer_hidden and len(self.dealer_cards) > 0:
-            dealer_display = f"🂠 {self.dealer_cards[1] if len(self.dealer_cards) > 1 else ''}"
-            self.dealer_score_label.setText("Очки: ?")
-        else:
-            dealer_display = " ".join(self.dealer_cards)
-            dealer_score = self.calculate_score(self.dealer_cards)
-            self.dealer_score_label.setText(f"Очки: {dealer_score}")
-            
-        self.dealer_cards_label.setText(dealer_display)
-        
-    def hit(self):
-        """Игрок берет еще карту"""
-        self.player_cards.append(self.deal_card())
-        self.update_display()
-        
-        player_score = self.calculate_score(self.player_cards)
-        if player_score > 21:
-            self.end_game("💥 Перебор! Вы проиграли!", 0)
-        elif player_score == 21:
-            self.stand()  # Автоматически останавливаемся при 21
-            
-    def stand(self):
-        """Игрок останавливается, ход дилера"""
-        self.dealer_hidden = False
-        self.hit_button.setEnabled(False)
-        self.stand_button.setEnabled(False)
-        
-        # Дилер добирает карты
-        while self.calculate_score(self.dealer_cards) < 17:
-            self.dealer_cards.append(self.deal_card())
-            
-        self.update_display()
-        
-        # Определяем победителя
-        player_score = self.calculate_score(self.player_cards)
-        dealer_score = self.calculate_score(self.dealer_cards)
-        
-        if dealer_score > 21:
-            self.end_game("🎉 Дилер перебрал! Вы выиграли!", self.bet * 2)
-        elif dealer_score > player_score:
-            self.end_game("😞 Дилер выиграл!", 0)
-        elif player_score > dealer_score:
-            self.end_game("🎉 Вы выиграли!", self.bet * 2)
-        else:
-            self.end_game("🟡 Ничья!", self.bet)
-            
-    def end_game(self, message, winnings):
-        """Завершает игру"""
-        self.game_in_progress = False
-        self.coins += winnings
-        self.update_coins_display()
-        
-        self.result_label.setText(message)
-        if winnings > 0:
-            self.result_label.setStyleSheet("""
-                QLabel {
-                    font-size: 14px;
-                    font-weight: bold;
-                    color: white;
-                    background-color: #27ae60;
-                    padding: 10px;
-                    border-radius: 6px;
-                    text-align: center;
-                }
-            """)
-        else:
-            self.result_label.setStyleSheet("""
-                QLabel {
-                    font-size: 14px;
-                    font-weight: bold;
-                    color: white;
-                    background-color: #e74c3c;
-                    padding: 10px;
-                    border-radius: 6px;
-                    text-align: center;
-                }
-            """)
-            
-        # Активируем кнопку новой игры
-        self.start_button.setEnabled(True)
-        self.hit_button.setEnabled(False)
-        self.stand_button.setEnabled(False)
-        
-        # Обновляем слайдер ставок
-        self.bet_slider.setMaximum(min(100, self.coins))
-        
-    def update_coins_display(self):
-        """Обновляет отображение монет"""
-        self.coins_label.setText(f"💰 Монеты: {self.coins}")
-        if self.coins < 10:
-            self.coins_label.setStyleSheet("""
-                QLabel {
-                    font-size: 14px;
-                    font-weight: bold;
-                    color: white;
-                    background-color: #e74c3c;
-                    padding: 8px;
-                    border-radius: 4px;
-                    text-align: center;
-                }
-            """)
-        else:
-            self.coins_label.setStyleSheet("""
-                QLabel {
-                    font-size: 14px;
-                    font-weight: bold;
-                    color: white;
-                    background-color: #27ae60;
-                    padding: 8px;
-                    border-radius: 4px;
-                    text-align: center;
-                }
-            """)
-
 class MainWindow(QtWidgets.QMainWindow):
     def __init__(self):
         super().__init__()
+        load_renderer()  # первое обращение к рендереру - здесь
         self.setWindowTitle("🎮 3D Рендерер v2.0 - Единая панель управления")
         self.setMinimumSize(1200, 800)
         self.setFixedSize(1200, 800)
@@ -1467,7 +871,9 @@ class MainWindow(QtWidgets.QMainWindow):
         # Устанавливаем единую панель управления как центральный виджет
         self.control_panel = MainControlPanel()
         self.setCentralWidget(self.control_panel)
-        
+        self.voxel_size = 0.0  # шаг решётки воксельного режима, 0 - выключен
+        self.render_engine = 0  # 0 - растеризация граней, 1 - лучи
+
         # Статус бар
         self.status_bar = self.statusBar()
         status_msg = "🚀 3D Рендерер готов к работе! "
@@ -1477,15 +883,106 @@ class MainWindow(QtWidgets.QMainWindow):
             status_msg += "⚠️ Некоторые функции недоступны"
         self.status_bar.showMessage(status_msg)
         
+        # Прогресс потоковой загрузки сцены и кнопка отмены
+        self.load_progress = QtWidgets.QProgressBar()
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.setFormat("⏳ %p%")
+        self.load_progress.hide()
+        self.status_bar.addPermanentWidget(self.load_progress)
+        self.cancel_load_button = QtWidgets.QPushButton("✖ Отмена")
+        self.cancel_load_button.clicked.connect(self.control_panel.loader.cancel)
+        self.cancel_load_button.hide()
+        self.status_bar.addPermanentWidget(self.cancel_load_button)
+        loader = self.control_panel.loader
+        loader.progress.connect(self.on_load_progress)
+        loader.finished.connect(self.on_load_finished)
+        loader.cancelled.connect(self.on_load_cancelled)
+        self.control_panel.sdl_widget.cube_picked.connect(self.on_cube_picked)
+        
+        # Статистика рендера (FPS, простой, отсечение) в правой части статус бара
+        self.render_stats_label = QtWidgets.QLabel()
+        self.status_bar.addPermanentWidget(self.render_stats_label)
+        self.stats_timer = QtCore.QTimer()
+        self.stats_timer.timeout.connect(self.update_render_stats)
+        self.stats_timer.start(500)
+        
         # Меню
         self.create_menu()
     
+    def on_cube_picked(self, handle, info, elapsed_ms):
+        """Показывает выбранный щелчком куб и его ближайших соседей"""
+        if handle < 0:
+            self.status_bar.showMessage(f"🎯 Под курсором нет куба ({elapsed_ms:.2f} мс)", 3000)
+            return
+        # Сцену меняет поток рендера - здесь только значения из сигнала
+        x, y, z, size, neighbours = info
+        self.status_bar.showMessage(
+            f"🎯 Куб #{handle}: ({x:.1f}, {y:.1f}, {z:.1f}), размер {size:.1f} | "
+            f"соседей в радиусе {PICK_NEIGHBOUR_RADIUS:g}: {neighbours} | выбор {elapsed_ms:.2f} мс")
+    
+    def closeEvent(self, event):
+        # Поток рендера дорисовывает текущий кадр и завершается до выхода
+        self.control_panel.sdl_widget.queue.stop()
+        super().closeEvent(event)
+    
+    def update_render_stats(self):
+        """Показывает FPS, долю простоя и сколько кубов нарисовано/отсечено"""
+        scheduler = self.control_panel.sdl_widget.scheduler
+        scheduler.update_stats()
+        text = f"🎞 FPS: {scheduler.fps:.1f} | 💤 Простой: {scheduler.idle_ratio * 100:.0f}%"
+        scene = self.control_panel.scene
+        if scene.pending:
+            text += f" | ⏳ В рендерере: {scene.uploaded * 100 // max(len(scene), 1)}%"
+        if has_cull_stats:
+            visible = renderer3d.GetVisibleCount()
+            culled = renderer3d.GetCulledCount()
+            text += f" | 👁 Видимых: {visible} | ✂️ Отсечено: {culled}"
+        if has_occlusion_culling:
+            text += f" | 🙈 Перекрыто: {renderer3d.GetOccludedCount()}"
+        if has_lod:
+            text += f" | 🔹 Точками: {renderer3d.GetImpostorCount()}"
+        if has_render_engine and self.render_engine == 1:
+            text += " | 🔦 Лучи"
+        if has_voxels and self.voxel_size > 0:
+            quads = renderer3d.GetVoxelQuadCount()
+            text += f" | 🧱 Треугольников: {2 * quads} вместо {12 * len(scene)}"
+        sdl_widget = self.control_panel.sdl_widget
+        if sdl_widget.resolution.enabled:
+            width, height = sdl_widget.resolution.size(*sdl_widget.output_size)
+            text += f" | 📐 Разрешение: {sdl_widget.resolution.scale * 100:.0f}% ({width}×{height})"
+        profiler = sdl_widget.profiler
+        if profiler.enabled and profiler.frames:
+            p50, p95, p99 = profiler.percentiles()
+            text += (f" | ⏱ p50/p95/p99: {p50:.1f}/{p95:.1f}/{p99:.1f} мс"
+                     f" | ⚠️ Пропущено: {profiler.dropped}")
+        self.render_stats_label.setText(text)
+    
     def create_menu(self):
         menubar = self.menuBar()
         
         # Файл
         file_menu = menubar.addMenu('📁 Файл')
         
+        open_scene_action = QtGui.QAction('📂 Открыть сцену...', self)
+        open_scene_action.setShortcut(QtGui.QKeySequence.StandardKey.Open)
+        open_scene_action.triggered.connect(self.open_scene)
+        file_menu.addAction(open_scene_action)
+        
+        append_scene_action = QtGui.QAction('➕ Добавить сцену из файла...', self)
+        append_scene_action.triggered.connect(self.append_scene)
+        file_menu.addAction(append_scene_action)
+        
+        save_scene_action = QtGui.QAction('💾 Сохранить сцену...', self)
+        save_scene_action.setShortcut(QtGui.QKeySequence.StandardKey.Save)
+        save_scene_action.triggered.connect(self.save_scene)
+        file_menu.addAction(save_scene_action)
+        
+        file_menu.addSeparator()
+        
+        export_profile_action = QtGui.QAction('📊 Экспорт профиля кадров...', self)
+        export_profile_action.triggered.connect(self.export_profile)
+        file_menu.addAction(export_profile_action)
+        
         exit_action = QtGui.QAction('🚪 Выход', self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
@@ -1500,11 +997,224 @@ class MainWindow(QtWidgets.QMainWindow):
         # Инструменты
         tools_menu = menubar.addMenu('🔧 Инструменты')
         
+        idle_fps_action = QtGui.QAction('💤 Частота кадров в простое...', self)
+        idle_fps_action.triggered.connect(self.set_idle_fps)
+        tools_menu.addAction(idle_fps_action)
+        
+        smoothing_action = QtGui.QAction('🖱 Сглаживание камеры...', self)
+        smoothing_action.triggered.connect(self.set_camera_smoothing)
+        tools_menu.addAction(smoothing_action)
+        
+        if has_worker_count:
+            workers_action = QtGui.QAction('🧵 Процессы растеризации...', self)
+            workers_action.triggered.connect(self.set_worker_count)
+            tools_menu.addAction(workers_action)
+        
+        if has_occlusion_culling:
+            occlusion_action = QtGui.QAction('🙈 Отсечение перекрытых (Hi-Z)', self)
+            occlusion_action.setCheckable(True)
+            occlusion_action.setChecked(True)
+            occlusion_action.toggled.connect(self.toggle_occlusion_culling)
+            tools_menu.addAction(occlusion_action)
+        
+        if has_lod:
+            lod_action = QtGui.QAction('🔹 Уровни детализации (LOD)...', self)
+            lod_action.triggered.connect(self.set_lod_thresholds)
+            tools_menu.addAction(lod_action)
+        
+        if has_render_engine:
+            # Как рисуются кубы: грани треугольниками или лучами с точной глубиной
+            engine_menu = tools_menu.addMenu('🔦 Движок рендера')
+            engine_group = QtGui.QActionGroup(self)
+            for engine, title in enumerate(('🔺 Растеризация граней', '🔦 Лучи (точная глубина)')):
+                action = QtGui.QAction(title, self)
+                action.setCheckable(True)
+                action.setChecked(engine == self.render_engine)
+                action.triggered.connect(lambda checked, engine=engine: self.set_render_engine(engine))
+                engine_group.addAction(action)
+                engine_menu.addAction(action)
+        
+        if has_voxels:
+            voxel_action = QtGui.QAction('🧱 Воксельный режим...', self)
+            voxel_action.triggered.connect(self.set_voxel_mode)
+            tools_menu.addAction(voxel_action)
+        
+        if has_resize_renderer and not renderer_is_native:
+            resolution_action = QtGui.QAction('📐 Динамическое разрешение...', self)
+            resolution_action.triggered.connect(self.set_frame_budget)
+            tools_menu.addAction(resolution_action)
+        
+        profiler_action = QtGui.QAction('⏱ Профилировщик кадров', self)
+        profiler_action.setCheckable(True)
+        profiler_action.setChecked(self.control_panel.sdl_widget.profiler.enabled)
+        profiler_action.toggled.connect(self.toggle_profiler)
+        tools_menu.addAction(profiler_action)
+        
         if not (has_background_color and has_object_count and has_reset_camera):
             compile_action = QtGui.QAction('⚙️ Перекомпилировать DLL', self)
             compile_action.triggered.connect(self.show_compile_info)
             tools_menu.addAction(compile_action)
     
+    def set_idle_fps(self):
+        """Частота перерисовки, когда ничего не меняется (0 - не рисовать совсем)"""
+        scheduler = self.control_panel.sdl_widget.scheduler
+        value, ok = QtWidgets.QInputDialog.getDouble(
+            self, "Частота в простое", "Кадров в секунду в простое (0 - выключить):",
+            scheduler.idle_fps, 0.0, 60.0, 1)
+        if ok:
+            scheduler.set_idle_fps(value)
+            print(f"💤 Частота кадров в простое: {value:g}")
+    
+    def set_camera_smoothing(self):
+        """Камера плавно догоняет мышь и колесо вместо мгновенного сдвига"""
+        camera_input = self.control_panel.sdl_widget.camera_input
+        value, ok = QtWidgets.QInputDialog.getInt(
+            self, "Сглаживание камеры", "Постоянная времени, мс (0 - без сглаживания):",
+            int(round(camera_input.smoothing * 1000)), 0, 1000, 10)
+        if ok:
+            camera_input.smoothing = value / 1000
+            print(f"🖱 Сглаживание камеры: {value} мс")
+    
+    def set_frame_budget(self):
+        """Разрешение кадра снижается, когда кадр не укладывается в бюджет, и растёт обратно"""
+        sdl_widget = self.control_panel.sdl_widget
+        value, ok = QtWidgets.QInputDialog.getDouble(
+            self, "Динамическое разрешение", "Бюджет кадра, мс (0 - всегда полное разрешение):",
+            sdl_widget.resolution.budget * 1000 or 16.6, 0.0, 1000.0, 1)
+        if ok:
+            self.control_panel.queue.call(sdl_widget.set_frame_budget, value / 1000)
+            print(f"📐 Динамическое разрешение: {'бюджет ' + format(value, 'g') + ' мс' if value > 0 else 'выключено'}")
+    
+    def open_scene(self):
+        """
+        Открывает сцену из .r3ds: файл отображается в память, а не читается;
+        в рендерер кубы уходят потоково, пачками в каждом кадре (upload_scene)
+        """
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Открыть сцену", "", "Сцена 3D (*.r3ds);;Все файлы (*)")
+        if not path:
+            return
+        try:
+            started = time.perf_counter()
+            self.control_panel.loader.cancel()
+            queue = self.control_panel.queue
+            count = queue.wait(queue.call(scene_file.load_scene, self.control_panel.scene, path))
+            elapsed = (time.perf_counter() - started) * 1000
+        except (OSError, scene_file.SceneFileError) as e:
+            QtWidgets.QMessageBox.warning(self, "Открыть сцену", f"❌ Не удалось открыть сцену:\n{e}")
+            return
+        self.status_bar.showMessage(f"📂 Сцена загружена: {count} кубов за {elapsed:.1f} мс", 5000)
+        print(f"✅ Сцена загружена из {path}: {count} кубов")
+    
+    def append_scene(self):
+        """Потоково добавляет кубы из .r3ds к текущей сцене, не блокируя интерфейс"""
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Добавить сцену", "", "Сцена 3D (*.r3ds);;Все файлы (*)")
+        if not path:
+            return
+        try:
+            count = scene_file.read_header(path)[0]
+        except (OSError, scene_file.SceneFileError) as e:
+            QtWidgets.QMessageBox.warning(self, "Добавить сцену", f"❌ Не удалось открыть сцену:\n{e}")
+            return
+        self.control_panel.loader.start(scene_loader.file_chunks(path), count)
+        print(f"⏳ Загрузка {count} кубов из {path}...")
+    
+    def on_load_progress(self, loaded, total):
+        self.load_progress.setMaximum(max(total, 1))
+        self.load_progress.setValue(loaded)
+        self.load_progress.show()
+        self.cancel_load_button.show()
+        self.status_bar.showMessage(f"⏳ Загрузка сцены: {loaded} из {total} кубов")
+    
+    def on_load_finished(self, loaded):
+        self.load_progress.hide()
+        self.cancel_load_button.hide()
+        self.status_bar.showMessage(f"✅ Сцена загружена: {loaded} кубов", 5000)
+    
+    def on_load_cancelled(self, loaded):
+        self.load_progress.hide()
+        self.cancel_load_button.hide()
+        self.status_bar.showMessage(f"✖ Загрузка отменена: добавлено {loaded} кубов", 5000)
+    
+    def save_scene(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Сохранить сцену", "scene.r3ds", "Сцена 3D (*.r3ds)")
+        if not path:
+            return
+        try:
+            queue = self.control_panel.queue
+            queue.wait(queue.call(scene_file.save_scene, self.control_panel.scene, path))
+        except OSError as e:
+            # В Windows нельзя перезаписать файл, открытый сейчас в сцене
+            QtWidgets.QMessageBox.warning(self, "Сохранить сцену", f"❌ Не удалось сохранить сцену:\n{e}")
+            return
+        self.status_bar.showMessage(f"💾 Сцена сохранена: {path}", 5000)
+        print(f"✅ Сцена сохранена в {path}: {len(self.control_panel.scene)} кубов")
+    
+    def set_worker_count(self):
+        """Число процессов, по которым раскладываются тайлы кадра"""
+        value, ok = QtWidgets.QInputDialog.getInt(
+            self, "Процессы растеризации", "Число процессов (1 - без тайлов):",
+            renderer3d.GetWorkerCount(), 1, 64)
+        if ok:
+            self.control_panel.queue.call(renderer3d.SetWorkerCount, value)
+            print(f"🧵 Процессов растеризации: {value}")
+    
+    def set_render_engine(self, engine):
+        """Растеризация граней или лучи: сцена, камера и отсечение общие"""
+        self.render_engine = engine
+        self.control_panel.queue.call(renderer3d.SetRenderEngine, engine)
+        print(f"🔦 Движок рендера: {'лучи' if engine == 1 else 'растеризация'}")
+    
+    def toggle_occlusion_culling(self, enabled):
+        self.control_panel.queue.call(renderer3d.SetOcclusionCulling, enabled)
+    
+    def set_lod_thresholds(self):
+        """Пороги замены дальних кубов точками-импостерами"""
+        point_pixels, ok = QtWidgets.QInputDialog.getDouble(
+            self, "Уровни детализации", "Рисовать точкой кубы мельче (пикселей, 0 - выключить):",
+            renderer3d.lod_point_pixels, 0.0, 32.0, 1)
+        if not ok:
+            return
+        cluster_pixels, ok = QtWidgets.QInputDialog.getInt(
+            self, "Уровни детализации", "Сливать точки в ячейке (пикселей):",
+            renderer3d.lod_cluster_pixels, 1, 32)
+        if not ok:
+            return
+        self.control_panel.queue.call(renderer3d.SetLodThresholds, point_pixels, cluster_pixels)
+        print(f"🔹 LOD: точки < {point_pixels:g} px, ячейка {cluster_pixels} px")
+    
+    def set_voxel_mode(self):
+        """Кубы как воксели решётки: рисуются только открытые грани, слитые по чанкам"""
+        size, ok = QtWidgets.QInputDialog.getDouble(
+            self, "Воксельный режим", "Шаг решётки вокселей (0 - выключить):",
+            self.voxel_size or 1.0, 0.0, 100.0, 3)
+        if not ok:
+            return
+        self.voxel_size = size
+        self.control_panel.queue.call(renderer3d.SetVoxelMode, size > 0, size)
+        print(f"🧱 Воксельный режим: {'шаг ' + format(size, 'g') if size > 0 else 'выключен'}")
+    
+    def toggle_profiler(self, enabled):
+        profiler = self.control_panel.sdl_widget.profiler
+        profiler.enabled = enabled
+        if enabled:
+            profiler.reset()
+    
+    def export_profile(self):
+        """Сохраняет последние кадры профилировщика в CSV или JSON"""
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Экспорт профиля кадров", "frame_profile.csv",
+            "CSV (*.csv);;JSON (*.json)")
+        if not path:
+            return
+        try:
+            self.control_panel.sdl_widget.profiler.export(path)
+            print(f"✅ Профиль кадров сохранён: {path}")
+        except OSError as e:
+            print(f"❌ Ошибка экспорта профиля: {e}")
+    
     def show_about(self):
         QtWidgets.QMessageBox.about(
             self,
@@ -1535,6 +1245,14 @@ class MainWindow(QtWidgets.QMainWindow):
         )
 
 if __name__ == "__main__":
+    # В собранном exe дочерние процессы (рендер, пакетный рендер) запускают тот же exe
+    multiprocessing.freeze_support()
+
+    # Пакетный рендер без окна: python test_improved.py render [аргументы batch_render]
+    if len(sys.argv) > 1 and sys.argv[1] == "render":
+        import batch_render
+        sys.exit(batch_render.main(sys.argv[2:]))
+
     app = QtWidgets.QApplication(sys.argv)
     app.setStyle('Fusion')  # Современный стиль
     
@@ -0,0 +1,67 @@
+"""Общее для тестов: модули приложения лежат уровнем выше, без пакета"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generators  # noqa: E402
+import renderer_cpu  # noqa: E402
+
+WIDTH, HEIGHT = 200, 150
+
+
+@pytest.fixture
+def cubes():
+    """Решётка перед камерой: дальние слои перекрыты ближними"""
+    return generators.generate("grid", 4000, seed=1)
+
+
+@pytest.fixture
+def render():
+    """render(cubes, **настройки) -> кадр CpuRenderer (height, width)"""
+    renderers = []
+
+    def draw(cubes, colors=None, **settings):
+        renderer = renderer_cpu.CpuRenderer()
+        renderers.append(renderer)
+        renderer.InitRenderer3D(WIDTH, HEIGHT)
+        for name, args in settings.items():
+            getattr(renderer, name)(*args)
+        cubes = np.ascontiguousarray(cubes, dtype=np.float32)
+        renderer.AddCubes(cubes, len(cubes))
+        if colors is not None:
+            renderer.SetCubeColors(np.ascontiguousarray(colors, dtype=np.uint32), 0, len(colors))
+        renderer.RotateCamera(0.4, 0.3)
+        renderer.RenderFrame()
+        return renderer.framebuffer.copy()
+
+    yield draw
+    for renderer in renderers:
+        renderer.CloseRenderer3D()
+
+
+@pytest.fixture
+def sync():
+    """sync(renderer, scene, limit) - правки и новые кубы сцены в рендерер, как upload_scene"""
+
+    def upload(renderer, scene, limit=None):
+        count, moved, recolored = scene.take_changes()
+        if count is not None:
+            renderer.TruncateCubes(count)
+        if moved is not None:
+            first, cubes = moved
+            renderer.SetCubes(np.ascontiguousarray(cubes), first, len(cubes))
+        if recolored is not None:
+            first, colors = recolored
+            renderer.SetCubeColors(np.ascontiguousarray(colors), first, len(colors))
+        reset, cubes, colors = scene.take_upload(limit)
+        if reset:
+            renderer.ClearScene()
+        if len(cubes):
+            renderer.AddCubes(np.ascontiguousarray(cubes), len(cubes))
+            renderer.SetCubeColors(np.ascontiguousarray(colors), scene.uploaded - len(cubes), len(colors))
+
+    return upload
@@ -0,0 +1,93 @@
+"""Отдельный процесс рендера: кадр как у CpuRenderer, восстановление после ошибки и падения"""
+import numpy as np
+import pytest
+
+import render_process
+import renderer_cpu
+from scene import Scene
+
+WIDTH, HEIGHT = 160, 120
+
+
+@pytest.fixture
+def remote(cubes, sync):
+    """(renderer, scene): процесс рендера со сценой; on_restart перезаливает сцену"""
+    scene = Scene()
+    scene.add_many(cubes)
+    renderer = render_process.RemoteRenderer()
+    renderer.InitRenderer3D(WIDTH, HEIGHT)
+    renderer.SetBackgroundColor(30, 40, 50)
+    renderer.RotateCamera(0.4, 0.3)
+
+    def restart():
+        renderer.restarted = getattr(renderer, "restarted", 0) + 1
+        scene.invalidate()
+
+    renderer.on_restart = restart
+    sync(renderer, scene)
+    yield renderer, scene
+    renderer.CloseRenderer3D()
+
+
+def frame(renderer, sync, scene):
+    """Кадр процесса рендера после выгрузки правок сцены"""
+    sync(renderer, scene)
+    renderer.RenderFrame()
+    renderer.swap_buffers()
+    image = renderer.acquire_front().copy()
+    renderer.release_front()
+    return image
+
+
+def reference(scene):
+    renderer = renderer_cpu.CpuRenderer()
+    renderer.InitRenderer3D(WIDTH, HEIGHT)
+    renderer.SetBackgroundColor(30, 40, 50)
+    renderer.RotateCamera(0.4, 0.3)
+    renderer.AddCubes(np.ascontiguousarray(scene.cubes), len(scene))
+    renderer.SetCubeColors(np.ascontiguousarray(scene.colors), 0, len(scene))
+    renderer.RenderFrame()
+    return renderer.framebuffer
+
+
+def test_frame_matches_cpu_renderer(remote, sync):
+    renderer, scene = remote
+    np.testing.assert_array_equal(frame(renderer, sync, scene), reference(scene))
+    assert renderer.GetObjectCount() == len(scene)
+
+
+def test_recovers_after_command_error(remote, sync):
+    renderer, scene = remote
+    frame(renderer, sync, scene)
+    renderer.SetCubes(np.zeros((4, 4), dtype=np.float32), len(scene), 4)
+    with pytest.raises(RuntimeError, match="SetCubes"):
+        renderer.RenderFrame()
+    # Процесс тот же, сцена перезалита
+    assert renderer.restarts == 0
+    assert renderer.restarted == 1
+    np.testing.assert_array_equal(frame(renderer, sync, scene), reference(scene))
+
+
+def test_bad_setting_is_not_replayed(remote, sync):
+    renderer, scene = remote
+    renderer.SetRenderEngine(99)
+    with pytest.raises(RuntimeError):
+        renderer.RenderFrame()
+    renderer._process.kill()
+    renderer.RenderFrame()
+    np.testing.assert_array_equal(frame(renderer, sync, scene), reference(scene))
+
+
+def test_recovers_after_crash(remote, sync):
+    renderer, scene = remote
+    frame(renderer, sync, scene)
+    renderer.SetWorkerCount(2)
+    renderer._process.kill()
+    renderer.RenderFrame()
+    assert renderer.restarts == 1
+    assert renderer.restarted == 1
+    # Новый процесс получил размер и настройки, сцену - заново
+    assert renderer.GetWorkerCount() == 2
+    np.testing.assert_array_equal(frame(renderer, sync, scene), reference(scene))
+    scene.remove(int(scene.handles[0]))
+    np.testing.assert_array_equal(frame(renderer, sync, scene), reference(scene))
@@ -0,0 +1,47 @@
+"""Кадр CPU-рендерера не зависит от тайлов и отсечения перекрытых"""
+import numpy as np
+import pytest
+
+import renderer_cpu
+from renderer_cpu import ENGINE_RASTER, ENGINE_RAYCAST
+
+ENGINES = pytest.mark.parametrize("engine", [ENGINE_RASTER, ENGINE_RAYCAST], ids=renderer_cpu.ENGINE_NAMES)
+
+
+@ENGINES
+def test_tiles_match_single_worker(render, cubes, engine):
+    single = render(cubes, SetRenderEngine=(engine,))
+    tiled = render(cubes, SetRenderEngine=(engine,), SetWorkerCount=(3,))
+    assert (single != 0).any()
+    np.testing.assert_array_equal(tiled, single)
+
+
+@ENGINES
+def test_occlusion_culling_keeps_image(render, cubes, engine):
+    culled = render(cubes, SetRenderEngine=(engine,), SetOcclusionCulling=(True,))
+    full = render(cubes, SetRenderEngine=(engine,), SetOcclusionCulling=(False,))
+    np.testing.assert_array_equal(culled, full)
+
+
+def test_occlusion_culling_skips_hidden_cubes(cubes):
+    renderer = renderer_cpu.CpuRenderer()
+    renderer.InitRenderer3D(200, 150)
+    renderer.SetOcclusionCulling(True)
+    renderer.AddCubes(np.ascontiguousarray(cubes), len(cubes))
+    for _ in range(3):
+        renderer.RenderFrame()
+    assert renderer.GetOccludedCount() > 0
+    renderer.CloseRenderer3D()
+
+
+def test_worker_count_survives_pool_restart(render, cubes):
+    renderer = renderer_cpu.CpuRenderer()
+    renderer.InitRenderer3D(200, 150)
+    renderer.SetWorkerCount(2)
+    renderer.SetWorkerCount(1)
+    assert renderer.GetWorkerCount() == 1
+    renderer.AddCubes(np.ascontiguousarray(cubes), len(cubes))
+    renderer.RotateCamera(0.4, 0.3)
+    renderer.RenderFrame()
+    np.testing.assert_array_equal(renderer.framebuffer, render(cubes))
+    renderer.CloseRenderer3D()
@@ -0,0 +1,87 @@
+"""Scene: swap-remove, стабильные handle и синхронизация правок с рендерером"""
+import threading
+
+import numpy as np
+import pytest
+
+import renderer_cpu
+from scene import Scene
+
+
+def test_remove_moves_last_cube_into_hole():
+    scene = Scene()
+    handles = scene.add_many([[i, 0, 0, 1] for i in range(5)])
+    scene.remove(handles[1])
+    assert len(scene) == 4
+    # На место удалённого встал последний куб, остальные слоты не сдвинулись
+    assert scene.slot_of(handles[4]) == 1
+    assert [scene.slot_of(h) for h in handles[[0, 2, 3]]] == [0, 2, 3]
+    assert scene.get(handles[4]) == (4.0, 0.0, 0.0, 1.0)
+    assert not scene.contains(handles[1])
+    with pytest.raises(KeyError):
+        scene.slot_of(handles[1])
+
+
+def test_handles_stay_valid_through_edits():
+    rng = np.random.default_rng(3)
+    scene = Scene(capacity=4)
+    expected = {}
+    for _ in range(50):
+        cubes = rng.uniform(-10, 10, (int(rng.integers(1, 40)), 4)).astype(np.float32)
+        for handle, cube in zip(scene.add_many(cubes), cubes):
+            assert int(handle) not in expected
+            expected[int(handle)] = tuple(float(v) for v in cube)
+        for handle in rng.choice(list(expected), size=len(expected) // 4, replace=False):
+            scene.remove(int(handle))
+            del expected[int(handle)]
+    assert len(scene) == len(expected)
+    for handle, cube in expected.items():
+        assert scene.get(handle) == cube
+    # Таблицы handle <-> слот обратны друг другу
+    assert (scene.handle_slots[scene.handles] == np.arange(len(scene))).all()
+
+
+def test_removed_handles_are_reused():
+    scene = Scene()
+    handles = scene.add_many(np.ones((3, 4)))
+    scene.remove(handles[0])
+    assert scene.add(0, 0, 0, 1) == handles[0]
+
+
+def test_edits_sync_without_full_reupload(sync):
+    rng = np.random.default_rng(4)
+    scene = Scene()
+    renderer = renderer_cpu.CpuRenderer()
+    renderer.InitRenderer3D(160, 120)
+    handles = list(scene.add_many(np.column_stack([rng.uniform(-6, 6, (2000, 2)),
+                                                   rng.uniform(-16, -4, 2000), np.ones(2000)])))
+    sync(renderer, scene)
+    for round_ in range(5):
+        for _ in range(100):
+            scene.remove(handles.pop(int(rng.integers(len(handles)))))
+        for _ in range(50):
+            scene.set_cube(handles[int(rng.integers(len(handles)))], *rng.uniform(-6, 6, 2), -8.0, 1.5)
+            scene.set_color(handles[int(rng.integers(len(handles)))], 0xFF00FF)
+        handles += list(scene.add_many(np.column_stack([rng.uniform(-6, 6, (60, 2)),
+                                                        rng.uniform(-16, -4, 60), np.ones(60)])))
+        # Правки - диапазонами слотов, без перезаливки всей сцены
+        assert scene.uploaded > 0
+        sync(renderer, scene, limit=25)
+        sync(renderer, scene)
+    renderer.RenderFrame()
+
+    fresh = renderer_cpu.CpuRenderer()
+    fresh.InitRenderer3D(160, 120)
+    fresh.AddCubes(np.ascontiguousarray(scene.cubes), len(scene))
+    fresh.SetCubeColors(np.ascontiguousarray(scene.colors), 0, len(scene))
+    fresh.RenderFrame()
+    assert renderer.GetObjectCount() == len(scene)
+    np.testing.assert_array_equal(renderer.framebuffer, fresh.framebuffer)
+
+
+def test_scene_bound_to_thread_rejects_other_threads():
+    scene = Scene()
+    scene.bind_thread(threading.get_ident() + 1)
+    with pytest.raises(RuntimeError):
+        scene.add(0, 0, 0, 1)
+    assert len(scene) == 0
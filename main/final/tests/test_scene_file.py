@@ -0,0 +1,85 @@
+"""Формат .r3ds: сохранение и загрузка без потерь, отказ на битых файлах"""
+import numpy as np
+import pytest
+
+import scene_file
+from scene import FLAG_SELECTED, Scene
+from scene_file import SceneFileError
+
+
+@pytest.fixture
+def saved(tmp_path):
+    """(сцена, путь): сцена с дырками в handle после удалений и выделением"""
+    rng = np.random.default_rng(5)
+    scene = Scene()
+    handles = scene.add_many(rng.uniform(-5, 5, (500, 4)).astype(np.float32),
+                             rng.integers(0, 1 << 32, 500, dtype=np.uint32))
+    for handle in handles[::7]:
+        scene.remove(handle)
+    scene.select(handles[1])
+    path = str(tmp_path / "scene.r3ds")
+    scene_file.save_scene(scene, path)
+    return scene, path
+
+
+def test_round_trip(saved):
+    scene, path = saved
+    loaded = Scene()
+    assert scene_file.load_scene(loaded, path) == len(scene)
+    for name in ("cubes", "colors", "flags", "handles", "handle_slots"):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(scene, name))
+    handle = int(scene.handles[1])
+    assert loaded.get(handle) == scene.get(handle)
+    assert loaded.flags[loaded.slot_of(handle)] & FLAG_SELECTED
+
+
+def test_loaded_scene_is_editable_without_touching_file(saved):
+    scene, path = saved
+    before = open(path, "rb").read()
+    loaded = Scene()
+    scene_file.load_scene(loaded, path)
+    handle = int(loaded.handles[0])
+    loaded.set_cube(handle, 1, 2, 3, 4)
+    loaded.remove(int(loaded.handles[-1]))
+    added = loaded.add_many(np.ones((2000, 4)))
+    assert loaded.get(handle) == (1.0, 2.0, 3.0, 4.0)
+    assert loaded.contains(int(added[-1]))
+    assert open(path, "rb").read() == before
+
+
+def test_empty_scene_round_trip(tmp_path):
+    path = str(tmp_path / "empty.r3ds")
+    scene_file.save_scene(Scene(), path)
+    loaded = Scene()
+    assert scene_file.load_scene(loaded, path) == 0
+    assert len(loaded) == 0
+
+
+@pytest.mark.parametrize("damage", ["magic", "version", "truncated", "short"])
+def test_rejects_damaged_header(saved, damage):
+    _, path = saved
+    data = bytearray(open(path, "rb").read())
+    if damage == "magic":
+        data[:8] = b"NOTSCENE"
+    elif damage == "version":
+        data[8] = scene_file.VERSION + 1
+    elif damage == "truncated":
+        data = data[:-16]
+    else:
+        data = data[:20]
+    open(path, "wb").write(bytes(data))
+    with pytest.raises(SceneFileError):
+        scene_file.load_scene(Scene(), path)
+
+
+def test_rejects_inconsistent_handle_tables(saved):
+    scene, path = saved
+    count, handles, offsets = scene_file.read_header(path)
+    table = np.memmap(path, dtype=np.int32, mode="r+", offset=offsets[3], shape=(count,))
+    table[:] = table[::-1]
+    table.flush()
+    del table
+    loaded = Scene()
+    with pytest.raises(SceneFileError):
+        scene_file.load_scene(loaded, path)
+    assert len(loaded) == 0
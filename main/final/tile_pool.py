@@ -0,0 +1,107 @@
+"""
+Пул процессов для тайлов кадра.
+
+Потоки упираются в GIL: растеризатор и лучи - это много коротких операций
+NumPy и индексирования, которые GIL не отпускают, поэтому тайлы в пуле
+потоков не ускоряли кадр. Здесь тайлы рисуют отдельные процессы в общий
+буфер кадра в разделяемой памяти: перед вызовом буферы цвета и глубины
+копируются в него, процессы пишут каждый в свои строки, после - строки
+копируются обратно. Большие массивы только для чтения (направления лучей)
+тоже лежат в общем буфере и копируются, только когда сменились; через
+пул идут лишь многоугольники (кубы) тайлов.
+
+Процессы запускаются через spawn (не наследуют потоки и состояние Qt),
+поэтому пул нельзя создать внутри процесса-демона: отдельный процесс
+рендера (render_process) запускается без daemon.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Общий буфер в процессе пула: имя и сам блок
+_attached = {}
+
+
+class Shared:
+    """Ссылка на массив из общего буфера в аргументах тайла"""
+
+    def __init__(self, index):
+        self.index = index
+
+
+def _views(buf, layout):
+    return [np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset) for offset, shape, dtype in layout]
+
+
+def _draw(name, layout, function, before, after):
+    """Тайл в процессе пула: function(*before, color, depth, *after) по общему буферу"""
+    if _attached.get("name") != name:
+        if "shm" in _attached:
+            _attached.pop("shm").close()
+        _attached["shm"] = shared_memory.SharedMemory(name=name)
+        _attached["name"] = name
+    color, depth, *arrays = _views(_attached["shm"].buf, layout)
+    before = [arrays[arg.index] if isinstance(arg, Shared) else arg for arg in before]
+    after = [arrays[arg.index] if isinstance(arg, Shared) else arg for arg in after]
+    function(*before, color, depth, *after)
+
+
+class TilePool:
+    """Процессы для тайлов и общий буфер: цвет, глубина, затем общие массивы"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        self._shm = None
+        self._layout = []
+        self._sources = []  # массивы, скопированные в общий буфер
+
+    def run(self, function, jobs, color_buffer, depth_buffer, span, shared=()):
+        """
+        Рисует тайлы jobs = [(before, after), ...] вызовами
+        function(*before, color, depth, *after) в процессах пула; Shared(i)
+        в аргументах заменяется на shared[i]. Общий массив копируется заново,
+        только если передан другой объект, - менять его на месте нельзя.
+        span - (начало, конец) пикселей, которые задевают тайлы: только они
+        копируются в общий буфер и обратно. Исключение тайла пробрасывается.
+        """
+        arrays = [color_buffer, depth_buffer] + [np.ascontiguousarray(array) for array in shared]
+        layout, offset = [], 0
+        for array in arrays:
+            layout.append((offset, array.shape, array.dtype.str))
+            offset += -(-array.nbytes // 64) * 64
+        if self._shm is None or self._shm.size < offset:
+            self._release()
+            self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        if layout != self._layout:
+            self._layout, self._sources = layout, []
+        color, depth, *views = _views(self._shm.buf, layout)
+        for i, array in enumerate(arrays[2:]):
+            if i >= len(self._sources) or self._sources[i] is not array:
+                views[i][...] = array
+        self._sources = arrays[2:]
+        a, b = span
+        color[a:b] = color_buffer[a:b]
+        depth[a:b] = depth_buffer[a:b]
+        futures = [self._executor.submit(_draw, self._shm.name, layout, function, before, after)
+                   for before, after in jobs]
+        # Буфер копируется обратно, только когда все тайлы закончили
+        wait(futures)
+        color_buffer[a:b] = color[a:b]
+        depth_buffer[a:b] = depth[a:b]
+        del color, depth, views
+        for future in futures:
+            future.result()
+
+    def _release(self):
+        self._layout, self._sources = [], []
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        self._release()
@@ -0,0 +1,315 @@
+"""
+Воксельный режим: кубы на решётке, сгруппированные в чанки CHUNK^3.
+
+Воксель - ячейка решётки с шагом voxel_size, куб попадает в ячейку своего
+центра. Решётка привязана к центру первого куба, поэтому любая регулярная
+сетка кубов с тем же шагом ложится в ячейки без сдвига на полклетки. Чанк хранит номер цвета каждого вокселя (uint8, 0 - пусто) и
+битовую маску занятости: строка вдоль z - одно слово uint32. Открытые
+грани (у соседа по нормали пусто) находятся сдвигами масок, внутренние
+грани не строятся вовсе. Открытые грани одного цвета жадно сливаются в
+прямоугольники: сначала в отрезки наибольшей длины вдоль одной оси, затем
+одинаковые отрезки соседних строк - в один прямоугольник. Сплошной блок
+даёт десятки граней вместо шести на каждый воксель.
+
+Изменение перестраивает сетку только затронутых чанков (и соседей, если
+воксель лежит на границе чанка) - при следующем вызове mesh().
+"""
+import numpy as np
+
+from renderer_cpu import CUBE_PALETTE
+
+# Вокселей вдоль ребра чанка: строка вдоль z - ровно одно слово uint32
+CHUNK = 32
+CHUNK_SHIFT = 5
+
+# Цвет вокселя - цвет его слоя по высоте; слой в LAYER_HEIGHT вокселей.
+# Соседние воксели одного слоя одного цвета, и их грани сливаются
+LAYER_HEIGHT = 4
+
+# Чанков, которые обрабатываются за один векторный проход
+MESH_BATCH = 256
+
+# Ключ чанка: три координаты по 21 бит со сдвигом в положительные
+_KEY_BITS = 21
+_KEY_OFFSET = 1 << (_KEY_BITS - 1)
+
+# Направления граней в порядке CUBE_FACES: (ось, знак нормали)
+FACE_AXES = ((0, -1), (0, 1), (1, -1), (1, 1), (2, -1), (2, 1))
+
+
+def chunk_keys(chunks):
+    """Координаты чанков (N, 3) -> один int64-ключ на чанк"""
+    c = np.asarray(chunks, dtype=np.int64) + _KEY_OFFSET
+    return (c[:, 0] << (2 * _KEY_BITS)) | (c[:, 1] << _KEY_BITS) | c[:, 2]
+
+
+def neighbour_bits(bits, neighbour, axis, sign):
+    """
+    Маски (D, CHUNK, CHUNK) занятости соседей по направлению (axis, sign),
+    выровненные по вокселям чанка; на границе берётся слой соседнего чанка.
+    """
+    if axis == 2:
+        if sign > 0:
+            return (bits >> np.uint32(1)) | ((neighbour & np.uint32(1)) << np.uint32(CHUNK - 1))
+        return (bits << np.uint32(1)) | (neighbour >> np.uint32(CHUNK - 1))
+    dim = axis + 1
+    shifted = np.roll(bits, -sign, axis=dim)
+    edge = [slice(None)] * 3
+    source = [slice(None)] * 3
+    edge[dim] = -1 if sign > 0 else 0
+    source[dim] = 0 if sign > 0 else -1
+    shifted[tuple(edge)] = neighbour[tuple(source)]
+    return shifted
+
+
+def greedy_rectangles(chunk, s, u, v, material):
+    """
+    Сливает грани одного направления (по ячейке на грань) в прямоугольники.
+    s - координата плоскости, (u, v) - координаты в плоскости. Возвращает
+    (chunk, s, u0, v0, высота вдоль u, ширина вдоль v, material).
+    """
+    # Сортировка по одному составному ключу вместо lexsort по нескольким;
+    # грани приходят упорядоченными по (chunk, x, y, z), и при v = z ключ уже отсортирован
+    chunk, s, u, v = (np.asarray(a, dtype=np.int64) for a in (chunk, s, u, v))
+    line = (chunk * CHUNK + s) * CHUNK + u
+    order = np.argsort(line * CHUNK + v, kind="stable")
+    line, v, material = line[order], v[order], material[order]
+
+    # Отрезки вдоль v: грань продолжает отрезок, если стоит сразу за предыдущей в той же строке
+    same = (line[1:] == line[:-1]) & (material[1:] == material[:-1]) & (v[1:] == v[:-1] + 1)
+    first = np.flatnonzero(np.r_[True, ~same])
+    width = np.diff(np.r_[first, len(line)])
+    line, v, material = line[first], v[first], material[first]
+    u = line % CHUNK
+    plane = line // CHUNK  # chunk * CHUNK + s
+
+    # Одинаковые отрезки (начало, длина, цвет) в соседних строках - один прямоугольник
+    group = ((plane * CHUNK + v) * (CHUNK + 1) + width) * 256 + material
+    order = np.argsort(group * CHUNK + u)
+    group, u = group[order], u[order]
+    same = (group[1:] == group[:-1]) & (u[1:] == u[:-1] + 1)
+    first = np.flatnonzero(np.r_[True, ~same])
+    height = np.diff(np.r_[first, len(group)])
+    order = order[first]
+    plane = plane[order]
+    return plane // CHUNK, plane % CHUNK, u[first], v[order], height, width[order], material[order]
+
+
+class VoxelWorld:
+    """Воксели в чанках CHUNK^3 и жадная сетка их открытых граней"""
+
+    def __init__(self, voxel_size=1.0, palette=CUBE_PALETTE):
+        self.voxel_size = float(voxel_size)
+        self.palette = np.asarray(palette, dtype=np.uint32)
+        self.clear()
+
+    def clear(self):
+        self.origin = np.zeros(3)  # центр ячейки (0, 0, 0) в мировых координатах
+        self._anchored = False
+        # Слот 0 - пустой чанк: сосед, которого нет
+        self._slots = {}
+        self._index = np.zeros((16, CHUNK, CHUNK, CHUNK), dtype=np.uint8)
+        self._bits = np.zeros((16, CHUNK, CHUNK), dtype=np.uint32)
+        self._origins = np.zeros((16, 3), dtype=np.int64)
+        self._counts = np.zeros(16, dtype=np.int64)
+        self._faces = np.zeros(16, dtype=np.int64)  # открытых граней до слияния
+        self._used = 1
+        self._dirty = set()
+        self._quads = np.zeros(16, dtype=np.int64)  # граней в сетке чанка
+        self._meshes = {}  # слот -> (quads, faces, colors) сетки чанка
+
+    def __len__(self):
+        return int(self._counts[:self._used].sum())
+
+    @property
+    def chunk_count(self):
+        return self._used - 1
+
+    @property
+    def face_count(self):
+        """Открытых граней до слияния (по последней сетке)"""
+        return int(self._faces[:self._used].sum())
+
+    @property
+    def quad_count(self):
+        """Граней в последней сетке - по два треугольника на грань"""
+        return int(self._quads[:self._used].sum())
+
+    @property
+    def nbytes(self):
+        used = self._used
+        return (self._index[:used].nbytes + self._bits[:used].nbytes
+                + sum(part.nbytes for mesh in self._meshes.values() for part in mesh))
+
+    # === Изменение ===
+
+    def cells(self, cubes):
+        """Ячейки решётки (N, 3) int64 центров кубов (N, 4); первый куб задаёт привязку решётки"""
+        cubes = np.asarray(cubes, dtype=np.float32).reshape(-1, 4)
+        if not self._anchored and len(cubes):
+            self.origin = cubes[0, :3].astype(np.float64)
+            self._anchored = True
+        return np.round((cubes[:, :3] - self.origin) / self.voxel_size).astype(np.int64)
+
+    def add_cubes(self, cubes):
+        self.set(self.cells(cubes))
+
+    def set(self, cells, materials=None):
+        """Заполняет ячейки (N, 3); materials - номера цветов палитры, по умолчанию по слою"""
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 3)
+        if len(cells) == 0:
+            return
+        if materials is None:
+            materials = (cells[:, 1] // LAYER_HEIGHT) % len(self.palette)
+        materials = np.broadcast_to(np.asarray(materials) % len(self.palette) + 1, len(cells))
+        slots = self._slots_for(cells >> CHUNK_SHIFT, create=True)
+        local = cells & (CHUNK - 1)
+        self._index[slots, local[:, 0], local[:, 1], local[:, 2]] = materials
+        self._touch(cells, slots)
+
+    def remove(self, cells):
+        """Очищает ячейки (N, 3); пустые ячейки пропускаются"""
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 3)
+        slots = self._slots_for(cells >> CHUNK_SHIFT, create=False)
+        cells, slots = cells[slots > 0], slots[slots > 0]
+        if len(cells) == 0:
+            return
+        local = cells & (CHUNK - 1)
+        self._index[slots, local[:, 0], local[:, 1], local[:, 2]] = 0
+        self._touch(cells, slots)
+
+    def chunk_boxes(self):
+        """(mins, maxs) (слоты, 3) ограничивающих ящиков всех чанков в мировых координатах"""
+        low = (self._origins[:self._used] * CHUNK - 0.5) * self.voxel_size + self.origin
+        return low.astype(np.float32), (low + CHUNK * self.voxel_size).astype(np.float32)
+
+    # === Сетка ===
+
+    def update(self):
+        """Перестраивает сетку изменённых чанков; возвращает их число"""
+        if not self._dirty:
+            return 0
+        dirty = np.fromiter(self._dirty, dtype=np.int64, count=len(self._dirty))
+        self._dirty = set()
+        for start in range(0, len(dirty), MESH_BATCH):
+            self._mesh_chunks(dirty[start:start + MESH_BATCH])
+        return len(dirty)
+
+    def mesh(self, chunks=None):
+        """
+        Сетка чанков (маска по слотам, как у chunk_boxes; None - всех):
+        (quads (Q, 4, 3) float32, номер грани куба (CUBE_FACES), цвет).
+        """
+        self.update()
+        if chunks is None:
+            parts = list(self._meshes.values())
+        else:
+            parts = [self._meshes[slot] for slot in np.flatnonzero(chunks & (self._quads[:len(chunks)] > 0)).tolist()]
+        if not parts:
+            return np.zeros((0, 4, 3), dtype=np.float32), np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.uint32)
+        if len(parts) == 1:
+            return parts[0]
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+    def _mesh_chunks(self, slots):
+        """Сетки чанков slots за один векторный проход; раскладываются по чанкам"""
+        bits = self._bits[slots]
+        faces_per_chunk = np.zeros(len(slots), dtype=np.int64)
+        quads, faces, colors, chunks = [], [], [], []
+        for face, (axis, sign) in enumerate(FACE_AXES):
+            offset = np.zeros(3, dtype=np.int64)
+            offset[axis] = sign
+            neighbours = self._bits[self._slots_for(self._origins[slots] + offset, create=False)]
+            visible = bits & ~neighbour_bits(bits, neighbours, axis, sign)
+
+            # Биты открытых граней -> координаты (чанк в пачке, x, y, z)
+            words = np.flatnonzero(visible)
+            if len(words) == 0:
+                continue
+            row_bits = visible.ravel()[words].astype("<u4").view(np.uint8).reshape(-1, 4)
+            row, z = np.nonzero(np.unpackbits(row_bits, axis=1, bitorder="little"))
+            batch, x, y = np.unravel_index(words[row], visible.shape)
+            cell = (x, y, z)
+            material = self._index[slots[batch], x, y, z]
+            faces_per_chunk += np.bincount(batch, minlength=len(slots))
+
+            # Плоскость грани - ось axis, в плоскости u, v - две другие оси (v = z, где можно)
+            u_axis, v_axis = [a for a in range(3) if a != axis]
+            batch, s, u, v, height, width, material = greedy_rectangles(
+                batch, cell[axis], cell[u_axis], cell[v_axis], material)
+
+            corners = np.empty((len(batch), 4, 3), dtype=np.float64)
+            corners[:, :, axis] = (s + 0.5 * sign)[:, None]
+            u0, u1 = u - 0.5, u + height - 0.5
+            v0, v1 = v - 0.5, v + width - 0.5
+            corners[:, :, u_axis] = np.stack([u0, u1, u1, u0], axis=1)
+            corners[:, :, v_axis] = np.stack([v0, v0, v1, v1], axis=1)
+            corners += (self._origins[slots[batch]] * CHUNK)[:, None, :]
+            quads.append((corners * self.voxel_size + self.origin).astype(np.float32))
+            faces.append(np.full(len(batch), face, dtype=np.int8))
+            colors.append(self.palette[material - 1])
+            chunks.append(batch)
+        self._faces[slots] = faces_per_chunk
+        self._quads[slots] = 0
+
+        for slot in slots.tolist():
+            self._meshes.pop(slot, None)
+        if not quads:
+            return
+        quads, faces, colors, chunks = (np.concatenate(c) for c in (quads, faces, colors, chunks))
+        order = np.argsort(chunks, kind="stable")
+        bounds = np.searchsorted(chunks[order], np.arange(len(slots) + 1))
+        self._quads[slots] = np.diff(bounds)
+        for i, slot in enumerate(slots.tolist()):
+            part = order[bounds[i]:bounds[i + 1]]
+            if len(part):
+                self._meshes[slot] = (quads[part], faces[part], colors[part])
+
+    # === Внутреннее ===
+
+    def _slots_for(self, chunks, create):
+        """Слоты чанков (N, 3); нет чанка - новый слот (create) или 0"""
+        chunks = np.asarray(chunks, dtype=np.int64).reshape(-1, 3)
+        keys, first, inverse = np.unique(chunk_keys(chunks), return_index=True, return_inverse=True)
+        table = np.zeros(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys.tolist()):
+            slot = self._slots.get(key)
+            if slot is None and create:
+                slot = self._new_slot(key, chunks[first[i]])
+            table[i] = slot or 0
+        return table[inverse.ravel()]
+
+    def _new_slot(self, key, origin):
+        slot = self._used
+        if slot == len(self._index):
+            for name in ("_index", "_bits", "_origins", "_counts", "_faces", "_quads"):
+                old = getattr(self, name)
+                new = np.zeros((2 * len(old),) + old.shape[1:], dtype=old.dtype)
+                new[:slot] = old[:slot]
+                setattr(self, name, new)
+        self._origins[slot] = origin
+        self._slots[key] = slot
+        self._used += 1
+        return slot
+
+    def _touch(self, cells, slots):
+        """Пересчитывает маски изменённых чанков и помечает их сетку (и соседей на границе)"""
+        changed = np.unique(slots)
+        for start in range(0, len(changed), MESH_BATCH):
+            batch = changed[start:start + MESH_BATCH]
+            filled = self._index[batch] != 0
+            packed = np.packbits(filled, axis=-1, bitorder="little")
+            self._bits[batch] = packed.view("<u4")[..., 0]
+            self._counts[batch] = filled.sum(axis=(1, 2, 3))
+        self._dirty.update(changed.tolist())
+
+        # Воксель на границе чанка открывает или закрывает грань соседа
+        local = cells & (CHUNK - 1)
+        chunks = cells >> CHUNK_SHIFT
+        for axis in range(3):
+            for edge, sign in ((0, -1), (CHUNK - 1, 1)):
+                border = chunks[local[:, axis] == edge]
+                if len(border):
+                    border[:, axis] += sign
+                    neighbours = self._slots_for(border, create=False)
+                    self._dirty.update(neighbours[neighbours > 0].tolist())